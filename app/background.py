@@ -0,0 +1,92 @@
+"""
+Фоновые периодические задачи Sirius Group V2
+"""
+import asyncio
+import logging
+from typing import Callable, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundTaskManager:
+    """Менеджер фоновых задач"""
+
+    def __init__(self):
+        self.tasks: Dict[str, asyncio.Task] = {}
+
+    def start_periodic(self, name: str, func: Callable[[], Any], interval: float, initial_delay: float = 0):
+        """
+        Запуск периодической задачи
+
+        Args:
+            name: Имя задачи
+            func: Синхронная функция, выполняется в пуле потоков
+            interval: Интервал между запусками в секундах
+            initial_delay: Задержка перед первым запуском в секундах
+        """
+        if name in self.tasks and not self.tasks[name].done():
+            logger.warning(f"Background task {name} is already running")
+            return
+
+        self.tasks[name] = asyncio.create_task(self._run_periodic(name, func, interval, initial_delay))
+        logger.info(f"Background task {name} started (interval {interval}s)")
+
+    async def _run_periodic(self, name: str, func: Callable[[], Any], interval: float, initial_delay: float):
+        """Цикл выполнения периодической задачи"""
+        if initial_delay:
+            await asyncio.sleep(initial_delay)
+
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, func)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in background task {name}: {e}")
+
+            await asyncio.sleep(interval)
+
+    def start_once(self, name: str, func: Callable[[], Any]):
+        """
+        Однократный запуск задачи в пуле потоков, не задерживая запуск приложения
+
+        Args:
+            name: Имя задачи
+            func: Синхронная функция
+        """
+        if name in self.tasks and not self.tasks[name].done():
+            logger.warning(f"Background task {name} is already running")
+            return
+
+        self.tasks[name] = asyncio.create_task(self._run_once(name, func))
+        logger.info(f"Background task {name} started")
+
+    async def _run_once(self, name: str, func: Callable[[], Any]):
+        """Выполнение однократной задачи"""
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, func)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in background task {name}: {e}")
+
+    async def stop_all(self):
+        """Остановка всех фоновых задач"""
+        for name, task in self.tasks.items():
+            task.cancel()
+
+        for name, task in self.tasks.items():
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                logger.error(f"Error stopping background task {name}: {e}")
+
+        self.tasks.clear()
+        logger.info("All background tasks stopped")
+
+
+# Глобальный экземпляр менеджера фоновых задач
+task_manager = BackgroundTaskManager()
@@ -0,0 +1,134 @@
+"""
+Внутрипроцессные кэши Sirius Group V2
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlencode
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """
+    LRU кэш с ограничением по суммарному размеру значений
+
+    Значения должны быть bytes или str; при превышении лимита вытесняются
+    давно не использованные записи. Необязательный TTL ограничивает время
+    жизни записи.
+    """
+
+    def __init__(self, max_bytes: int, ttl: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Optional[Any]:
+        """Получение значения (None если нет или истекло)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Any, value: Any):
+        """Сохранение значения с вытеснением старых записей"""
+        size = len(value)
+        if size > self.max_bytes:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, size, expires_at)
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+
+    def invalidate(self, key: Any):
+        """Удаление записи"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        """Очистка кэша"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _remove(self, key: Any):
+        """Удаление записи (под блокировкой)"""
+        value, size, expires_at = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика кэша"""
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+# Кэш отрендеренных публичных страниц (главная, каталог, страница товара)
+page_cache = LRUCache(
+    max_bytes=settings.page_cache_max_bytes,
+    ttl=settings.page_cache_ttl_seconds
+)
+
+
+def page_cache_key(request, params: Iterable[str] = ()) -> str:
+    """Ключ кэша страницы: путь и значимые параметры запроса"""
+    query = sorted(
+        (name, request.query_params[name])
+        for name in params
+        if request.query_params.get(name)
+    )
+    return f"{request.url.path}?{urlencode(query)}"
+
+
+def get_cached_page(key: str) -> Optional[bytes]:
+    """Получение отрендеренной страницы из кэша"""
+    if not settings.page_cache_enabled:
+        return None
+    return page_cache.get(key)
+
+
+def cache_page(key: str, body: bytes):
+    """Сохранение отрендеренной страницы в кэш"""
+    if settings.page_cache_enabled:
+        page_cache.set(key, body)
+
+
+def invalidate_pages():
+    """Сброс кэша страниц после изменения товаров"""
+    page_cache.clear()
+    logger.debug("Page cache invalidated")
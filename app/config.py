@@ -16,6 +16,8 @@ class Settings(BaseSettings):
     # Security
     secret_key: str = Field(default="your-secret-key-32-characters-long-2024", description="Секретный ключ")
     session_max_age: int = Field(default=86400, description="Время жизни сессии в секундах")
+    qr_token_previous_keys: str = Field(default="", description="Прежние секретные ключи QR-токенов через запятую (ротация)")
+    qr_token_max_age_days: int = Field(default=0, description="Срок действия QR-токена в днях (0 - бессрочно)")
     
     # External Services
     telegram_bot_token: Optional[str] = Field(default=None, description="Токен Telegram бота")
@@ -39,6 +41,9 @@ class Settings(BaseSettings):
     # File Upload
     max_file_size: int = Field(default=10485760, description="Максимальный размер файла")
     upload_dir: str = Field(default="uploads", description="Папка загрузок")
+    image_workers: int = Field(default=2, description="Процессов для генерации уменьшенных копий изображений")
+    image_jpeg_quality: int = Field(default=85, description="Качество JPEG копий")
+    image_webp_quality: int = Field(default=80, description="Качество WebP копий")
     
     # Rate Limiting
     rate_limit_enabled: bool = Field(default=True, description="Включить ограничение скорости")
@@ -111,6 +116,73 @@ class Settings(BaseSettings):
     whatsapp_save_messages: bool = Field(default=True, description="Сохранять сообщения")
     whatsapp_save_qr_codes: bool = Field(default=True, description="Сохранять QR коды")
     
+    # Cart Cleanup
+    cart_gc_enabled: bool = Field(default=True, description="Включить очистку брошенных корзин")
+    cart_gc_max_age_hours: int = Field(default=72, description="Возраст корзины для удаления в часах")
+    cart_gc_interval_seconds: int = Field(default=3600, description="Интервал запуска очистки корзин")
+    cart_gc_batch_size: int = Field(default=200, description="Количество сессий в одном батче удаления")
+    cart_batch_max_operations: int = Field(default=50, description="Максимум операций в пакетном изменении корзины")
+    
+    # Templates
+    templates_dir: str = Field(default="app/templates", description="Папка шаблонов")
+    template_auto_reload: Optional[bool] = Field(default=None, description="Перечитывать измененные шаблоны (по умолчанию везде, кроме production)")
+    template_bytecode_cache_dir: str = Field(default="cache/templates", description="Папка байткод-кэша шаблонов (пусто - отключить)")
+    template_precompile: bool = Field(default=False, description="Компилировать все шаблоны при запуске")
+    
+    # Static Files & Compression
+    static_dir: str = Field(default="app/static", description="Папка статических файлов")
+    compression_enabled: bool = Field(default=True, description="Сжимать ответы")
+    compression_minimum_size: int = Field(default=1024, description="Минимальный размер ответа для сжатия в байтах")
+    gzip_compress_level: int = Field(default=6, description="Уровень сжатия gzip")
+    brotli_enabled: bool = Field(default=False, description="Использовать Brotli (нужен пакет brotli-asgi)")
+    
+    # Catalog
+    catalog_page_size: int = Field(default=24, description="Товаров на странице каталога")
+    catalog_page_size_max: int = Field(default=100, description="Максимум товаров на странице каталога")
+    
+    # Search Suggestions
+    suggest_index_refresh_seconds: int = Field(default=300, description="Интервал перестроения индекса подсказок")
+    
+    # Page Cache
+    page_cache_enabled: bool = Field(default=True, description="Включить кэш публичных страниц")
+    page_cache_max_bytes: int = Field(default=16777216, description="Лимит памяти кэша страниц в байтах")
+    page_cache_ttl_seconds: int = Field(default=60, description="Время жизни страницы в кэше")
+    homepage_counters_ttl_seconds: int = Field(default=30, description="Время жизни счетчиков и последних товаров главной страницы")
+    
+    # HTTP Cache
+    http_cache_products_max_age: int = Field(default=30, description="max-age публичных API товаров в секундах")
+    
+    # QR Codes
+    qr_render_interval_seconds: float = Field(default=5.0, description="Интервал фоновой отрисовки QR-кодов заказов")
+    qr_render_batch_size: int = Field(default=100, description="Количество QR-кодов в одном батче отрисовки")
+    qr_png_box_size: int = Field(default=10, description="Размер модуля PNG QR-кода в пикселях")
+    qr_version: int = Field(default=0, description="Версия QR-кодов (1-40), 0 - подбирать по длине данных")
+    qr_error_correction: str = Field(default="L", description="Уровень коррекции ошибок QR-кодов: L, M, Q или H")
+    qr_svg_backend: str = Field(default="svg", description="Бэкенд SVG QR-кодов: svg или svg-compact")
+    qr_image_cache_max_bytes: int = Field(default=8388608, description="Лимит памяти кэша отрисованных QR-кодов в байтах")
+    label_workers: int = Field(default=2, description="Количество процессов отрисовки листов этикеток")
+    label_batch_max: int = Field(default=1000, description="Максимум этикеток в одном листе")
+    label_font_path: str = Field(default="/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", description="TTF шрифт подписей этикеток (с кириллицей)")
+    scan_issue_batch_max: int = Field(default=200, description="Максимум QR-кодов в одной пачке выдачи заказов")
+    
+    # Tracking
+    tracking_bulk_max_codes: int = Field(default=100, description="Максимум кодов в пакетном запросе отслеживания")
+    order_events_backend: str = Field(default="memory", description="Доставка событий заказов: memory (один воркер) или redis")
+    sse_keepalive_seconds: int = Field(default=15, description="Интервал keepalive потока событий в секундах")
+    tracking_miss_cache_max_bytes: int = Field(default=1048576, description="Лимит памяти кэша несуществующих кодов заказов в байтах")
+    tracking_miss_ttl_seconds: int = Field(default=30, description="Время жизни несуществующего кода заказа в кэше")
+    tracking_rate_limit_enabled: bool = Field(default=True, description="Ограничивать запросы отслеживания с одного IP")
+    tracking_rate_limit_per_minute: int = Field(default=30, description="Запросов отслеживания в минуту с одного IP")
+    tracking_rate_limit_burst: int = Field(default=20, description="Запас запросов отслеживания для всплесков")
+    trusted_proxies: str = Field(default="127.0.0.1", description="IP и подсети прокси через запятую, чьим X-Real-IP/X-Forwarded-For доверяем")
+    
+    # Async Checkout
+    checkout_async_enabled: bool = Field(default=False, description="Принимать заказы через очередь")
+    checkout_worker_count: int = Field(default=1, description="Количество обработчиков очереди заказов")
+    checkout_worker_interval_seconds: float = Field(default=1.0, description="Интервал опроса очереди заказов")
+    checkout_worker_batch_size: int = Field(default=50, description="Количество заявок в одном батче")
+    checkout_claim_timeout_seconds: int = Field(default=300, description="Через сколько секунд незавершенная заявка возвращается в очередь")
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -0,0 +1,124 @@
+"""
+Быстрая сериализация JSON для списочных API
+
+Строки читаются из БД кортежами (без создания ORM объектов), собираются
+в словари и кодируются orjson без валидации Pydantic. Используется только
+для доверенных данных только для чтения.
+"""
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+from sqlalchemy.orm import Query
+
+
+def _default(obj: Any) -> Any:
+    """Типы, которые orjson не кодирует сам"""
+    if isinstance(obj, Decimal):
+        # Так же, как Pydantic кодирует Decimal в JSON
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON ответ, кодируемый через orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
+
+
+def schema_columns(model, schema: Type[BaseModel]) -> list:
+    """Колонки модели, соответствующие полям схемы ответа"""
+    columns = model.__table__.columns
+    return [getattr(model, name) for name in schema.model_fields if name in columns]
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """
+    Разбор параметра fields=id,name,sell_price_rub
+
+    Returns:
+        Запрошенные поля по порядку или None, если параметр не передан
+
+    Raises:
+        ValueError: Запрошены неизвестные поля
+    """
+    if not fields:
+        return None
+
+    allowed = list(allowed)
+    requested = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise ValueError(f"Неизвестные поля: {', '.join(unknown)}. Доступны: {', '.join(allowed)}")
+    return requested or None
+
+
+def field_names(model, schema: Optional[Type[BaseModel]] = None) -> List[str]:
+    """Поля, которые можно запросить через fields="""
+    if schema is None:
+        return [column.key for column in model.__table__.columns]
+    return [column.key for column in schema_columns(model, schema)]
+
+
+def select_columns(model, names: Iterable[str]) -> list:
+    """Колонки модели по именам полей"""
+    return [getattr(model, name) for name in names]
+
+
+def fetch_rows(query: Query, decimals: Optional[Callable[[Decimal], Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Строки запроса по колонкам в виде словарей
+
+    Args:
+        query: Запрос по колонкам (db.query(Model.a, Model.b, ...))
+        decimals: Преобразование Decimal (например, float), по умолчанию строка
+    """
+    rows = [row._asdict() for row in query]
+    if decimals is not None:
+        for row in rows:
+            for key, value in row.items():
+                if isinstance(value, Decimal):
+                    row[key] = decimals(value)
+    return rows
+
+
+def fetch_sparse_row(
+    query: Query,
+    model,
+    names: List[str],
+    decimals: Optional[Callable[[Decimal], Any]] = None
+) -> tuple:
+    """
+    Строка по выбранным полям и служебные поля ее версии
+
+    Для ETag всегда читаются id, created_at и updated_at, но в ответ
+    попадают только запрошенные поля.
+
+    Returns:
+        (данные ответа, полная прочитанная строка) или (None, None)
+    """
+    read_names = names + [name for name in ("id", "created_at", "updated_at") if name not in names]
+    row = fetch_row(query.with_entities(*select_columns(model, read_names)), decimals)
+    if row is None:
+        return None, None
+    return {name: row[name] for name in names}, row
+
+
+def fetch_row(query: Query, decimals: Optional[Callable[[Decimal], Any]] = None) -> Optional[Dict[str, Any]]:
+    """Первая строка запроса по колонкам в виде словаря"""
+    rows = fetch_rows(query.limit(1), decimals)
+    return rows[0] if rows else None
+
+
+def fast_json_response(content: Any, response: Optional[Response] = None) -> FastJSONResponse:
+    """
+    Ответ быстрым JSON с заголовками, выставленными в обработчике
+
+    Заголовки временного response (ETag, Cache-Control) переносятся,
+    так как при возврате готового ответа FastAPI их не применяет.
+    """
+    headers = dict(response.headers) if response is not None else None
+    return FastJSONResponse(content, headers=headers)
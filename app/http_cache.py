@@ -0,0 +1,132 @@
+"""
+Условные HTTP ответы (ETag / Last-Modified)
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+
+from fastapi import Request, Response
+from sqlalchemy import func
+from sqlalchemy.orm import Query
+
+from app.config import settings
+
+# Политики Cache-Control для API
+CACHE_PUBLIC_PRODUCTS = f"public, max-age={settings.http_cache_products_max_age}"
+CACHE_PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Приведение времени к UTC (SQLite возвращает время без зоны)"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def make_etag(*parts: Any) -> str:
+    """Сильный ETag из версии данных"""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def row_version(row) -> Tuple[str, Optional[datetime]]:
+    """
+    Версия строки: ETag и время последнего изменения
+
+    ETag считается по значениям колонок уже загруженной строки, без
+    сериализации ответа: updated_at в SQLite хранится с точностью до
+    секунды и сам по себе не различает два изменения подряд.
+    """
+    modified = _as_utc(row.updated_at or row.created_at)
+    values = [getattr(row, column.key) for column in row.__table__.columns]
+    return make_etag(type(row).__name__, *values), modified
+
+
+def mapping_version(kind: str, row: Dict[str, Any]) -> Tuple[str, Optional[datetime]]:
+    """Версия строки, прочитанной запросом по колонкам (см. row_version)"""
+    modified = _as_utc(row.get("updated_at") or row.get("created_at"))
+    return make_etag(kind, *sorted(row.items())), modified
+
+
+def collection_version(query: Query, model) -> Tuple[str, Optional[datetime]]:
+    """
+    Версия коллекции по отметке максимума
+
+    Количество строк, максимальный ID и максимальное время изменения
+    меняются при любой вставке, изменении или удалении строки коллекции.
+    updated_at хранится с микросекундами (utc_now), поэтому два изменения
+    одной строки за секунду дают разные версии.
+    """
+    last_activity = func.coalesce(model.updated_at, model.created_at)
+    count, max_id, max_modified = query.with_entities(
+        func.count(model.id), func.max(model.id), func.max(last_activity)
+    ).one()
+
+    if isinstance(max_modified, str):
+        # SQLite отдает агрегат по дате строкой
+        max_modified = datetime.fromisoformat(max_modified)
+    modified = _as_utc(max_modified)
+    return make_etag(model.__name__, count, max_id, modified.isoformat() if modified else None), modified
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Проверка If-None-Match (слабое сравнение, как требует RFC 9110 для GET)"""
+    if header.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    Проверка условного запроса
+
+    If-None-Match имеет приоритет; If-Modified-Since учитывается,
+    только если If-None-Match не передан.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = _as_utc(parsedate_to_datetime(if_modified_since))
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= since
+
+    return False
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime], cache_control: str) -> Dict[str, str]:
+    """Заголовки кэширования ответа"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime],
+    cache_control: str
+) -> Optional[Response]:
+    """
+    Обработка условного запроса в обработчике
+
+    Returns:
+        Ответ 304, если у клиента актуальная версия, иначе None
+        (заголовки кэширования уже выставлены в response)
+    """
+    headers = cache_headers(etag, last_modified, cache_control)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
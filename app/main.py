@@ -2,17 +2,33 @@
 Sirius Group V2 - Система управления складом и интернет-магазин с WhatsApp уведомлениями
 """
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from starlette.middleware.gzip import GZipMiddleware
 from fastapi.responses import HTMLResponse
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.middleware.cors import CORSMiddleware
 import logging
 import os
 
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
 from app.config import settings
 from app.db import create_tables, check_database_connection
-from app.routers import health, web_public, web_shop, shop_api, web_admin, admin_api, tracking, notifications_api, web_notifications
+from app.templating import templates, precompile_templates
+from app.static_assets import FingerprintedStaticFiles, static_assets
+from app.sse import bypass_event_streams
+from app.background import task_manager
+from app.services.cart_cleanup_service import run_cart_cleanup
+from app.services.checkout_service import run_checkout_worker
+from app.services.image_service import image_processor
+from app.services.label_service import label_generator
+from app.services.suggest_index import rebuild_suggest_index
+from app.services.order_code_registry import backfill_order_codes
+from app.services.order_qr_service import run_qr_renderer, resign_order_payloads
+from app.services.order_events import order_events
+from app.routers import health, web_public, web_shop, shop_api, web_admin, admin_api, tracking, notifications_api, web_notifications, media, qr
 
 # Настройка логирования
 logging.basicConfig(
@@ -57,19 +73,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Сжатие ответов (кроме потоков событий SSE)
+if settings.compression_enabled:
+    if settings.brotli_enabled and BrotliMiddleware is not None:
+        app.add_middleware(
+            bypass_event_streams(BrotliMiddleware),
+            minimum_size=settings.compression_minimum_size,
+            gzip_fallback=True
+        )
+    else:
+        if settings.brotli_enabled:
+            logger.warning("brotli-asgi is not installed, falling back to gzip")
+        app.add_middleware(
+            bypass_event_streams(GZipMiddleware),
+            minimum_size=settings.compression_minimum_size,
+            compresslevel=settings.gzip_compress_level
+        )
+
 # Статические файлы
 try:
-    if os.path.exists("app/static"):
-        app.mount("/static", StaticFiles(directory="app/static"), name="static")
+    if os.path.exists(settings.static_dir):
+        app.mount("/static", FingerprintedStaticFiles(directory=settings.static_dir, assets=static_assets), name="static")
         logger.info("Static files mounted successfully")
     else:
         logger.warning("Static files directory not found")
 except Exception as e:
     logger.error(f"Error mounting static files: {e}")
 
-# Templates
-templates = Jinja2Templates(directory="app/templates")
-
 # Подключение роутеров
 try:
     app.include_router(health.router)
@@ -81,6 +111,8 @@ try:
     app.include_router(tracking.router)
     app.include_router(notifications_api.router)
     app.include_router(web_notifications.router)
+    app.include_router(media.router)
+    app.include_router(qr.router)
     logger.info("All routers included successfully")
 except Exception as e:
     logger.error(f"Error including routers: {e}")
@@ -127,6 +159,57 @@ async def startup_event():
         # Создание таблиц
         create_tables()
         
+        # Реестр кодов заказов для заказов, созданных до его появления
+        # (в пуле потоков: проверяет все заказы)
+        task_manager.start_once("order_code_backfill", backfill_order_codes)
+        
+        # Данные QR-кодов с токенами старого формата или выведенного ключа
+        # (в пуле потоков: проверяет все заказы)
+        task_manager.start_once("qr_resign", resign_order_payloads)
+        
+        # Индекс подсказок поиска; периодическое перестроение подхватывает
+        # изменения товаров, сделанные другими воркерами
+        task_manager.start_periodic(
+            "suggest_index",
+            rebuild_suggest_index,
+            interval=settings.suggest_index_refresh_seconds
+        )
+        
+        # Прием событий заказов от других воркеров
+        order_events.start()
+        
+        # Изображения, обработка которых не успела выполниться до перезапуска
+        image_processor.start_pending_sweep()
+        
+        # Фоновая отрисовка QR-кодов новых заказов
+        task_manager.start_periodic(
+            "qr_renderer",
+            run_qr_renderer,
+            interval=settings.qr_render_interval_seconds
+        )
+        
+        # Компиляция шаблонов до первого запроса
+        if settings.template_precompile:
+            precompile_templates()
+        
+        # Фоновая очистка брошенных корзин
+        if settings.cart_gc_enabled:
+            task_manager.start_periodic(
+                "cart_gc",
+                run_cart_cleanup,
+                interval=settings.cart_gc_interval_seconds,
+                initial_delay=60
+            )
+        
+        # Обработчики очереди асинхронного оформления заказов
+        if settings.checkout_async_enabled:
+            for worker_index in range(settings.checkout_worker_count):
+                task_manager.start_periodic(
+                    f"checkout_worker_{worker_index}",
+                    run_checkout_worker,
+                    interval=settings.checkout_worker_interval_seconds
+                )
+        
         logger.info("Application startup completed successfully")
         
     except Exception as e:
@@ -137,17 +220,12 @@ async def startup_event():
 async def shutdown_event():
     """Событие остановки приложения"""
     logger.info("Shutting down Sirius Group V2 application...")
+    await task_manager.stop_all()
+    image_processor.shutdown()
+    label_generator.shutdown()
+    order_events.stop()
 
 # Базовые роуты
-@app.get("/")
-async def root(request: Request):
-    """Корневой роут"""
-    try:
-        return templates.TemplateResponse("index.html", {"request": request})
-    except Exception as e:
-        logger.error(f"Error loading root page: {e}")
-        return {"error": f"Template error: {e}"}
-
 @app.get("/health")
 async def health_check():
     """Проверка здоровья системы"""
@@ -1,18 +1,30 @@
 """
 Базовая модель для всех моделей данных
 """
+from datetime import datetime, timezone
+
 from sqlalchemy import Column, Integer, DateTime, func
 from sqlalchemy.ext.declarative import declared_attr
 from app.db import Base
 
 
+def utc_now() -> datetime:
+    """
+    Время изменения строки с микросекундами
+
+    CURRENT_TIMESTAMP в SQLite хранит время с точностью до секунды, и два
+    изменения строки за одну секунду давали бы одну версию коллекции.
+    """
+    return datetime.now(timezone.utc)
+
+
 class BaseModel(Base):
     """Базовая модель с общими полями"""
     __abstract__ = True
     
     id = Column(Integer, primary_key=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=utc_now)
     
     @declared_attr
     def __tablename__(cls):
@@ -1,7 +1,7 @@
 """
 Модель заказа
 """
-from sqlalchemy import Column, String, Integer, Numeric, DateTime, Date, Boolean, ForeignKey
+from sqlalchemy import Column, String, Integer, Numeric, DateTime, Date, Boolean, ForeignKey, Text
 from .base import BaseModel
 
 
@@ -75,6 +75,18 @@ class ShopOrder(BaseModel):
         return f"<ShopOrder(code='{self.order_code}', customer='{self.customer_name}', status='{self.status}')>"
 
 
+class OrderCode(BaseModel):
+    """Реестр кодов заказов обеих таблиц для поиска одним запросом"""
+    __tablename__ = "order_codes"
+    
+    code = Column(String(8), unique=True, nullable=False, index=True)
+    order_type = Column(String(20), nullable=False)  # order, shop_order
+    order_id = Column(Integer, nullable=False)
+    
+    def __repr__(self):
+        return f"<OrderCode(code='{self.code}', type='{self.order_type}', id={self.order_id})>"
+
+
 class ShopCart(BaseModel):
     """Модель корзины магазина"""
     __tablename__ = "shop_cart"
@@ -87,6 +99,24 @@ class ShopCart(BaseModel):
         return f"<ShopCart(session_id='{self.session_id}', product_id={self.product_id}, qty={self.quantity})>"
 
 
+class CheckoutIntent(BaseModel):
+    """Модель заявки на оформление заказа в очереди асинхронного checkout"""
+    __tablename__ = "checkout_intents"
+    
+    token = Column(String(36), unique=True, nullable=False, index=True)  # токен для проверки статуса
+    session_id = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)  # JSON: данные покупателя и снимок корзины
+    status = Column(String(20), default="pending", nullable=False, index=True)  # pending, processing, completed, failed
+    claimed_by = Column(String(36))  # идентификатор батча обработчика
+    attempts = Column(Integer, default=0, nullable=False)
+    order_codes = Column(Text)  # коды созданных заказов через запятую
+    error_text = Column(Text)
+    processed_at = Column(DateTime)
+    
+    def __repr__(self):
+        return f"<CheckoutIntent(token='{self.token}', status='{self.status}')>"
+
+
 class PaymentMethod(BaseModel):
     """Модель способа оплаты"""
     __tablename__ = "payment_methods"
@@ -1,7 +1,7 @@
 """
 Модель товара
 """
-from sqlalchemy import Column, String, Text, Integer, Numeric, Date, DateTime, func
+from sqlalchemy import Column, String, Text, Integer, Numeric, Date, DateTime, ForeignKey, func
 from .base import BaseModel
 
 
@@ -21,4 +21,21 @@ class Product(BaseModel):
     expected_date = Column(Date)  # дата ожидаемого поступления
     
     def __repr__(self):
-        return f"<Product(name='{self.name}', quantity={self.quantity}, status='{self.availability_status}')>"
\ No newline at end of file
+        return f"<Product(name='{self.name}', quantity={self.quantity}, status='{self.availability_status}')>"
+
+
+class ProductImage(BaseModel):
+    """Модель изображения товара"""
+    __tablename__ = "product_images"
+    
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
+    content_hash = Column(String(64), nullable=False, index=True)  # sha256 исходного файла
+    original_ext = Column(String(10), nullable=False)
+    position = Column(Integer, default=0, nullable=False)  # порядок, 0 - основное изображение
+    status = Column(String(20), default="pending", nullable=False, index=True)  # pending, ready, failed
+    width = Column(Integer)
+    height = Column(Integer)
+    error_text = Column(Text)
+    
+    def __repr__(self):
+        return f"<ProductImage(product_id={self.product_id}, hash='{self.content_hash[:8]}', status='{self.status}')>"
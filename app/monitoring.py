@@ -47,6 +47,7 @@ class SystemMonitor:
         self.errors: List[ErrorInfo] = []
         self.warnings: List[str] = []
         self.metrics_history: List[SystemMetrics] = []
+        self.counters: Dict[str, int] = {}
         self.status = "unknown"
         self.start_time = time.time()
         
@@ -91,6 +92,14 @@ class SystemMonitor:
         """Логирует информационное сообщение"""
         self.logger.info(f"Info in {context}: {message}")
     
+    def increment_counter(self, name: str, value: int = 1):
+        """Увеличивает счетчик прикладной метрики"""
+        self.counters[name] = self.counters.get(name, 0) + value
+    
+    def get_counters(self) -> Dict[str, int]:
+        """Получение значений счетчиков"""
+        return dict(self.counters)
+    
     def collect_metrics(self) -> SystemMetrics:
         """Сбор метрик системы"""
         try:
@@ -127,7 +136,8 @@ class SystemMonitor:
                 "errors_count": len(self.errors),
                 "warnings_count": len(self.warnings),
                 "last_error": self.errors[-1].__dict__ if self.errors else None,
-                "metrics": current_metrics.__dict__ if current_metrics else None
+                "metrics": current_metrics.__dict__ if current_metrics else None,
+                "counters": self.get_counters()
             }
             
             # Определяем статус на основе метрик и ошибок
@@ -185,7 +195,8 @@ class SystemMonitor:
                     "min": min(disk_values)
                 },
                 "errors_count": len(self.errors),
-                "warnings_count": len(self.warnings)
+                "warnings_count": len(self.warnings),
+                "counters": self.get_counters()
             }
             
             return summary
@@ -246,7 +257,8 @@ class SystemMonitor:
                     "export_time": datetime.now().isoformat(),
                     "metrics": [m.__dict__ for m in self.metrics_history],
                     "errors": [e.__dict__ for e in self.errors],
-                    "warnings": self.warnings
+                    "warnings": self.warnings,
+                    "counters": self.get_counters()
                 }
                 
                 with open(filename, 'w', encoding='utf-8') as f:
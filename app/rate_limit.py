@@ -0,0 +1,142 @@
+"""
+Ограничение частоты запросов по IP
+
+Token bucket: у каждого IP есть запас запросов (burst), который
+пополняется с постоянной скоростью. Перебор кодов заказов упирается
+в лимит, а обычный покупатель его не замечает.
+"""
+import ipaddress
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Tuple, Union
+
+from fastapi import HTTPException, Request
+
+from app.config import settings
+
+
+class TokenBucketLimiter:
+    """Token bucket по ключу (IP) с вытеснением давно не активных ключей"""
+
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int = 10000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, cost: float = 1.0) -> float:
+        """
+        Списание запроса
+
+        Returns:
+            0, если запрос разрешен, иначе сколько секунд ждать
+        """
+        with self._lock:
+            tokens = self._refill(key)
+            if tokens >= cost:
+                self._store(key, tokens - cost)
+                return 0.0
+
+            self._store(key, tokens)
+            return (cost - tokens) / self.rate if self.rate else math.inf
+
+    def charge(self, key: str, cost: float):
+        """
+        Безусловное списание (например, за промахи пакетного запроса)
+
+        Запас может уйти в минус: следующие запросы ждут, пока он
+        восстановится.
+        """
+        with self._lock:
+            self._store(key, self._refill(key) - cost)
+
+    def _refill(self, key: str) -> float:
+        """Текущий запас ключа с учетом пополнения (под блокировкой)"""
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (float(self.burst), now))
+        return min(float(self.burst), tokens + (now - updated_at) * self.rate)
+
+    def _store(self, key: str, tokens: float):
+        """Сохранение запаса; ключ становится самым свежим (под блокировкой)"""
+        self._buckets[key] = (tokens, time.monotonic())
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+    def clear(self):
+        """Сброс всех счетчиков"""
+        with self._lock:
+            self._buckets.clear()
+
+
+@lru_cache(maxsize=8)
+def _trusted_networks(trusted_proxies: str) -> Tuple[Union[ipaddress.IPv4Network, ipaddress.IPv6Network], ...]:
+    """Подсети доверенных прокси из настройки TRUSTED_PROXIES"""
+    return tuple(
+        ipaddress.ip_network(entry.strip(), strict=False)
+        for entry in trusted_proxies.split(",")
+        if entry.strip()
+    )
+
+
+def is_trusted_proxy(host: str) -> bool:
+    """Адрес принадлежит доверенному прокси"""
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in _trusted_networks(settings.trusted_proxies))
+
+
+def client_ip(request: Request) -> str:
+    """
+    IP клиента
+
+    Заголовки X-Real-IP и X-Forwarded-For учитываются, только если
+    запрос пришел от доверенного прокси (nginx): иначе их может
+    подставить сам клиент. Из X-Forwarded-For берется ближайший к нам
+    адрес, не принадлежащий доверенным прокси.
+    """
+    host = request.client.host if request.client else "unknown"
+    if not is_trusted_proxy(host):
+        return host
+
+    real_ip = request.headers.get("x-real-ip", "").strip()
+    if real_ip:
+        return real_ip
+
+    forwarded = [address.strip() for address in request.headers.get("x-forwarded-for", "").split(",") if address.strip()]
+    for address in reversed(forwarded):
+        if not is_trusted_proxy(address):
+            return address
+    return forwarded[0] if forwarded else host
+
+
+def limit_tracking_requests(request: Request):
+    """Зависимость: лимит запросов к отслеживанию заказов с одного IP"""
+    if not settings.tracking_rate_limit_enabled:
+        return
+
+    wait = tracking_limiter.acquire(client_ip(request))
+    if wait:
+        raise HTTPException(
+            status_code=429,
+            detail="Слишком много запросов, попробуйте позже",
+            headers={"Retry-After": str(max(1, math.ceil(min(wait, 3600))))}
+        )
+
+
+def charge_tracking_misses(request: Request, misses: int):
+    """Списание за ненайденные коды пакетного запроса: перебор через пакеты тоже упирается в лимит"""
+    if settings.tracking_rate_limit_enabled and misses:
+        tracking_limiter.charge(client_ip(request), misses)
+
+
+# Глобальный лимитер отслеживания заказов (свой в каждом воркере)
+tracking_limiter = TokenBucketLimiter(
+    rate_per_minute=settings.tracking_rate_limit_per_minute,
+    burst=settings.tracking_rate_limit_burst
+)
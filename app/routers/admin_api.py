@@ -1,18 +1,25 @@
 """
 API для администрирования
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, BackgroundTasks, File, UploadFile
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import logging
 
+from app.config import settings
 from app.db import get_db
 from app.models.product import Product
 from app.models.order import Order, ShopOrder
 from app.schemas.product import ProductCreate, ProductUpdate, Product as ProductSchema
-from app.schemas.order import OrderUpdate, ShopOrderUpdate, ShopOrder as ShopOrderSchema
+from app.schemas.order import OrderUpdate, ShopOrderUpdate, ShopOrder as ShopOrderSchema, ScanIssueRequest
+from app.schemas.label import LabelSheetRequest
 from app.services.product_service import ProductService
 from app.services.order_service import OrderService, ShopOrderService
+from app.services.image_service import ProductImageService, image_processor, save_upload, thumbnail_urls
+from app.services.label_service import collect_labels, label_generator
+from app.services.order_issue_service import OrderIssueService
+from app.fast_json import fast_json_response, fetch_rows, fetch_sparse_row, field_names, parse_fields, schema_columns, select_columns
+from app.http_cache import collection_version, row_version, mapping_version, conditional_response, CACHE_PRIVATE_REVALIDATE
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/admin", tags=["admin"])
@@ -26,12 +33,19 @@ def check_admin_access():
 
 
 # API для товаров
-@router.get("/products", response_model=List[ProductSchema])
+# Списки кодируются orjson в обход response_model, схема ответа только документируется
+@router.get("/products", responses={200: {
+    "model": List[ProductSchema],
+    "description": "Товары; с параметром fields - только запрошенные поля"
+}})
 async def get_products(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     status: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Поля через запятую, например id,name,sell_price_rub"),
     db: Session = Depends(get_db)
 ):
     """Получение списка товаров"""
@@ -39,17 +53,28 @@ async def get_products(
         if not check_admin_access():
             raise HTTPException(status_code=403, detail="Доступ запрещен")
         
-        product_service = ProductService(db)
+        try:
+            names = parse_fields(fields, field_names(Product, ProductSchema)) or field_names(Product, ProductSchema)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Версия всей таблицы товаров покрывает любые фильтры и поиск
+        etag, last_modified = collection_version(db.query(Product), Product)
+        not_modified = conditional_response(request, response, etag, last_modified, CACHE_PRIVATE_REVALIDATE)
+        if not_modified:
+            return not_modified
+        
+        # Строки читаются кортежами и кодируются orjson без ORM и Pydantic
+        query = db.query(*select_columns(Product, names))
         
         if search:
-            products = product_service.search_products(search)
+            query = query.filter(ProductService.search_condition(search))
         else:
-            filters = {}
             if status:
-                filters["availability_status"] = status
-            products = product_service.get_multi(skip=skip, limit=limit, filters=filters)
+                query = query.filter(Product.availability_status == status)
+            query = query.offset(skip).limit(limit)
         
-        return products
+        return fast_json_response(fetch_rows(query), response)
     except HTTPException:
         raise
     except Exception as e:
@@ -58,18 +83,45 @@ async def get_products(
 
 
 @router.get("/products/{product_id}", response_model=ProductSchema)
-async def get_product(product_id: int, db: Session = Depends(get_db)):
+async def get_product(
+    product_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Поля через запятую, например id,name,sell_price_rub"),
+    db: Session = Depends(get_db)
+):
     """Получение товара по ID"""
     try:
         if not check_admin_access():
             raise HTTPException(status_code=403, detail="Доступ запрещен")
         
+        if fields:
+            try:
+                names = parse_fields(fields, field_names(Product, ProductSchema))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            
+            data, row = fetch_sparse_row(db.query(Product).filter(Product.id == product_id), Product, names)
+            if data is None:
+                raise HTTPException(status_code=404, detail="Товар не найден")
+            
+            etag, last_modified = mapping_version("Product", row)
+            not_modified = conditional_response(request, response, etag, last_modified, CACHE_PRIVATE_REVALIDATE)
+            if not_modified:
+                return not_modified
+            return fast_json_response(data, response)
+        
         product_service = ProductService(db)
         product = product_service.get(product_id)
         
         if not product:
             raise HTTPException(status_code=404, detail="Товар не найден")
         
+        etag, last_modified = row_version(product)
+        not_modified = conditional_response(request, response, etag, last_modified, CACHE_PRIVATE_REVALIDATE)
+        if not_modified:
+            return not_modified
+        
         return product
     except HTTPException:
         raise
@@ -147,6 +199,70 @@ async def delete_product(product_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Ошибка удаления товара")
 
 
+@router.post("/products/{product_id}/images")
+async def upload_product_image(
+    product_id: int,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    """Загрузка изображения товара (уменьшенные копии создаются в фоне)"""
+    try:
+        if not check_admin_access():
+            raise HTTPException(status_code=403, detail="Доступ запрещен")
+        
+        product = ProductService(db).get(product_id)
+        if not product:
+            raise HTTPException(status_code=404, detail="Товар не найден")
+        
+        try:
+            content_hash, ext = await save_upload(file)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        image = ProductImageService(db).create(product_id, content_hash, ext)
+        background_tasks.add_task(image_processor.process, image.id)
+        
+        return {
+            "id": image.id,
+            "status": image.status,
+            "content_hash": content_hash,
+            "thumbnail": thumbnail_urls(content_hash)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error uploading image for product {product_id}: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка загрузки изображения")
+
+
+@router.get("/products/{product_id}/images")
+async def get_product_images(product_id: int, db: Session = Depends(get_db)):
+    """Изображения товара"""
+    try:
+        if not check_admin_access():
+            raise HTTPException(status_code=403, detail="Доступ запрещен")
+        
+        images = ProductImageService(db).get_product_images(product_id)
+        return [
+            {
+                "id": image.id,
+                "status": image.status,
+                "position": image.position,
+                "width": image.width,
+                "height": image.height,
+                "content_hash": image.content_hash,
+                "thumbnail": thumbnail_urls(image.content_hash)
+            }
+            for image in images
+        ]
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting images for product {product_id}: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка получения изображений")
+
+
 @router.put("/products/{product_id}/quantity")
 async def update_product_quantity(
     product_id: int,
@@ -198,12 +314,17 @@ async def update_product_status(
 
 
 # API для заказов магазина
-@router.get("/shop-orders", response_model=List[ShopOrderSchema])
+@router.get("/shop-orders", responses={200: {
+    "model": List[ShopOrderSchema],
+    "description": "Заказы магазина; с параметром fields - только запрошенные поля"
+}})
 async def get_shop_orders(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     status: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Поля через запятую, например id,order_code,status"),
     db: Session = Depends(get_db)
 ):
     """Получение списка заказов магазина"""
@@ -211,22 +332,27 @@ async def get_shop_orders(
         if not check_admin_access():
             raise HTTPException(status_code=403, detail="Доступ запрещен")
         
-        shop_order_service = ShopOrderService(db)
+        try:
+            names = parse_fields(fields, field_names(ShopOrder, ShopOrderSchema)) or field_names(ShopOrder, ShopOrderSchema)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Строки читаются кортежами и кодируются orjson без ORM и Pydantic
+        query = db.query(*select_columns(ShopOrder, names))
         
         if search:
             # Поиск по коду заказа или телефону
-            orders = db.query(ShopOrder).filter(
+            query = query.filter(
                 (ShopOrder.order_code.ilike(f"%{search}%")) |
                 (ShopOrder.customer_phone.ilike(f"%{search}%")) |
                 (ShopOrder.customer_name.ilike(f"%{search}%"))
-            ).all()
+            )
         else:
-            filters = {}
             if status:
-                filters["status"] = status
-            orders = shop_order_service.get_multi(skip=skip, limit=limit, filters=filters)
+                query = query.filter(ShopOrder.status == status)
+            query = query.offset(skip).limit(limit)
         
-        return orders
+        return fast_json_response(fetch_rows(query), response)
     except HTTPException:
         raise
     except Exception as e:
@@ -305,6 +431,72 @@ async def update_shop_order_arrival_status(
         raise HTTPException(status_code=500, detail="Ошибка обновления статуса прибытия заказа")
 
 
+# API для склада
+@router.post("/labels")
+async def create_label_sheet(request_data: LabelSheetRequest, db: Session = Depends(get_db)):
+    """PDF лист QR-этикеток для заказов или товаров"""
+    try:
+        if not check_admin_access():
+            raise HTTPException(status_code=403, detail="Доступ запрещен")
+        
+        if len(request_data.codes) > settings.label_batch_max:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Слишком много этикеток: максимум {settings.label_batch_max}"
+            )
+        
+        labels = collect_labels(db, request_data.kind, request_data.codes)
+        if not labels:
+            raise HTTPException(status_code=404, detail="Ни один код не найден")
+        
+        pdf = await label_generator.generate(labels, request_data.box_size or settings.qr_png_box_size)
+        
+        return Response(
+            content=pdf,
+            media_type="application/pdf",
+            headers={
+                "Content-Disposition": f'attachment; filename="labels-{request_data.kind}.pdf"',
+                "X-Labels-Count": str(len(labels))
+            }
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating label sheet: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка генерации этикеток")
+
+
+@router.post("/scan/issue")
+async def issue_scanned_orders(request_data: ScanIssueRequest, db: Session = Depends(get_db)):
+    """
+    Выдача заказов по пачке отсканированных QR-кодов
+    
+    Все выдачи сохраняются одной транзакцией; для каждого скана
+    возвращается свой результат в порядке сканирования.
+    """
+    try:
+        if not check_admin_access():
+            raise HTTPException(status_code=403, detail="Доступ запрещен")
+        
+        if len(request_data.payloads) > settings.scan_issue_batch_max:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Слишком много QR-кодов: максимум {settings.scan_issue_batch_max}"
+            )
+        
+        results = OrderIssueService(db).issue_scanned(request_data.payloads)
+        
+        return {
+            "results": results,
+            "issued": sum(1 for result in results if result["result"] == "issued")
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error issuing scanned orders: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка выдачи заказов")
+
+
 # API для статистики
 @router.get("/statistics/products")
 async def get_product_statistics(db: Session = Depends(get_db)):
@@ -0,0 +1,65 @@
+"""
+Раздача изображений товаров
+"""
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+import os
+import logging
+
+from app.services.image_service import IMAGE_VARIANTS, IMAGE_FORMATS, CONTENT_HASH_RE, variant_path
+from app.services.order_qr_service import QR_FORMATS, qr_file_path
+from app.static_assets import IMMUTABLE_CACHE_CONTROL
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/media", tags=["media"])
+
+# MIME типы уменьшенных копий
+MEDIA_TYPES = {
+    "webp": "image/webp",
+    "jpg": "image/jpeg",
+    "svg": "image/svg+xml",
+    "png": "image/png"
+}
+
+
+@router.get("/images/{content_hash}/{variant}.{fmt}")
+async def get_image_variant(content_hash: str, variant: str, fmt: str):
+    """
+    Уменьшенная копия изображения
+    
+    Адрес зависит от хэша содержимого, поэтому файл кэшируется навсегда.
+    """
+    if not CONTENT_HASH_RE.match(content_hash) or variant not in IMAGE_VARIANTS or fmt not in IMAGE_FORMATS:
+        raise HTTPException(status_code=404, detail="Изображение не найдено")
+    
+    path = variant_path(content_hash, variant, fmt)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Изображение не найдено")
+    
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    )
+
+
+@router.get("/qr/{digest}.{fmt}")
+async def get_order_qr(digest: str, fmt: str):
+    """
+    Сохраненный QR-код заказа
+    
+    Имя файла - хэш данных QR-кода, которые не меняются, поэтому файл
+    кэшируется навсегда.
+    """
+    if not CONTENT_HASH_RE.match(digest) or fmt not in QR_FORMATS:
+        raise HTTPException(status_code=404, detail="QR-код не найден")
+    
+    path = qr_file_path(digest, fmt)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="QR-код не найден")
+    
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    )
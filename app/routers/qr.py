@@ -0,0 +1,91 @@
+"""
+Изображения QR-кодов заказов и товаров
+"""
+from fastapi import APIRouter, Request, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session
+from typing import Optional
+import logging
+
+from app.config import settings
+from app.db import get_db
+from app.rate_limit import limit_tracking_requests
+from app.http_cache import make_etag, conditional_response, CACHE_PRIVATE_REVALIDATE
+from app.services.order_qr_service import OrderQRService, QR_KINDS
+from app.services.qr_service import qr_service, QR_BACKENDS
+from app.static_assets import IMMUTABLE_CACHE_CONTROL
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/qr", tags=["qr"])
+
+# Форматы по расширению: бэкенд отрисовки (svg - из настроек)
+IMAGE_FORMATS = ("svg", "png", "json")
+
+
+def format_backend(fmt: str) -> str:
+    """Бэкенд отрисовки для расширения адреса"""
+    if fmt == "svg":
+        return settings.qr_svg_backend
+    return "matrix" if fmt == "json" else fmt
+
+
+@router.get("/{kind}/{code}.{fmt}")
+async def get_qr_image(
+    kind: str,
+    code: str,
+    fmt: str,
+    request: Request,
+    response: Response,
+    size: Optional[int] = Query(None, ge=1, le=40, description="Размер модуля в пикселях"),
+    version: Optional[int] = Query(None, ge=1, le=40, description="Версия QR-кода"),
+    ec: Optional[str] = Query(None, pattern="^[LMQH]$", description="Уровень коррекции ошибок"),
+    db: Session = Depends(get_db)
+):
+    """
+    QR-код заказа (по коду) или товара (по ID) в SVG, PNG или JSON
+    
+    JSON - матрица модулей для отрисовки на клиенте. QR-код товара не
+    меняется и кэшируется навсегда. Данные QR-кода заказа меняются при
+    повторной подписи (смена ключа), поэтому браузер проверяет их по ETag
+    при каждом показе. Отрисованные изображения хранятся в LRU кэше процесса.
+    """
+    try:
+        if kind not in QR_KINDS or fmt not in IMAGE_FORMATS:
+            raise HTTPException(status_code=404, detail="QR-код не найден")
+        
+        # QR-код заказа - тот же публичный поиск по коду, что и отслеживание
+        if kind == "order":
+            limit_tracking_requests(request)
+        
+        payload = OrderQRService(db).get_payloads(kind, [code]).get(code)
+        if not payload:
+            raise HTTPException(status_code=404, detail="QR-код не найден")
+        
+        box_size = size or settings.qr_png_box_size
+        backend = format_backend(fmt)
+        # QR-код заказа содержит токен отслеживания, его не кэшируют общие прокси;
+        # адрес не зависит от данных, поэтому браузер каждый раз сверяет ETag
+        cache_control = CACHE_PRIVATE_REVALIDATE if kind == "order" else IMMUTABLE_CACHE_CONTROL
+        etag = make_etag(
+            payload, backend, box_size,
+            version or settings.qr_version, ec or settings.qr_error_correction
+        )
+        not_modified = conditional_response(request, response, etag, None, cache_control)
+        if not_modified:
+            return not_modified
+        
+        try:
+            content = qr_service.render(payload, backend, box_size, version, ec)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return Response(
+            content=content,
+            media_type=QR_BACKENDS[backend],
+            headers=dict(response.headers)
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error rendering QR image {kind}/{code}.{fmt}: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка генерации QR-кода")
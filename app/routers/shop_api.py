@@ -1,42 +1,37 @@
 """
 API для магазина
 """
-from fastapi import APIRouter, Depends, HTTPException, Form
+from fastapi import APIRouter, Depends, HTTPException, Form, Request, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import logging
 
 from app.db import get_db
 from app.models.product import Product
 from app.models.order import ShopCart
-from app.schemas.order import ShopCartSummary, ShopCartItem
+from app.schemas.order import ShopCartSummary, ShopCartItem, ShopCartBatchRequest
+from app.services.order_service import ShopCartService
 from app.constants.delivery import calculate_delivery_cost, DeliveryOption
+from app.config import settings
+from app.services.product_service import ProductService
+from app.services.checkout_service import CheckoutQueueService
+from app.services.suggest_index import suggest_index
+from app.fast_json import fast_json_response, fetch_rows, fetch_sparse_row, field_names, parse_fields, select_columns
+from app.http_cache import collection_version, row_version, mapping_version, conditional_response, CACHE_PUBLIC_PRODUCTS
+from app.services.cart_session import get_session_id, get_cart_count as get_session_cart_count, set_cart_count, adjust_cart_count
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/shop", tags=["shop"])
 
 
-def get_session_id(request) -> str:
-    """
-    Получение ID сессии из запроса
-    """
-    session_id = request.session.get("session_id")
-    if not session_id:
-        import uuid
-        session_id = str(uuid.uuid4())
-        request.session["session_id"] = session_id
-    return session_id
-
-
 @router.get("/cart/count")
-async def get_cart_count(request, db: Session = Depends(get_db)):
+async def get_cart_count(request: Request, db: Session = Depends(get_db)):
     """
     Получение количества товаров в корзине
     """
     try:
-        session_id = get_session_id(request)
-        count = db.query(ShopCart).filter(ShopCart.session_id == session_id).count()
-        return {"count": count}
+        return {"count": get_session_cart_count(request, db)}
     except Exception as e:
         logger.error(f"Error getting cart count: {e}")
         raise HTTPException(status_code=500, detail="Ошибка получения количества товаров в корзине")
@@ -46,7 +41,7 @@ async def get_cart_count(request, db: Session = Depends(get_db)):
 async def add_to_cart(
     product_id: int,
     quantity: int,
-    request,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
@@ -83,6 +78,9 @@ async def add_to_cart(
         
         db.commit()
         
+        if not existing_item:
+            adjust_cart_count(request, 1)
+        
         return {"success": True, "message": "Товар добавлен в корзину"}
         
     except HTTPException:
@@ -95,9 +93,9 @@ async def add_to_cart(
 
 @router.post("/cart/add-form")
 async def add_to_cart_form(
+    request: Request,
     product_id: int = Form(...),
     quantity: int = Form(...),
-    request=None,
     db: Session = Depends(get_db)
 ):
     """
@@ -110,7 +108,7 @@ async def add_to_cart_form(
 async def update_cart_item(
     product_id: int,
     quantity: int,
-    request,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
@@ -127,7 +125,8 @@ async def update_cart_item(
         if not cart_item:
             raise HTTPException(status_code=404, detail="Товар не найден в корзине")
         
-        if quantity <= 0:
+        removed = quantity <= 0
+        if removed:
             # Удаляем товар из корзины
             db.delete(cart_item)
         else:
@@ -140,6 +139,9 @@ async def update_cart_item(
         
         db.commit()
         
+        if removed:
+            adjust_cart_count(request, -1)
+        
         return {"success": True, "message": "Корзина обновлена"}
         
     except HTTPException:
@@ -153,7 +155,7 @@ async def update_cart_item(
 @router.delete("/cart/remove/{product_id}")
 async def remove_from_cart(
     product_id: int,
-    request,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
@@ -173,6 +175,8 @@ async def remove_from_cart(
         db.delete(cart_item)
         db.commit()
         
+        adjust_cart_count(request, -1)
+        
         return {"success": True, "message": "Товар удален из корзины"}
         
     except HTTPException:
@@ -184,7 +188,7 @@ async def remove_from_cart(
 
 
 @router.get("/cart")
-async def get_cart(request, db: Session = Depends(get_db)):
+async def get_cart(request: Request, db: Session = Depends(get_db)):
     """
     Получение содержимого корзины
     """
@@ -211,6 +215,8 @@ async def get_cart(request, db: Session = Depends(get_db)):
                 })
                 total_amount += item_total
         
+        set_cart_count(request, len(cart_items))
+        
         return ShopCartSummary(
             items=items,
             total_items=len(items),
@@ -222,8 +228,47 @@ async def get_cart(request, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Ошибка получения корзины")
 
 
+@router.patch("/cart", response_model=ShopCartSummary)
+async def batch_update_cart(
+    request: Request,
+    batch: ShopCartBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Пакетное изменение корзины
+    
+    Применяет список операций add/set/remove в одной транзакции и
+    возвращает пересчитанную корзину.
+    """
+    try:
+        if len(batch.operations) > settings.cart_batch_max_operations:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Слишком много операций: максимум {settings.cart_batch_max_operations}"
+            )
+        
+        session_id = get_session_id(request)
+        
+        summary = ShopCartService(db).apply_operations(
+            session_id,
+            [operation.model_dump() for operation in batch.operations]
+        )
+        
+        set_cart_count(request, summary["total_items"])
+        
+        return ShopCartSummary(**summary)
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error applying cart operations: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка обновления корзины")
+
+
 @router.delete("/cart/clear")
-async def clear_cart(request, db: Session = Depends(get_db)):
+async def clear_cart(request: Request, db: Session = Depends(get_db)):
     """
     Очистка корзины
     """
@@ -233,6 +278,8 @@ async def clear_cart(request, db: Session = Depends(get_db)):
         db.query(ShopCart).filter(ShopCart.session_id == session_id).delete()
         db.commit()
         
+        set_cart_count(request, 0)
+        
         return {"success": True, "message": "Корзина очищена"}
         
     except Exception as e:
@@ -241,51 +288,165 @@ async def clear_cart(request, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Ошибка очистки корзины")
 
 
+@router.get("/checkout/{token}")
+async def get_checkout_status(token: str, db: Session = Depends(get_db)):
+    """
+    Получение статуса асинхронного оформления заказа
+    """
+    status = CheckoutQueueService(db).get_status(token)
+    if not status:
+        raise HTTPException(status_code=404, detail="Заявка не найдена")
+    
+    return status
+
+
+@router.get("/catalog")
+async def get_catalog_page(
+    sort: str = "newest",
+    cursor: Optional[str] = None,
+    limit: int = Query(None, ge=1),
+    status: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Страница каталога для бесконечной прокрутки
+    
+    Возвращает только поля карточки товара и курсор следующей страницы.
+    """
+    try:
+        limit = min(limit or settings.catalog_page_size, settings.catalog_page_size_max)
+        page = ProductService(db).get_catalog_page(sort=sort, cursor=cursor, limit=limit, status=status)
+        
+        for item in page["items"]:
+            item["sell_price_rub"] = float(item["sell_price_rub"] or 0)
+        
+        return page
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting catalog page: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка получения каталога")
+
+
+@router.get("/suggest")
+async def suggest_products(
+    q: str = Query("", max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    """
+    Подсказки поиска по названию и поставщику
+    
+    Ответ строится из индекса в памяти; БД используется только
+    для первого построения индекса в воркере (в пуле потоков, если
+    запрос пришел раньше построения при запуске).
+    """
+    try:
+        if not suggest_index.is_built:
+            await run_in_threadpool(suggest_index.ensure_built, db)
+        
+        return {"query": q, "items": suggest_index.search(q, limit)}
+    except Exception as e:
+        logger.error(f"Error getting suggestions: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка получения подсказок")
+
+
 @router.get("/products")
 async def get_products(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 20,
     status: str = None,
+    fields: Optional[str] = Query(None, description="Поля через запятую, например id,name,sell_price_rub"),
     db: Session = Depends(get_db)
 ):
     """
     Получение списка товаров
     """
     try:
+        try:
+            names = parse_fields(fields, field_names(Product)) or field_names(Product)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
         query = db.query(Product)
         
         if status:
             query = query.filter(Product.availability_status == status)
         
+        etag, last_modified = collection_version(query, Product)
+        not_modified = conditional_response(request, response, etag, last_modified, CACHE_PUBLIC_PRODUCTS)
+        if not_modified:
+            return not_modified
+        
         total = query.count()
-        products = query.offset(skip).limit(limit).all()
         
-        return {
-            "products": products,
+        # Строки читаются кортежами и кодируются orjson без ORM и Pydantic
+        product_rows = query.with_entities(*select_columns(Product, names)).offset(skip).limit(limit)
+        
+        return fast_json_response({
+            "products": fetch_rows(product_rows, decimals=float),
             "total": total,
             "skip": skip,
             "limit": limit
-        }
+        }, response)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting products: {e}")
         raise HTTPException(status_code=500, detail="Ошибка получения товаров")
 
 
 @router.get("/products/{product_id}")
-async def get_product(product_id: int, db: Session = Depends(get_db)):
+async def get_product(
+    product_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Поля через запятую, например id,name,sell_price_rub"),
+    db: Session = Depends(get_db)
+):
     """
     Получение товара по ID
     """
     try:
+        if fields:
+            return get_sparse_product(product_id, fields, request, response, db)
+        
         product = db.query(Product).filter(Product.id == product_id).first()
         if not product:
             raise HTTPException(status_code=404, detail="Товар не найден")
         
+        etag, last_modified = row_version(product)
+        not_modified = conditional_response(request, response, etag, last_modified, CACHE_PUBLIC_PRODUCTS)
+        if not_modified:
+            return not_modified
+        
         return product
         
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error getting product: {e}")
-        raise HTTPException(status_code=500, detail="Ошибка получения товара")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Ошибка получения товара")
+
+
+def get_sparse_product(product_id: int, fields: str, request: Request, response: Response, db: Session):
+    """Товар только с запрошенными полями"""
+    try:
+        names = parse_fields(fields, field_names(Product))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    data, row = fetch_sparse_row(db.query(Product).filter(Product.id == product_id), Product, names, decimals=float)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Товар не найден")
+    
+    etag, last_modified = mapping_version("Product", row)
+    not_modified = conditional_response(request, response, etag, last_modified, CACHE_PUBLIC_PRODUCTS)
+    if not_modified:
+        return not_modified
+    
+    return fast_json_response(data, response)
@@ -1,23 +1,42 @@
 """
 Роутер для отслеживания заказов
 """
-from fastapi import APIRouter, Request, Depends, HTTPException, Query
-from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Request, Depends, HTTPException, Query, Response
+from fastapi.responses import HTMLResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from types import SimpleNamespace
 from typing import Optional
+import asyncio
 import logging
 
+from app.config import settings
 from app.db import get_db
+from app.templating import templates
 from app.models.order import Order, ShopOrder
+from app.schemas.order import TrackingBulkRequest
 from app.services.qr_service import qr_service
-from app.services.order_service import OrderService, ShopOrderService
+from app.services.order_code_registry import OrderCodeRegistry
+from app.services.order_qr_service import OrderQRService, qr_urls
+from app.services.order_events import order_events
+from app.rate_limit import limit_tracking_requests, charge_tracking_misses
+from app.sse import format_event, format_comment, EVENT_STREAM_MEDIA_TYPE, SSE_HEADERS
+from app.http_cache import row_version, conditional_response, CACHE_PRIVATE_REVALIDATE
+from app.fast_json import parse_fields
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+# Все маршруты отслеживания публичны: запросы с одного IP ограничены
+router = APIRouter(dependencies=[Depends(limit_tracking_requests)])
 
-# Настройка шаблонов
-templates = Jinja2Templates(directory="app/templates")
+# Поля ответа API отслеживания, доступные через fields=
+TRACKING_FIELDS = [
+    "order_code",
+    "order_type",
+    "status",
+    "status_text",
+    "status_description",
+    "created_at",
+    "updated_at"
+]
 
 
 @router.get("/track/{order_code}", response_class=HTMLResponse)
@@ -31,18 +50,16 @@ async def track_order(
     Страница отслеживания заказа
     """
     try:
-        # Ищем заказ в обеих таблицах
-        order_service = OrderService(db)
-        shop_order_service = ShopOrderService(db)
-        
-        # Сначала ищем в заказах магазина
-        order = shop_order_service.get_by_code(order_code)
-        order_type = "shop_order"
+        # Подпись токена проверяется до обращения к БД
+        token_order_type = qr_service.identify_order_token(order_code, token) if token else None
+        if token and not token_order_type:
+            return templates.TemplateResponse("tracking/invalid_token.html", {
+                "request": request,
+                "order_code": order_code
+            })
         
-        if not order:
-            # Если не найден в заказах магазина, ищем в обычных заказах
-            order = order_service.get_by_code(order_code)
-            order_type = "order"
+        # Заказ любого типа находится одним запросом через реестр кодов
+        order, order_type = OrderCodeRegistry(db).resolve(order_code)
         
         if not order:
             return templates.TemplateResponse("tracking/order_not_found.html", {
@@ -50,14 +67,11 @@ async def track_order(
                 "order_code": order_code
             })
         
-        # Валидация токена (если передан)
-        if token:
-            qr_data = f"{order_type}:{order_code}:{token}"
-            if not qr_service.validate_qr_token(qr_data, order_type):
-                return templates.TemplateResponse("tracking/invalid_token.html", {
-                    "request": request,
-                    "order_code": order_code
-                })
+        if token and token_order_type != order_type:
+            return templates.TemplateResponse("tracking/invalid_token.html", {
+                "request": request,
+                "order_code": order_code
+            })
         
         # Определяем статус заказа
         status_info = get_order_status_info(order, order_type)
@@ -90,18 +104,8 @@ async def track_order_qr(
     Страница отслеживания заказа с QR-кодом
     """
     try:
-        # Ищем заказ в обеих таблицах
-        order_service = OrderService(db)
-        shop_order_service = ShopOrderService(db)
-        
-        # Сначала ищем в заказах магазина
-        order = shop_order_service.get_by_code(order_code)
-        order_type = "shop_order"
-        
-        if not order:
-            # Если не найден в заказах магазина, ищем в обычных заказах
-            order = order_service.get_by_code(order_code)
-            order_type = "order"
+        # Заказ любого типа находится одним запросом через реестр кодов
+        order, order_type = OrderCodeRegistry(db).resolve(order_code)
         
         if not order:
             return templates.TemplateResponse("tracking/order_not_found.html", {
@@ -109,13 +113,9 @@ async def track_order_qr(
                 "order_code": order_code
             })
         
-        # Генерируем QR-код
-        if order_type == "shop_order":
-            qr_data = qr_service.generate_shop_order_qr_code(order_code, order.id)
-        else:
-            qr_data = qr_service.generate_order_qr_code(order_code, order.id)
-        
-        if not qr_data:
+        # QR-код отрисован заранее фоновой задачей; страница ссылается на файл
+        qr_image_path = OrderQRService(db).ensure_rendered(order, order_type)
+        if not qr_image_path:
             raise HTTPException(status_code=500, detail="Ошибка генерации QR-кода")
         
         # Определяем статус заказа
@@ -126,7 +126,7 @@ async def track_order_qr(
             "order": order,
             "order_type": order_type,
             "status_info": status_info,
-            "qr_data": qr_data
+            "qr_urls": qr_urls(qr_image_path)
         }
         
         return templates.TemplateResponse("tracking/order_qr.html", context)
@@ -143,54 +143,190 @@ async def track_order_qr(
 
 @router.get("/api/track/{order_code}")
 async def track_order_api(
+    request: Request,
+    response: Response,
     order_code: str,
     token: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Поля через запятую, например status,status_text"),
     db: Session = Depends(get_db)
 ):
     """
     API для отслеживания заказа
     """
     try:
-        # Ищем заказ в обеих таблицах
-        order_service = OrderService(db)
-        shop_order_service = ShopOrderService(db)
+        try:
+            names = parse_fields(fields, TRACKING_FIELDS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Сначала ищем в заказах магазина
-        order = shop_order_service.get_by_code(order_code)
-        order_type = "shop_order"
+        # Подпись токена проверяется до обращения к БД
+        token_order_type = qr_service.identify_order_token(order_code, token) if token else None
+        if token and not token_order_type:
+            raise HTTPException(status_code=403, detail="Неверный токен")
+        
+        # Заказ любого типа находится одним запросом через реестр кодов
+        order, order_type = OrderCodeRegistry(db).resolve(order_code)
         
         if not order:
-            # Если не найден в заказах магазина, ищем в обычных заказах
-            order = order_service.get_by_code(order_code)
-            order_type = "order"
+            raise HTTPException(status_code=404, detail="Заказ не найден")
+        
+        if token and token_order_type != order_type:
+            raise HTTPException(status_code=403, detail="Неверный токен")
+        
+        etag, last_modified = row_version(order)
+        not_modified = conditional_response(request, response, etag, last_modified, CACHE_PRIVATE_REVALIDATE)
+        if not_modified:
+            return not_modified
         
+        data = get_tracking_data(order_code, order, order_type)
+        
+        if names:
+            data = {name: data[name] for name in names}
+        return data
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error tracking order API {order_code}: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка отслеживания заказа")
+
+
+@router.get("/api/track/{order_code}/events")
+async def track_order_events(
+    request: Request,
+    order_code: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Поток событий статуса заказа (Server-Sent Events)
+    
+    Сначала отправляется текущий статус, затем изменения по мере их
+    публикации сервисами заказов.
+    """
+    # Подписка до чтения заказа, чтобы не потерять изменение между ними
+    queue = order_events.subscribe(order_code)
+    try:
+        order, order_type = OrderCodeRegistry(db).resolve(order_code)
         if not order:
             raise HTTPException(status_code=404, detail="Заказ не найден")
         
-        # Валидация токена (если передан)
-        if token:
-            qr_data = f"{order_type}:{order_code}:{token}"
-            if not qr_service.validate_qr_token(qr_data, order_type):
-                raise HTTPException(status_code=403, detail="Неверный токен")
+        initial = get_tracking_data(order_code, order, order_type)
+    except Exception:
+        order_events.unsubscribe(order_code, queue)
+        raise
+    finally:
+        # Соединение с БД не удерживается на все время потока
+        db.close()
+    
+    async def stream():
+        try:
+            yield format_event(initial, "status")
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.sse_keepalive_seconds)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield format_comment()
+                    continue
+                yield format_event(get_event_tracking_data(event), "status")
+        finally:
+            order_events.unsubscribe(order_code, queue)
+    
+    return StreamingResponse(stream(), media_type=EVENT_STREAM_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
+@router.post("/api/track/bulk")
+async def track_orders_bulk(
+    request: Request,
+    request_data: TrackingBulkRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Пакетное отслеживание заказов
+    
+    Все коды находятся одним запросом с IN по реестру кодов вместе с
+    заказами обеих таблиц.
+    """
+    try:
+        if len(request_data.codes) > settings.tracking_bulk_max_codes:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Слишком много кодов: максимум {settings.tracking_bulk_max_codes}"
+            )
+        
+        found = OrderCodeRegistry(db).resolve_many(request_data.codes)
         
-        # Определяем статус заказа
-        status_info = get_order_status_info(order, order_type)
+        orders = {}
+        not_found = []
+        for order_code in dict.fromkeys(request_data.codes):
+            if order_code in found:
+                order, order_type = found[order_code]
+                orders[order_code] = get_tracking_data(order_code, order, order_type)
+            else:
+                not_found.append(order_code)
+        
+        charge_tracking_misses(request, len(not_found))
         
         return {
-            "order_code": order_code,
-            "order_type": order_type,
-            "status": status_info["status"],
-            "status_text": status_info["status_text"],
-            "status_description": status_info["status_description"],
-            "created_at": order.created_at.isoformat(),
-            "updated_at": order.updated_at.isoformat() if order.updated_at else None
+            "orders": orders,
+            "not_found": not_found
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error tracking order API {order_code}: {e}")
-        raise HTTPException(status_code=500, detail="Ошибка отслеживания заказа")
+        logger.error(f"Error tracking orders in bulk: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка отслеживания заказов")
+
+
+def get_tracking_data(order_code: str, order, order_type: str) -> dict:
+    """
+    Данные ответа API отслеживания
+    
+    Args:
+        order_code: Код заказа
+        order: Объект заказа
+        order_type: Тип заказа (order или shop_order)
+        
+    Returns:
+        Словарь с полями TRACKING_FIELDS
+    """
+    status_info = get_order_status_info(order, order_type)
+    return {
+        "order_code": order_code,
+        "order_type": order_type,
+        "status": status_info["status"],
+        "status_text": status_info["status_text"],
+        "status_description": status_info["status_description"],
+        "created_at": order.created_at.isoformat(),
+        "updated_at": order.updated_at.isoformat() if order.updated_at else None
+    }
+
+
+def get_event_tracking_data(event: dict) -> dict:
+    """
+    Данные ответа API отслеживания по событию заказа (без обращения к БД)
+    
+    Args:
+        event: Событие из order_events
+        
+    Returns:
+        Словарь с полями TRACKING_FIELDS
+    """
+    status_info = get_order_status_info(
+        SimpleNamespace(status=event["status"], arrival_status=event["arrival_status"]),
+        event["order_type"]
+    )
+    return {
+        "order_code": event["order_code"],
+        "order_type": event["order_type"],
+        "status": status_info["status"],
+        "status_text": status_info["status_text"],
+        "status_description": status_info["status_description"],
+        "created_at": event["created_at"],
+        "updated_at": event["updated_at"]
+    }
 
 
 def get_order_status_info(order, order_type: str) -> dict:
@@ -3,12 +3,12 @@
 """
 from fastapi import APIRouter, Request, Depends, HTTPException, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from typing import Optional
 import logging
 
 from app.db import get_db
+from app.templating import templates
 from app.models.product import Product
 from app.models.order import Order, ShopOrder
 from app.models.user import User
@@ -18,9 +18,6 @@ from app.services.order_service import OrderService, ShopOrderService
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Настройка шаблонов
-templates = Jinja2Templates(directory="app/templates")
-
 
 def check_admin_access(request: Request):
     """Проверка прав администратора"""
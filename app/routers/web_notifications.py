@@ -3,21 +3,18 @@
 """
 from fastapi import APIRouter, Request, Depends, HTTPException, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from typing import Optional
 import logging
 
 from app.db import get_db
+from app.templating import templates
 from app.services.order_service import ShopOrderService
 from app.services.whatsapp_service import whatsapp_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Настройка шаблонов
-templates = Jinja2Templates(directory="app/templates")
-
 
 def check_admin_access(request: Request):
     """Проверка прав администратора"""
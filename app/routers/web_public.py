@@ -3,20 +3,17 @@
 """
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 import logging
 
 from app.db import get_db
-from app.models.product import Product
-from app.models.order import Order, ShopOrder
+from app.templating import templates
+from app.services.homepage_service import homepage_cache
+from app.cache import page_cache_key, get_cached_page, cache_page
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Настройка шаблонов
-templates = Jinja2Templates(directory="app/templates")
-
 
 @router.get("/", response_class=HTMLResponse)
 async def index(request: Request, db: Session = Depends(get_db)):
@@ -24,23 +21,21 @@ async def index(request: Request, db: Session = Depends(get_db)):
     Главная страница
     """
     try:
-        # Получаем статистику для главной страницы
-        total_products = db.query(Product).count()
-        total_orders = db.query(Order).count()
-        total_shop_orders = db.query(ShopOrder).count()
-        
-        # Получаем последние товары
-        recent_products = db.query(Product).order_by(Product.created_at.desc()).limit(6).all()
+        cache_key = page_cache_key(request)
+        cached = get_cached_page(cache_key)
+        if cached is not None:
+            return HTMLResponse(cached)
         
+        # Счетчики и последние товары берутся из кэша
         context = {
             "request": request,
-            "total_products": total_products,
-            "total_orders": total_orders,
-            "total_shop_orders": total_shop_orders,
-            "recent_products": recent_products
+            "recent_products": homepage_cache.get_recent_products(db),
+            **homepage_cache.get_counters(db)
         }
         
-        return templates.TemplateResponse("index.html", context)
+        response = templates.TemplateResponse("index.html", context)
+        cache_page(cache_key, response.body)
+        return response
     except Exception as e:
         logger.error(f"Error loading index page: {e}")
         return templates.TemplateResponse("error.html", {
@@ -3,56 +3,69 @@
 """
 from fastapi import APIRouter, Request, Depends, Form, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from typing import Optional
 import logging
 
+from app.config import settings
 from app.db import get_db
+from app.templating import templates
 from app.models.product import Product
 from app.models.order import ShopOrder, ShopCart
 from app.schemas.order import ShopOrderCreate, ShopCartSummary
 from app.constants.delivery import DeliveryOption, calculate_delivery_cost, get_delivery_description
+from app.services.cart_session import get_session_id, set_cart_count
+from app.services.checkout_service import CheckoutQueueService, build_shop_orders
+from app.services.product_service import ProductService, CATALOG_SORTS
+from app.cache import page_cache_key, get_cached_page, cache_page
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Настройка шаблонов
-templates = Jinja2Templates(directory="app/templates")
-
-
-def get_session_id(request: Request) -> str:
-    """
-    Получение ID сессии из запроса
-    """
-    session_id = request.session.get("session_id")
-    if not session_id:
-        import uuid
-        session_id = str(uuid.uuid4())
-        request.session["session_id"] = session_id
-    return session_id
-
 
 @router.get("/shop/", response_class=HTMLResponse)
-async def shop_catalog(request: Request, db: Session = Depends(get_db)):
+async def shop_catalog(
+    request: Request,
+    sort: str = "newest",
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
     """
     Каталог товаров магазина
+    
+    Рендерится только первая страница (или страница по курсору),
+    следующие страницы подгружаются через /api/shop/catalog.
+    Страница не зависит от сессии и кэшируется; счетчик корзины
+    подгружается на клиенте.
     """
     try:
-        # Получаем товары с фильтрацией
-        products = db.query(Product).filter(Product.quantity > 0).all()
+        cache_key = page_cache_key(request, ("sort", "status", "cursor"))
+        cached = get_cached_page(cache_key)
+        if cached is not None:
+            return HTMLResponse(cached)
         
-        # Получаем количество товаров в корзине
-        session_id = get_session_id(request)
-        cart_count = db.query(ShopCart).filter(ShopCart.session_id == session_id).count()
+        if sort not in CATALOG_SORTS:
+            sort = "newest"
+        
+        # Получаем страницу товаров
+        product_service = ProductService(db)
+        try:
+            page = product_service.get_catalog_page(sort=sort, cursor=cursor, limit=settings.catalog_page_size, status=status)
+        except ValueError:
+            page = product_service.get_catalog_page(sort=sort, limit=settings.catalog_page_size, status=status)
         
         context = {
             "request": request,
-            "products": products,
-            "cart_count": cart_count
+            "products": page["items"],
+            "next_cursor": page["next_cursor"],
+            "current_sort": sort,
+            "current_status": status
         }
         
-        return templates.TemplateResponse("shop/catalog.html", context)
+        response = templates.TemplateResponse("shop/catalog.html", context)
+        cache_page(cache_key, response.body)
+        return response
     except Exception as e:
         logger.error(f"Error loading shop catalog: {e}")
         return templates.TemplateResponse("error.html", {
@@ -67,21 +80,23 @@ async def product_detail(request: Request, product_id: int, db: Session = Depend
     Страница товара
     """
     try:
+        cache_key = page_cache_key(request)
+        cached = get_cached_page(cache_key)
+        if cached is not None:
+            return HTMLResponse(cached)
+        
         product = db.query(Product).filter(Product.id == product_id).first()
         if not product:
             raise HTTPException(status_code=404, detail="Товар не найден")
         
-        # Получаем количество товаров в корзине
-        session_id = get_session_id(request)
-        cart_count = db.query(ShopCart).filter(ShopCart.session_id == session_id).count()
-        
         context = {
             "request": request,
-            "product": product,
-            "cart_count": cart_count
+            "product": product
         }
         
-        return templates.TemplateResponse("shop/product_detail.html", context)
+        response = templates.TemplateResponse("shop/product_detail.html", context)
+        cache_page(cache_key, response.body)
+        return response
     except HTTPException:
         raise
     except Exception as e:
@@ -120,6 +135,8 @@ async def shop_cart(request: Request, db: Session = Depends(get_db)):
                 })
                 total_amount += item_total
         
+        set_cart_count(request, len(cart_items))
+        
         context = {
             "request": request,
             "cart": {
@@ -169,6 +186,8 @@ async def shop_checkout(request: Request, db: Session = Depends(get_db)):
                 })
                 total_amount += item_total
         
+        set_cart_count(request, len(cart_items))
+        
         # Варианты доставки
         delivery_options = [
             {"value": option.value, "description": get_delivery_description(option)}
@@ -209,9 +228,33 @@ async def process_checkout(
     """
     Обработка оформления заказа
     """
+    customer = {
+        "customer_name": customer_name,
+        "customer_phone": customer_phone,
+        "customer_city": customer_city,
+        "delivery_option": delivery_option,
+        "delivery_city_other": delivery_city_other,
+        "whatsapp_phone": whatsapp_phone,
+        "consent_whatsapp": consent_whatsapp
+    }
+    
     try:
         session_id = get_session_id(request)
         
+        if settings.checkout_async_enabled:
+            # Быстрая проверка входных данных, заказы создаст обработчик очереди
+            try:
+                DeliveryOption(delivery_option)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Неизвестный способ доставки")
+            
+            intent = CheckoutQueueService(db).enqueue(session_id, customer)
+            if not intent:
+                raise HTTPException(status_code=400, detail="Корзина пуста")
+            
+            set_cart_count(request, 0)
+            return RedirectResponse(url=f"/shop/order-success?token={intent.token}", status_code=302)
+        
         # Получаем товары в корзине
         cart_items = db.query(ShopCart).filter(ShopCart.session_id == session_id).all()
         
@@ -219,41 +262,11 @@ async def process_checkout(
             raise HTTPException(status_code=400, detail="Корзина пуста")
         
         # Создаем заказы для каждого товара в корзине
-        created_orders = []
-        
-        for item in cart_items:
-            product = db.query(Product).filter(Product.id == item.product_id).first()
-            if not product:
-                continue
-            
-            # Генерируем код заказа
-            import uuid
-            order_code = f"A-{str(uuid.uuid4())[:6].upper()}"
-            
-            # Рассчитываем стоимость доставки
-            delivery_cost = calculate_delivery_cost(DeliveryOption(delivery_option), item.quantity)
-            
-            # Создаем заказ
-            order = ShopOrder(
-                order_code=order_code,
-                order_code_last4=order_code[-4:],
-                customer_name=customer_name,
-                customer_phone=customer_phone,
-                customer_city=customer_city,
-                product_id=product.id,
-                product_name=product.name,
-                quantity=item.quantity,
-                unit_price_rub=product.sell_price_rub,
-                total_amount=float(product.sell_price_rub or 0) * item.quantity + delivery_cost,
-                delivery_option=delivery_option,
-                delivery_city_other=delivery_city_other,
-                delivery_cost_rub=delivery_cost,
-                whatsapp_phone=whatsapp_phone,
-                consent_whatsapp=consent_whatsapp
-            )
-            
-            db.add(order)
-            created_orders.append(order)
+        created_orders = build_shop_orders(
+            db,
+            [{"product_id": item.product_id, "quantity": item.quantity} for item in cart_items],
+            customer
+        )
         
         # Очищаем корзину
         db.query(ShopCart).filter(ShopCart.session_id == session_id).delete()
@@ -261,9 +274,13 @@ async def process_checkout(
         # Сохраняем изменения
         db.commit()
         
+        set_cart_count(request, 0)
+        
         # Перенаправляем на страницу успеха
         return RedirectResponse(url=f"/shop/order-success?orders={','.join([o.order_code for o in created_orders])}", status_code=302)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing checkout: {e}")
         db.rollback()
@@ -271,16 +288,20 @@ async def process_checkout(
 
 
 @router.get("/shop/order-success", response_class=HTMLResponse)
-async def order_success(request: Request, orders: str = None):
+async def order_success(request: Request, orders: str = None, token: str = None):
     """
     Страница успешного оформления заказа
+    
+    При асинхронном оформлении вместо кодов заказов передается токен
+    заявки, а страница опрашивает статус ее обработки.
     """
     try:
         order_codes = orders.split(",") if orders else []
         
         context = {
             "request": request,
-            "order_codes": order_codes
+            "order_codes": order_codes,
+            "checkout_token": token
         }
         
         return templates.TemplateResponse("shop/order_success.html", context)
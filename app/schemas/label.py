@@ -0,0 +1,12 @@
+"""
+Pydantic схемы для листов QR-этикеток
+"""
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+
+class LabelSheetRequest(BaseModel):
+    """Схема запроса листа этикеток"""
+    kind: Literal["order", "product"]
+    codes: List[str] = Field(..., min_length=1, description="Коды заказов или ID товаров")
+    box_size: Optional[int] = Field(None, ge=1, le=40, description="Размер модуля QR-кода в пикселях")
@@ -1,8 +1,8 @@
 """
 Pydantic схемы для заказов
 """
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Optional, List, Literal
 from datetime import datetime, date
 from decimal import Decimal
 
@@ -156,8 +156,30 @@ class ShopCartItem(BaseModel):
     quantity: int
 
 
+class ShopCartOperation(BaseModel):
+    """Схема операции пакетного изменения корзины"""
+    op: Literal["add", "set", "remove"]
+    product_id: int
+    quantity: int = 0
+
+
+class ShopCartBatchRequest(BaseModel):
+    """Схема пакетного изменения корзины"""
+    operations: List[ShopCartOperation] = Field(..., min_length=1, description="Операции в порядке применения")
+
+
 class ShopCartSummary(BaseModel):
     """Схема сводки корзины"""
     items: List[dict]
     total_items: int
-    total_amount: Decimal
\ No newline at end of file
+    total_amount: Decimal
+
+
+class TrackingBulkRequest(BaseModel):
+    """Схема пакетного отслеживания заказов"""
+    codes: List[str] = Field(..., min_length=1, description="Коды заказов")
+
+
+class ScanIssueRequest(BaseModel):
+    """Схема выдачи заказов по отсканированным QR-кодам"""
+    payloads: List[str] = Field(..., min_length=1, description="Данные QR-кодов в порядке сканирования")
@@ -0,0 +1,88 @@
+"""
+Сервис очистки брошенных корзин
+"""
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+import logging
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models.order import ShopCart
+from app.monitoring import monitor
+
+logger = logging.getLogger(__name__)
+
+
+class CartCleanupService:
+    """Сервис удаления корзин, которые давно не изменялись"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def cleanup_abandoned_carts(self, max_age_hours: int = None, batch_size: int = None) -> int:
+        """
+        Удаление брошенных корзин небольшими батчами
+
+        Корзина считается брошенной, если ни одна её строка не изменялась
+        дольше max_age_hours. Каждый батч удаляется в отдельной транзакции,
+        чтобы не держать долгую блокировку на запись.
+
+        Args:
+            max_age_hours: Возраст корзины в часах (по умолчанию из настроек)
+            batch_size: Количество сессий в одном батче (по умолчанию из настроек)
+
+        Returns:
+            Количество удаленных строк
+        """
+        max_age_hours = max_age_hours or settings.cart_gc_max_age_hours
+        batch_size = batch_size or settings.cart_gc_batch_size
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=max_age_hours)
+        last_activity = func.coalesce(ShopCart.updated_at, ShopCart.created_at)
+
+        total_deleted = 0
+        try:
+            while True:
+                stale_sessions = self.db.query(ShopCart.session_id).group_by(
+                    ShopCart.session_id
+                ).having(
+                    func.max(last_activity) < cutoff
+                ).limit(batch_size).all()
+
+                session_ids = [row.session_id for row in stale_sessions]
+                if not session_ids:
+                    break
+
+                # Повторная проверка возраста строки защищает товары,
+                # добавленные между выборкой и удалением
+                deleted = self.db.query(ShopCart).filter(
+                    ShopCart.session_id.in_(session_ids),
+                    last_activity < cutoff
+                ).delete(synchronize_session=False)
+                self.db.commit()
+
+                total_deleted += deleted
+
+                if len(session_ids) < batch_size:
+                    break
+        except Exception as e:
+            self.db.rollback()
+            monitor.log_error(e, "cart_gc")
+            raise
+        finally:
+            monitor.increment_counter("cart_gc_runs")
+            monitor.increment_counter("cart_gc_rows_deleted", total_deleted)
+
+        if total_deleted:
+            monitor.log_info(f"Deleted {total_deleted} abandoned cart rows", "cart_gc")
+        logger.info(f"Cart cleanup finished, deleted {total_deleted} rows older than {max_age_hours}h")
+        return total_deleted
+
+
+def run_cart_cleanup() -> int:
+    """Запуск очистки корзин в отдельной сессии БД (для фоновой задачи)"""
+    db = SessionLocal()
+    try:
+        return CartCleanupService(db).cleanup_abandoned_carts()
+    finally:
+        db.close()
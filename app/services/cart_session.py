@@ -0,0 +1,52 @@
+"""
+Данные корзины, хранящиеся в сессии пользователя
+"""
+from sqlalchemy.orm import Session
+import uuid
+
+from app.models.order import ShopCart
+
+# Ключ сессии со счетчиком позиций корзины
+CART_COUNT_KEY = "cart_count"
+
+
+def get_session_id(request) -> str:
+    """
+    Получение ID сессии из запроса
+    """
+    session_id = request.session.get("session_id")
+    if not session_id:
+        session_id = str(uuid.uuid4())
+        request.session["session_id"] = session_id
+    return session_id
+
+
+def get_cart_count(request, db: Session) -> int:
+    """
+    Количество позиций в корзине
+
+    Значение берется из сессии; запрос к БД выполняется только если
+    счетчик еще не был сохранен в сессии.
+    """
+    count = request.session.get(CART_COUNT_KEY)
+    if count is None:
+        session_id = get_session_id(request)
+        count = db.query(ShopCart).filter(ShopCart.session_id == session_id).count()
+        request.session[CART_COUNT_KEY] = count
+    return count
+
+
+def set_cart_count(request, count: int):
+    """Сохранение точного количества позиций корзины в сессии"""
+    request.session[CART_COUNT_KEY] = max(count, 0)
+
+
+def adjust_cart_count(request, delta: int):
+    """
+    Изменение счетчика корзины после мутации
+
+    Если счетчик еще не сохранен, он будет пересчитан при следующем чтении.
+    """
+    count = request.session.get(CART_COUNT_KEY)
+    if count is not None:
+        request.session[CART_COUNT_KEY] = max(count + delta, 0)
@@ -0,0 +1,358 @@
+"""
+Сервис оформления заказов магазина
+"""
+from typing import List, Optional, Dict, Any, Tuple
+from sqlalchemy.orm import Session, Query
+from datetime import datetime, timedelta
+import json
+import logging
+import uuid
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models.product import Product
+from app.models.order import ShopOrder, ShopCart, CheckoutIntent
+from app.constants.delivery import DeliveryOption, calculate_delivery_cost
+from app.services.order_code_registry import OrderCodeRegistry
+from app.services.qr_service import qr_service
+from app.monitoring import monitor
+
+logger = logging.getLogger(__name__)
+
+# Поля покупателя, которые переносятся в заказ
+CUSTOMER_FIELDS = [
+    "customer_name",
+    "customer_phone",
+    "customer_city",
+    "delivery_option",
+    "delivery_city_other",
+    "whatsapp_phone",
+    "consent_whatsapp"
+]
+
+
+def generate_order_code() -> str:
+    """Генерация кода заказа магазина"""
+    return f"A-{str(uuid.uuid4())[:6].upper()}"
+
+
+def build_shop_orders(
+    db: Session,
+    items: List[Dict[str, int]],
+    customer: Dict[str, Any],
+    products: Optional[Dict[int, Product]] = None
+) -> List[ShopOrder]:
+    """
+    Создание заказов магазина по позициям корзины (без коммита)
+
+    Args:
+        db: Сессия БД
+        items: Позиции корзины [{"product_id": ..., "quantity": ...}]
+        customer: Данные покупателя и доставки
+        products: Уже загруженные товары по ID (иначе загружаются одним запросом)
+
+    Returns:
+        Список добавленных в сессию заказов
+    """
+    if products is None:
+        product_ids = {item["product_id"] for item in items}
+        products = {
+            product.id: product
+            for product in db.query(Product).filter(Product.id.in_(product_ids)).all()
+        }
+
+    delivery_option = DeliveryOption(customer["delivery_option"])
+    created_orders = []
+
+    for item in items:
+        product = products.get(item["product_id"])
+        if not product:
+            continue
+
+        order_code = generate_order_code()
+        delivery_cost = calculate_delivery_cost(delivery_option, item["quantity"])
+
+        order = ShopOrder(
+            order_code=order_code,
+            order_code_last4=order_code[-4:],
+            customer_name=customer["customer_name"],
+            customer_phone=customer["customer_phone"],
+            customer_city=customer.get("customer_city"),
+            product_id=product.id,
+            product_name=product.name,
+            quantity=item["quantity"],
+            unit_price_rub=product.sell_price_rub,
+            total_amount=float(product.sell_price_rub or 0) * item["quantity"] + delivery_cost,
+            delivery_option=delivery_option.value,
+            delivery_city_other=customer.get("delivery_city_other"),
+            delivery_cost_rub=delivery_cost,
+            whatsapp_phone=customer.get("whatsapp_phone"),
+            consent_whatsapp=customer.get("consent_whatsapp", True),
+            qr_payload=qr_service.make_order_payload("shop_order", order_code)
+        )
+
+        db.add(order)
+        created_orders.append(order)
+
+    # Коды попадают в реестр в той же транзакции, что и заказы
+    if created_orders:
+        db.flush()
+        registry = OrderCodeRegistry(db)
+        for order in created_orders:
+            registry.register(order, "shop_order")
+
+    return created_orders
+
+
+class CheckoutQueueService:
+    """Сервис очереди асинхронного оформления заказов"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def enqueue(self, session_id: str, customer: Dict[str, Any]) -> Optional[CheckoutIntent]:
+        """
+        Постановка заявки на оформление в очередь
+
+        Снимок корзины сохраняется в заявке, а сама корзина очищается
+        в той же транзакции.
+
+        Returns:
+            Заявка или None, если корзина пуста
+        """
+        try:
+            cart_items = self.db.query(ShopCart).filter(ShopCart.session_id == session_id).all()
+            if not cart_items:
+                return None
+
+            payload = {
+                "customer": {field: customer.get(field) for field in CUSTOMER_FIELDS},
+                "items": [
+                    {"product_id": item.product_id, "quantity": item.quantity}
+                    for item in cart_items
+                ]
+            }
+
+            intent = CheckoutIntent(
+                token=str(uuid.uuid4()),
+                session_id=session_id,
+                payload=json.dumps(payload, ensure_ascii=False),
+                status="pending"
+            )
+            self.db.add(intent)
+
+            self.db.query(ShopCart).filter(ShopCart.session_id == session_id).delete()
+            self.db.commit()
+
+            monitor.increment_counter("checkout_intents_enqueued")
+            logger.info(f"Enqueued checkout intent {intent.token}")
+            return intent
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error enqueuing checkout intent: {e}")
+            raise
+
+    def get_status(self, token: str) -> Optional[Dict[str, Any]]:
+        """Получение статуса заявки по токену"""
+        try:
+            intent = self.db.query(CheckoutIntent).filter(CheckoutIntent.token == token).first()
+            if not intent:
+                return None
+
+            return {
+                "token": intent.token,
+                "status": intent.status,
+                "order_codes": intent.order_codes.split(",") if intent.order_codes else [],
+                "error": intent.error_text
+            }
+        except Exception as e:
+            logger.error(f"Error getting checkout intent status {token}: {e}")
+            return None
+
+    def requeue_stale(self) -> int:
+        """
+        Возврат в очередь заявок, зависших в processing
+
+        Если обработчик упал или перезапустился посреди батча, его заявки
+        остаются в processing. Время захвата хранится в updated_at (других
+        изменений у захваченной заявки нет до конца обработки); заявки,
+        захваченные дольше CHECKOUT_CLAIM_TIMEOUT_SECONDS назад, снова
+        становятся pending, а исчерпавшие попытки - failed.
+
+        Returns:
+            Количество возвращенных и отклоненных заявок
+        """
+        stale = self.db.query(CheckoutIntent).filter(
+            CheckoutIntent.status == "processing",
+            CheckoutIntent.updated_at < datetime.now() - timedelta(seconds=settings.checkout_claim_timeout_seconds)
+        )
+        failed, requeued = self._release(stale, "Обработка заявки прервана")
+        self.db.commit()
+
+        if failed or requeued:
+            logger.warning(f"Stale checkout intents: {requeued} requeued, {failed} failed")
+        return failed + requeued
+
+    def _release(self, intents: Query, error_text: str) -> Tuple[int, int]:
+        """
+        Возврат заявок в очередь (без коммита); исчерпавшие попытки становятся failed
+
+        Returns:
+            (отклонено, возвращено в очередь)
+        """
+        exhausted = CheckoutIntent.attempts + 1 >= settings.batch_retry_attempts
+
+        failed = intents.filter(exhausted).update({
+            "status": "failed",
+            "attempts": CheckoutIntent.attempts + 1,
+            "claimed_by": None,
+            "error_text": error_text
+        }, synchronize_session=False)
+        requeued = intents.filter(~exhausted).update({
+            "status": "pending",
+            "attempts": CheckoutIntent.attempts + 1,
+            "claimed_by": None
+        }, synchronize_session=False)
+        return failed, requeued
+
+    def _claim_batch(self, batch_size: int) -> Tuple[Optional[str], List[CheckoutIntent]]:
+        """
+        Захват батча заявок текущим обработчиком
+
+        Returns:
+            (идентификатор захвата, захваченные заявки)
+        """
+        self.requeue_stale()
+
+        pending_ids = [
+            row.id for row in self.db.query(CheckoutIntent.id).filter(
+                CheckoutIntent.status == "pending"
+            ).order_by(CheckoutIntent.id).limit(batch_size).all()
+        ]
+        if not pending_ids:
+            return None, []
+
+        # Условие по статусу не дает двум обработчикам захватить одну заявку
+        claim_id = str(uuid.uuid4())
+        self.db.query(CheckoutIntent).filter(
+            CheckoutIntent.id.in_(pending_ids),
+            CheckoutIntent.status == "pending"
+        ).update(
+            {"status": "processing", "claimed_by": claim_id, "updated_at": datetime.now()},
+            synchronize_session=False
+        )
+        self.db.commit()
+
+        return claim_id, self.db.query(CheckoutIntent).filter(
+            CheckoutIntent.claimed_by == claim_id
+        ).order_by(CheckoutIntent.id).all()
+
+    def process_batch(self, batch_size: int = None) -> int:
+        """
+        Создание заказов по батчу заявок из очереди
+
+        Все товары батча загружаются одним запросом, а заказы всех заявок
+        сохраняются одним коммитом. Каждая заявка обрабатывается в своей
+        точке сохранения, поэтому ошибка в одной заявке не откатывает
+        остальные.
+
+        Returns:
+            Количество обработанных заявок
+        """
+        batch_size = batch_size or settings.checkout_worker_batch_size
+        claim_id, intents = self._claim_batch(batch_size)
+        if not intents:
+            return 0
+
+        # Заявки, которые все еще принадлежат этому обработчику
+        claimed = self.db.query(CheckoutIntent).filter(
+            CheckoutIntent.claimed_by == claim_id,
+            CheckoutIntent.status == "processing"
+        )
+
+        try:
+            payloads = {intent.id: json.loads(intent.payload) for intent in intents}
+            product_ids = {
+                item["product_id"]
+                for payload in payloads.values()
+                for item in payload["items"]
+            }
+            products = {
+                product.id: product
+                for product in self.db.query(Product).filter(Product.id.in_(product_ids)).all()
+            }
+
+            processed = sum(
+                1 for intent in intents
+                if self._process_intent(intent, payloads[intent.id], products, claimed)
+            )
+
+            self.db.commit()
+            monitor.increment_counter("checkout_intents_processed", processed)
+            logger.info(f"Processed {processed} checkout intents")
+            return len(intents)
+        except Exception as e:
+            self.db.rollback()
+            monitor.log_error(e, "checkout_worker")
+
+            # Возвращаем заявки в очередь, пока не исчерпаны попытки
+            self._release(claimed, str(e))
+            self.db.commit()
+            raise
+
+    def _process_intent(
+        self,
+        intent: CheckoutIntent,
+        payload: Dict[str, Any],
+        products: Dict[int, Product],
+        claimed: Query
+    ) -> bool:
+        """
+        Создание заказов по одной заявке в точке сохранения (без коммита)
+
+        Результат записывается условным UPDATE по claimed_by: если заявку
+        за время обработки вернул в очередь requeue_stale и захватил другой
+        обработчик, ее заказы отбрасываются.
+
+        Returns:
+            True, если заявка завершена (completed или failed)
+        """
+        own_intent = claimed.filter(CheckoutIntent.id == intent.id)
+        savepoint = self.db.begin_nested()
+        try:
+            orders = build_shop_orders(self.db, payload["items"], payload["customer"], products)
+            values = {"status": "completed", "order_codes": ",".join(order.order_code for order in orders)}
+        except ValueError as e:
+            savepoint.rollback()
+            savepoint = self.db.begin_nested()
+            values = {"status": "failed", "error_text": str(e)}
+        except Exception as e:
+            savepoint.rollback()
+            monitor.log_error(e, "checkout_worker")
+            logger.error(f"Error processing checkout intent {intent.token}: {e}")
+            self._release(own_intent, str(e))
+            return False
+
+        values.update({"attempts": CheckoutIntent.attempts + 1, "processed_at": datetime.now()})
+        if not own_intent.update(values, synchronize_session=False):
+            savepoint.rollback()
+            logger.warning(f"Checkout intent {intent.token} was reclaimed by another worker, dropping its orders")
+            return False
+
+        savepoint.commit()
+        return True
+
+
+def run_checkout_worker() -> int:
+    """Обработка очереди заказов до опустошения (для фоновой задачи)"""
+    db = SessionLocal()
+    try:
+        service = CheckoutQueueService(db)
+        total = 0
+        while True:
+            processed = service.process_batch()
+            total += processed
+            if processed < settings.checkout_worker_batch_size:
+                return total
+    finally:
+        db.close()
@@ -0,0 +1,82 @@
+"""
+Данные главной страницы
+"""
+from typing import Any, Dict, List, Optional
+from sqlalchemy.orm import Session
+import threading
+import time
+import logging
+
+from app.config import settings
+from app.models.product import Product
+from app.models.order import Order, ShopOrder
+
+logger = logging.getLogger(__name__)
+
+# Поля товара, которые выводятся в блоке последних товаров
+RECENT_PRODUCT_FIELDS = ["id", "name", "description", "sell_price_rub", "quantity"]
+
+
+class HomepageCache:
+    """
+    Кэш счетчиков и последних товаров главной страницы
+
+    Счетчики и список последних товаров живут короткий TTL. Изменение
+    товаров через ProductService сбрасывает их сразу, но только в своем
+    воркере; остальные воркеры обновляют данные по истечении TTL.
+    """
+
+    def __init__(self, ttl: float, recent_limit: int = 6):
+        self.ttl = ttl
+        self.recent_limit = recent_limit
+        self._counters: Optional[Dict[str, int]] = None
+        self._counters_expires_at = 0.0
+        self._recent_products: Optional[List[Dict[str, Any]]] = None
+        self._recent_expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get_counters(self, db: Session) -> Dict[str, int]:
+        """Количество товаров и заказов"""
+        with self._lock:
+            if self._counters is not None and self._counters_expires_at > time.monotonic():
+                return self._counters
+
+        counters = {
+            "total_products": db.query(Product).count(),
+            "total_orders": db.query(Order).count(),
+            "total_shop_orders": db.query(ShopOrder).count()
+        }
+
+        with self._lock:
+            self._counters = counters
+            self._counters_expires_at = time.monotonic() + self.ttl
+        return counters
+
+    def get_recent_products(self, db: Session) -> List[Dict[str, Any]]:
+        """Последние добавленные товары"""
+        with self._lock:
+            if self._recent_products is not None and self._recent_expires_at > time.monotonic():
+                return self._recent_products
+
+        columns = [getattr(Product, field) for field in RECENT_PRODUCT_FIELDS]
+        rows = db.query(*columns).order_by(Product.created_at.desc()).limit(self.recent_limit).all()
+        recent_products = [dict(zip(RECENT_PRODUCT_FIELDS, row)) for row in rows]
+
+        with self._lock:
+            self._recent_products = recent_products
+            self._recent_expires_at = time.monotonic() + self.ttl
+        return recent_products
+
+    def invalidate_products(self):
+        """Сброс данных после изменения товаров"""
+        with self._lock:
+            self._recent_products = None
+            self._counters = None
+
+    def clear(self):
+        """Полная очистка кэша"""
+        self.invalidate_products()
+
+
+# Глобальный экземпляр кэша главной страницы
+homepage_cache = HomepageCache(ttl=settings.homepage_counters_ttl_seconds)
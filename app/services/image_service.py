@@ -0,0 +1,350 @@
+"""
+Сервис изображений товаров
+
+Загрузка пишется на диск потоково, файлы хранятся по хэшу содержимого
+(uploads/images/ab/abcdef.../), а уменьшенные копии генерируются в пуле
+процессов вне обработки запроса.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import aiofiles
+from fastapi import UploadFile
+from sqlalchemy.orm import Session
+
+from app.cache import invalidate_pages
+from app.config import settings
+from app.db import SessionLocal
+from app.models.product import ProductImage
+from app.monitoring import monitor
+
+logger = logging.getLogger(__name__)
+
+# Размеры уменьшенных копий (максимальная сторона в пикселях)
+IMAGE_VARIANTS = {
+    "thumb": 320,
+    "medium": 800,
+    "large": 1600
+}
+
+# Форматы уменьшенных копий: расширение -> формат Pillow
+IMAGE_FORMATS = {
+    "webp": "WEBP",
+    "jpg": "JPEG"
+}
+
+# Допустимые расширения исходных файлов
+ALLOWED_EXTENSIONS = {"jpg", "jpeg", "png", "webp", "gif"}
+
+CONTENT_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def image_dir(content_hash: str) -> str:
+    """Папка файлов изображения"""
+    return os.path.join(settings.upload_dir, "images", content_hash[:2], content_hash)
+
+
+def variant_path(content_hash: str, variant: str, fmt: str) -> str:
+    """Путь к уменьшенной копии"""
+    return os.path.join(image_dir(content_hash), f"{variant}.{fmt}")
+
+
+def variant_url(content_hash: str, variant: str = "thumb", fmt: str = "webp") -> str:
+    """URL уменьшенной копии"""
+    return f"/media/images/{content_hash}/{variant}.{fmt}"
+
+
+def thumbnail_urls(content_hash: str, variant: str = "thumb") -> Dict[str, str]:
+    """URL уменьшенной копии во всех форматах"""
+    return {fmt: variant_url(content_hash, variant, fmt) for fmt in IMAGE_FORMATS}
+
+
+def generate_variants(
+    original_path: str,
+    target_dir: str,
+    jpeg_quality: int,
+    webp_quality: int
+) -> Tuple[int, int]:
+    """
+    Генерация уменьшенных копий (выполняется в отдельном процессе)
+
+    Returns:
+        Размеры исходного изображения (ширина, высота)
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(original_path) as source:
+        image = ImageOps.exif_transpose(source)
+        width, height = image.size
+
+        if image.mode in ("RGBA", "LA", "P"):
+            # Прозрачность заменяется белым фоном (JPEG ее не поддерживает)
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+
+        for variant, max_side in IMAGE_VARIANTS.items():
+            resized = image.copy()
+            resized.thumbnail((max_side, max_side), Image.LANCZOS)
+
+            for ext, pillow_format in IMAGE_FORMATS.items():
+                path = os.path.join(target_dir, f"{variant}.{ext}")
+                quality = webp_quality if ext == "webp" else jpeg_quality
+                # Уникальное временное имя: одно изображение могут обрабатывать одновременно
+                fd, temp_path = tempfile.mkstemp(dir=target_dir, suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        resized.save(f, pillow_format, quality=quality, optimize=True)
+                    os.replace(temp_path, path)
+                except Exception:
+                    os.remove(temp_path)
+                    raise
+
+    return width, height
+
+
+async def save_upload(upload: UploadFile) -> Tuple[str, str]:
+    """
+    Потоковое сохранение загруженного файла по хэшу содержимого
+
+    Returns:
+        (sha256 содержимого, расширение)
+
+    Raises:
+        ValueError: Недопустимый тип или размер файла
+    """
+    ext = os.path.splitext(upload.filename or "")[1].lower().lstrip(".")
+    if ext not in ALLOWED_EXTENSIONS:
+        raise ValueError(f"Недопустимый тип файла: {ext or 'без расширения'}")
+    if ext == "jpeg":
+        ext = "jpg"
+
+    temp_dir = os.path.join(settings.upload_dir, "tmp")
+    os.makedirs(temp_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+    os.close(fd)
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as f:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > settings.max_file_size:
+                    raise ValueError("Файл слишком большой")
+                digest.update(chunk)
+                await f.write(chunk)
+
+        if not size:
+            raise ValueError("Пустой файл")
+
+        content_hash = digest.hexdigest()
+        target_dir = image_dir(content_hash)
+        os.makedirs(target_dir, exist_ok=True)
+        original_path = os.path.join(target_dir, f"original.{ext}")
+
+        # Одинаковые файлы хранятся один раз
+        if os.path.exists(original_path):
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, original_path)
+
+        return content_hash, ext
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class ProductImageService:
+    """Сервис записей об изображениях товаров"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create(self, product_id: int, content_hash: str, ext: str) -> ProductImage:
+        """Создание записи изображения (уменьшенные копии создаются позже)"""
+        try:
+            position = self.db.query(ProductImage).filter(ProductImage.product_id == product_id).count()
+            image = ProductImage(
+                product_id=product_id,
+                content_hash=content_hash,
+                original_ext=ext,
+                position=position,
+                status="pending"
+            )
+            self.db.add(image)
+            self.db.commit()
+            self.db.refresh(image)
+            return image
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error creating product image for product {product_id}: {e}")
+            raise
+
+    def get_product_images(self, product_id: int) -> List[ProductImage]:
+        """Изображения товара по порядку"""
+        try:
+            return self.db.query(ProductImage).filter(
+                ProductImage.product_id == product_id
+            ).order_by(ProductImage.position, ProductImage.id).all()
+        except Exception as e:
+            logger.error(f"Error getting images for product {product_id}: {e}")
+            return []
+
+    def get_primary_hashes(self, product_ids: List[int]) -> Dict[int, str]:
+        """Хэши основных готовых изображений для набора товаров (одним запросом)"""
+        if not product_ids:
+            return {}
+        try:
+            rows = self.db.query(ProductImage.product_id, ProductImage.content_hash).filter(
+                ProductImage.product_id.in_(product_ids),
+                ProductImage.status == "ready"
+            ).order_by(ProductImage.product_id, ProductImage.position, ProductImage.id).all()
+
+            primary = {}
+            for product_id, content_hash in rows:
+                primary.setdefault(product_id, content_hash)
+            return primary
+        except Exception as e:
+            logger.error(f"Error getting primary images: {e}")
+            return {}
+
+
+class ImageProcessor:
+    """Генерация уменьшенных копий в пуле процессов"""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._sweep_task: Optional[asyncio.Task] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Пул процессов создается при первом использовании"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    async def process(self, image_id: int, db: Session = None) -> bool:
+        """
+        Генерация уменьшенных копий изображения
+
+        Args:
+            image_id: ID изображения
+            db: Сессия БД (по умолчанию создается отдельная)
+
+        Returns:
+            True, если копии созданы
+        """
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            image = db.get(ProductImage, image_id)
+            if not image:
+                return False
+
+            target_dir = image_dir(image.content_hash)
+            original_path = os.path.join(target_dir, f"original.{image.original_ext}")
+
+            loop = asyncio.get_running_loop()
+            try:
+                width, height = await loop.run_in_executor(
+                    self._get_executor(),
+                    generate_variants,
+                    original_path,
+                    target_dir,
+                    settings.image_jpeg_quality,
+                    settings.image_webp_quality
+                )
+            except Exception as e:
+                image.status = "failed"
+                image.error_text = str(e)
+                db.commit()
+                monitor.log_error(e, "image_pipeline")
+                return False
+
+            image.status = "ready"
+            image.width = width
+            image.height = height
+            image.error_text = None
+            db.commit()
+
+            # Каталог должен начать показывать новую миниатюру
+            invalidate_pages()
+
+            monitor.increment_counter("images_processed")
+            logger.info(f"Generated variants for image {image_id}")
+            return True
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error processing image {image_id}: {e}")
+            return False
+        finally:
+            if own_session:
+                db.close()
+
+    async def process_pending(self, db: Session = None) -> int:
+        """
+        Обработка изображений, оставшихся в статусе pending
+
+        Копии создаются фоновой задачей запроса загрузки; если процесс
+        перезапустился раньше, чем она выполнилась, изображение
+        обрабатывается здесь (при запуске приложения).
+
+        Returns:
+            Количество обработанных изображений
+        """
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            image_ids = [
+                row.id for row in db.query(ProductImage.id).filter(
+                    ProductImage.status == "pending"
+                ).order_by(ProductImage.id)
+            ]
+        finally:
+            if own_session:
+                db.close()
+
+        processed = 0
+        for image_id in image_ids:
+            if await self.process(image_id, None if own_session else db):
+                processed += 1
+
+        if image_ids:
+            logger.info(f"Processed {processed} of {len(image_ids)} pending images")
+        return processed
+
+    def start_pending_sweep(self):
+        """Запуск обработки оставшихся изображений в фоне (вызывается в цикле событий)"""
+        self._sweep_task = asyncio.get_running_loop().create_task(self.process_pending())
+
+    def shutdown(self):
+        """Остановка обработки и пула процессов"""
+        if self._sweep_task is not None and not self._sweep_task.done():
+            self._sweep_task.cancel()
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Глобальный экземпляр обработчика изображений
+image_processor = ImageProcessor(max_workers=settings.image_workers)
@@ -0,0 +1,182 @@
+"""
+Листы QR-этикеток для склада
+
+QR-коды партии отрисовываются в пуле процессов, затем раскладываются
+сеткой на страницы A4 одного PDF документа.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import List, Optional, Tuple
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.product import Product
+from app.monitoring import monitor
+from app.services.order_qr_service import OrderQRService
+
+logger = logging.getLogger(__name__)
+
+# Сетка этикеток на странице A4
+LABEL_COLUMNS = 3
+LABEL_ROWS = 7
+LABEL_MARGIN_MM = 10
+LABEL_CAPTION_MM = 6
+LABEL_CAPTION_MAX_CHARS = 32
+
+# Шрифт подписей: встроенный Helvetica не содержит кириллицы
+LABEL_FONT_NAME = "LabelFont"
+FALLBACK_FONT_NAME = "Helvetica"
+
+
+def render_label_images(payloads: List[str], box_size: int) -> List[bytes]:
+    """PNG QR-кодов части партии (выполняется в отдельном процессе)"""
+    from app.services.qr_service import qr_service
+    return [qr_service.render_png(payload, box_size) for payload in payloads]
+
+
+def _register_font() -> str:
+    """Регистрация шрифта подписей, при отсутствии файла - встроенный шрифт"""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    if LABEL_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return LABEL_FONT_NAME
+    if settings.label_font_path and os.path.isfile(settings.label_font_path):
+        pdfmetrics.registerFont(TTFont(LABEL_FONT_NAME, settings.label_font_path))
+        return LABEL_FONT_NAME
+    return FALLBACK_FONT_NAME
+
+
+def build_label_sheet(labels: List[Tuple[str, bytes]]) -> bytes:
+    """
+    Раскладка этикеток по страницам PDF
+
+    Args:
+        labels: Список (подпись, PNG QR-кода)
+
+    Returns:
+        PDF документ
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    font_name = _register_font()
+    page_width, page_height = A4
+    margin = LABEL_MARGIN_MM * mm
+    cell_width = (page_width - 2 * margin) / LABEL_COLUMNS
+    cell_height = (page_height - 2 * margin) / LABEL_ROWS
+    caption_height = LABEL_CAPTION_MM * mm
+    qr_size = min(cell_width, cell_height - caption_height) - 2 * mm
+    per_page = LABEL_COLUMNS * LABEL_ROWS
+
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    pdf.setTitle("QR labels")
+
+    for index, (caption, image) in enumerate(labels):
+        if index and index % per_page == 0:
+            pdf.showPage()
+
+        position = index % per_page
+        column = position % LABEL_COLUMNS
+        row = position // LABEL_COLUMNS
+        left = margin + column * cell_width
+        top = page_height - margin - row * cell_height
+
+        pdf.drawImage(
+            ImageReader(BytesIO(image)),
+            left + (cell_width - qr_size) / 2,
+            top - qr_size - 1 * mm,
+            width=qr_size,
+            height=qr_size
+        )
+        pdf.setFont(font_name, 9)
+        pdf.drawCentredString(left + cell_width / 2, top - cell_height + 2 * mm, caption[:LABEL_CAPTION_MAX_CHARS])
+
+    pdf.save()
+    return buffer.getvalue()
+
+
+def collect_labels(db: Session, kind: str, codes: List[str]) -> List[Tuple[str, str]]:
+    """
+    Данные QR-кодов и подписи этикеток в порядке запроса
+
+    Неизвестные коды пропускаются.
+
+    Returns:
+        Список (данные QR-кода, подпись)
+    """
+    payloads = OrderQRService(db).get_payloads(kind, codes)
+    if kind == "product":
+        ids = [int(code) for code in payloads]
+        names = dict(db.query(Product.id, Product.name).filter(Product.id.in_(ids)).all()) if ids else {}
+        return [(payload, f"#{code} {names.get(int(code), '')}".strip()) for code, payload in payloads.items()]
+    return [(payload, code) for code, payload in payloads.items()]
+
+
+class LabelSheetGenerator:
+    """Генерация листов этикеток с отрисовкой QR-кодов в пуле процессов"""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Пул процессов создается при первом использовании"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    async def generate(self, labels: List[Tuple[str, str]], box_size: int = 10) -> bytes:
+        """
+        PDF лист этикеток
+
+        Args:
+            labels: Список (данные QR-кода, подпись)
+            box_size: Размер модуля QR-кода в пикселях
+
+        Returns:
+            PDF документ
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        payloads = [payload for payload, _ in labels]
+
+        # Каждый процесс отрисовывает свою часть партии
+        chunk_size = max(1, -(-len(payloads) // self.max_workers))
+        chunks = await asyncio.gather(*[
+            loop.run_in_executor(executor, render_label_images, payloads[start:start + chunk_size], box_size)
+            for start in range(0, len(payloads), chunk_size)
+        ])
+        images = [image for chunk in chunks for image in chunk]
+
+        # Раскладка по страницам выполняется в пуле потоков, вне цикла событий
+        pdf = await loop.run_in_executor(
+            None,
+            build_label_sheet,
+            [(caption, image) for (_, caption), image in zip(labels, images)]
+        )
+
+        monitor.increment_counter("label_sheets_generated")
+        logger.info(f"Generated label sheet: {len(labels)} labels, {len(pdf)} bytes")
+        return pdf
+
+    def shutdown(self):
+        """Остановка пула процессов"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Глобальный экземпляр генератора листов этикеток
+label_generator = LabelSheetGenerator(max_workers=settings.label_workers)
@@ -0,0 +1,166 @@
+"""
+Реестр кодов заказов
+
+Код заказа может принадлежать обычному заказу или заказу магазина.
+Реестр хранит тип и ID заказа по коду, поэтому отслеживание находит
+заказ (или убеждается, что его нет) одним индексированным запросом
+вместо поиска по двум таблицам.
+
+Несуществующие коды запоминаются в кэше промахов на короткое время:
+повторный перебор тех же кодов не доходит до БД. Регистрация кода
+сбрасывает промах только в своем воркере, поэтому в остальных
+воркерах новый код может оставаться "не найденным" до истечения TTL.
+"""
+from typing import Dict, Iterable, Optional, Tuple, Union
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, select
+import logging
+
+from app.cache import LRUCache
+from app.config import settings
+from app.db import SessionLocal
+from app.models.order import Order, ShopOrder, OrderCode
+
+logger = logging.getLogger(__name__)
+
+# Модели заказов по типу в реестре
+ORDER_MODELS = {
+    "shop_order": ShopOrder,
+    "order": Order
+}
+
+
+class OrderCodeRegistry:
+    """Сервис реестра кодов заказов"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def register(self, order: Union[Order, ShopOrder], order_type: str) -> Optional[OrderCode]:
+        """
+        Запись кода заказа в реестр (без коммита, в транзакции заказа)
+
+        Заказ должен быть уже сброшен в БД (flush), чтобы у него был ID.
+        """
+        if not order.order_code:
+            return None
+
+        entry = OrderCode(code=order.order_code, order_type=order_type, order_id=order.id)
+        self.db.add(entry)
+        tracking_miss_cache.invalidate(order.order_code)
+        return entry
+
+    def _orders_query(self):
+        """Запрос записей реестра вместе с заказами обеих таблиц"""
+        return self.db.query(OrderCode.code, OrderCode.order_type, ShopOrder, Order).outerjoin(
+            ShopOrder,
+            and_(OrderCode.order_type == "shop_order", ShopOrder.id == OrderCode.order_id)
+        ).outerjoin(
+            Order,
+            and_(OrderCode.order_type == "order", Order.id == OrderCode.order_id)
+        )
+
+    def resolve(self, order_code: str) -> Tuple[Optional[Union[Order, ShopOrder]], Optional[str]]:
+        """
+        Поиск заказа по коду одним запросом
+
+        Returns:
+            (заказ, тип заказа) или (None, None)
+
+        Raises:
+            Ошибка БД: недоступная база не должна выглядеть как "заказ не найден"
+        """
+        if tracking_miss_cache.get(order_code) is not None:
+            return None, None
+
+        try:
+            row = self._orders_query().filter(OrderCode.code == order_code).first()
+            order, order_type = None, None
+            if row:
+                _, order_type, shop_order, order = row
+                order = shop_order if order_type == "shop_order" else order
+
+            if order is None:
+                # Кода нет в реестре, либо заказ удален, а запись осталась
+                tracking_miss_cache.set(order_code, order_code.encode("utf-8"))
+                return None, None
+            return order, order_type
+        except Exception as e:
+            logger.error(f"Error resolving order code {order_code}: {e}")
+            raise
+
+    def resolve_many(self, order_codes: Iterable[str]) -> Dict[str, Tuple[Union[Order, ShopOrder], str]]:
+        """
+        Поиск заказов по набору кодов одним запросом с IN
+
+        Returns:
+            Словарь код -> (заказ, тип заказа); ненайденных кодов в нем нет
+        """
+        codes = [code for code in set(order_codes) if tracking_miss_cache.get(code) is None]
+        if not codes:
+            return {}
+
+        try:
+            found = {}
+            for code, order_type, shop_order, order in self._orders_query().filter(OrderCode.code.in_(codes)):
+                order = shop_order if order_type == "shop_order" else order
+                if order is not None:
+                    found[code] = (order, order_type)
+
+            for code in codes:
+                if code not in found:
+                    tracking_miss_cache.set(code, code.encode("utf-8"))
+            return found
+        except Exception as e:
+            logger.error(f"Error resolving {len(codes)} order codes: {e}")
+            raise
+
+    def backfill(self) -> int:
+        """
+        Добавление в реестр кодов заказов, созданных до его появления
+
+        Returns:
+            Количество добавленных кодов
+        """
+        try:
+            added = []
+            for order_type, model in ORDER_MODELS.items():
+                missing = self.db.query(model.order_code, model.id).filter(
+                    model.order_code.isnot(None),
+                    ~model.order_code.in_(select(OrderCode.code))
+                ).all()
+
+                self.db.add_all([
+                    OrderCode(code=code, order_type=order_type, order_id=order_id)
+                    for code, order_id in missing
+                ])
+                added.extend(code for code, _ in missing)
+
+            self.db.commit()
+            # Заполнение идет в фоне после запуска: коды могли уже попасть в кэш промахов
+            for code in added:
+                tracking_miss_cache.invalidate(code)
+            added = len(added)
+            if added:
+                logger.info(f"Backfilled {added} order codes")
+            return added
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error backfilling order codes: {e}")
+            return 0
+
+
+def backfill_order_codes() -> int:
+    """Заполнение реестра в отдельной сессии БД (для фоновой задачи при запуске)"""
+    db = SessionLocal()
+    try:
+        return OrderCodeRegistry(db).backfill()
+    finally:
+        db.close()
+
+
+# Глобальный кэш несуществующих кодов заказов (свой в каждом воркере)
+tracking_miss_cache = LRUCache(
+    max_bytes=settings.tracking_miss_cache_max_bytes,
+    ttl=settings.tracking_miss_ttl_seconds
+)
@@ -0,0 +1,144 @@
+"""
+Публикация изменений статуса заказов
+
+Подписчики (потоки SSE страниц отслеживания) получают события по коду
+заказа через pub/sub в памяти процесса. С ORDER_EVENTS_BACKEND=redis
+события идут через Redis, и их получают подписчики всех воркеров.
+"""
+import asyncio
+import json
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+REDIS_CHANNEL_PREFIX = "order_events:"
+
+
+def order_event(order, order_type: str) -> Dict[str, Any]:
+    """Данные события об изменении заказа"""
+    return {
+        "order_code": order.order_code,
+        "order_type": order_type,
+        "status": order.status,
+        "arrival_status": getattr(order, "arrival_status", None),
+        "created_at": order.created_at.isoformat() if order.created_at else None,
+        "updated_at": order.updated_at.isoformat() if order.updated_at else None
+    }
+
+
+class OrderEventBroker:
+    """Pub/sub событий заказов по коду заказа"""
+
+    def __init__(self, backend: str = "memory", redis_url: Optional[str] = None, queue_size: int = 16):
+        self.backend = backend
+        self.redis_url = redis_url
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._lock = threading.Lock()
+        self._redis = None
+        self._listener: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def subscribe(self, order_code: str) -> asyncio.Queue:
+        """Подписка на события заказа (вызывается в цикле событий)"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(order_code, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, order_code: str, queue: asyncio.Queue):
+        """Отмена подписки"""
+        with self._lock:
+            subscribers = self._subscribers.get(order_code)
+            if not subscribers:
+                return
+            subscribers.difference_update({entry for entry in subscribers if entry[1] is queue})
+            if not subscribers:
+                del self._subscribers[order_code]
+
+    def subscriber_count(self, order_code: Optional[str] = None) -> int:
+        """Количество подписчиков (всего или на заказ)"""
+        with self._lock:
+            if order_code is not None:
+                return len(self._subscribers.get(order_code, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, order_code: str, event: Dict[str, Any]):
+        """
+        Публикация события (можно вызывать из любого потока)
+
+        Ошибки доставки только логируются: изменение заказа уже сохранено.
+        """
+        try:
+            if self.backend == "redis":
+                self._get_redis().publish(f"{REDIS_CHANNEL_PREFIX}{order_code}", json.dumps(event))
+            else:
+                self._deliver(order_code, event)
+        except Exception as e:
+            logger.error(f"Error publishing order event for {order_code}: {e}")
+
+    def _deliver(self, order_code: str, event: Dict[str, Any]):
+        """Доставка события подписчикам этого процесса"""
+        with self._lock:
+            subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = list(self._subscribers.get(order_code, ()))
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, event)
+            except RuntimeError:
+                # Цикл событий подписчика уже остановлен
+                self.unsubscribe(order_code, queue)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, event: Dict[str, Any]):
+        """Постановка события в очередь; медленный клиент теряет старые события"""
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    def _get_redis(self):
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(self.redis_url)
+        return self._redis
+
+    def start(self):
+        """Запуск приема событий из Redis (для backend=redis)"""
+        if self.backend != "redis" or self._listener is not None:
+            return
+
+        self._stopping.clear()
+        self._listener = threading.Thread(target=self._listen, name="order-events-redis", daemon=True)
+        self._listener.start()
+        logger.info("Order events Redis listener started")
+
+    def _listen(self):
+        """Прием событий из Redis и доставка подписчикам процесса"""
+        while not self._stopping.is_set():
+            try:
+                pubsub = self._get_redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(f"{REDIS_CHANNEL_PREFIX}*")
+                while not self._stopping.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message["type"] == "pmessage":
+                        channel = message["channel"].decode("utf-8")
+                        self._deliver(channel[len(REDIS_CHANNEL_PREFIX):], json.loads(message["data"]))
+                pubsub.close()
+            except Exception as e:
+                logger.error(f"Order events Redis listener error: {e}")
+                self._stopping.wait(5)
+
+    def stop(self):
+        """Остановка приема событий из Redis"""
+        self._stopping.set()
+        if self._listener is not None:
+            self._listener.join(timeout=5)
+            self._listener = None
+
+
+# Глобальный экземпляр брокера событий заказов
+order_events = OrderEventBroker(backend=settings.order_events_backend, redis_url=settings.redis_url)
@@ -0,0 +1,152 @@
+"""
+Выдача заказов по сканированию QR-кодов
+
+Терминал на пункте выдачи отправляет пачку отсканированных QR-кодов.
+Подписи проверяются без обращения к БД, заказы находятся одним запросом
+через реестр кодов, а все выдачи сохраняются одной транзакцией.
+"""
+from datetime import datetime
+from typing import Any, Dict, List
+import logging
+
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models.order import Order, ShopOrder
+from app.monitoring import monitor
+from app.services.order_code_registry import OrderCodeRegistry, ORDER_MODELS
+from app.services.order_events import order_events, order_event
+from app.services.qr_service import qr_service, ORDER_TOKEN_TYPES
+
+logger = logging.getLogger(__name__)
+
+# Условия выдачи: заказ магазина готов так же, как в ShopOrderService.get_ready_for_pickup
+ISSUABLE_CONDITIONS = {
+    "order": Order.status == "paid_not_issued",
+    "shop_order": and_(ShopOrder.status == "ready_for_pickup", ShopOrder.arrival_status == "ready")
+}
+
+# Статус после выдачи и статусы уже выданных заказов
+ISSUED_STATUS = {
+    "order": "paid_issued",
+    "shop_order": "completed"
+}
+ALREADY_ISSUED_STATUSES = {
+    "order": ("paid_issued", "self_pickup"),
+    "shop_order": ("completed",)
+}
+
+
+def is_issuable(order, order_type: str) -> bool:
+    """Заказ можно выдать (то же условие, что ISSUABLE_CONDITIONS)"""
+    if order_type == "shop_order":
+        return order.status == "ready_for_pickup" and order.arrival_status == "ready"
+    return order.status == "paid_not_issued"
+
+
+class OrderIssueService:
+    """Сервис выдачи заказов по QR-кодам"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def issue_scanned(self, payloads: List[str]) -> List[Dict[str, Any]]:
+        """
+        Выдача заказов по отсканированным QR-кодам
+
+        Результат каждого скана (поле result):
+        issued - заказ выдан; already_issued - выдан ранее;
+        not_ready - заказ не готов к выдаче (не оплачен, товар не прибыл);
+        not_found - заказа нет; invalid - QR-код не заказа или подпись неверна;
+        duplicate - заказ уже был в этой пачке.
+
+        Args:
+            payloads: Данные QR-кодов в порядке сканирования
+
+        Returns:
+            Результаты в порядке сканирования
+        """
+        results = []
+        valid = {}
+        for payload in payloads:
+            result = {"payload": payload, "order_code": None, "order_type": None, "result": "invalid", "status": None}
+            results.append(result)
+
+            parsed = qr_service.parse_qr_code_data(payload.strip())
+            if not parsed or parsed["type"] not in ORDER_TOKEN_TYPES:
+                continue
+            if not qr_service.verify_order_token(parsed["type"], parsed["identifier"], parsed["token"]):
+                continue
+
+            result["order_code"] = parsed["identifier"]
+            result["order_type"] = parsed["type"]
+            if parsed["identifier"] in valid:
+                result["result"] = "duplicate"
+                continue
+            valid[parsed["identifier"]] = result
+
+        try:
+            found = OrderCodeRegistry(self.db).resolve_many(valid)
+
+            events = []
+            now = datetime.now()
+            for order_code, result in valid.items():
+                order, order_type = found.get(order_code, (None, None))
+                if order is None or order_type != result["order_type"]:
+                    result["result"] = "not_found"
+                    continue
+
+                if is_issuable(order, order_type) and self._issue(order, order_type, now):
+                    # Событие собирается до коммита: после него заказы пришлось бы перечитывать
+                    events.append(order_event(order, order_type))
+                    result["result"] = "issued"
+                elif order.status in ALREADY_ISSUED_STATUSES[order_type]:
+                    result["result"] = "already_issued"
+                else:
+                    result["result"] = "not_ready"
+                result["status"] = order.status
+
+            if events:
+                self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error issuing {len(valid)} scanned orders: {e}")
+            raise
+
+        for event in events:
+            order_events.publish(event["order_code"], event)
+
+        monitor.increment_counter("orders_issued_by_scan", len(events))
+        logger.info(f"Issued {len(events)} of {len(payloads)} scanned orders")
+        return results
+
+    def _issue(self, order, order_type: str, now: datetime) -> bool:
+        """
+        Условная выдача одного заказа
+
+        UPDATE выполняется только если заказ все еще готов к выдаче: при
+        одновременном сканировании на двух терминалах заказ выдает один
+        из них, второй получает already_issued.
+
+        Returns:
+            True если заказ выдан этим запросом
+        """
+        model = ORDER_MODELS[order_type]
+        values = {"status": ISSUED_STATUS[order_type], "updated_at": now}
+        if order_type == "order":
+            values["issued_at"] = now
+
+        updated = self.db.query(model).filter(
+            model.id == order.id,
+            ISSUABLE_CONDITIONS[order_type]
+        ).update(values, synchronize_session=False)
+
+        if not updated:
+            # Заказ изменили параллельно: перечитываем текущий статус
+            self.db.refresh(order)
+            return False
+
+        for name, value in values.items():
+            set_committed_value(order, name, value)
+        return True
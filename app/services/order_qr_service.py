@@ -0,0 +1,272 @@
+"""
+Сохраненные QR-коды заказов
+
+Данные QR-кода (qr_payload) создаются один раз при оформлении заказа,
+а SVG и PNG файлы отрисовываются фоновой задачей и сохраняются по хэшу
+данных (uploads/qr/ab/abcdef....svg). Путь к SVG хранится в
+qr_image_path, PNG лежит рядом с тем же именем.
+"""
+import hashlib
+import os
+import tempfile
+from typing import Dict, Iterable, Optional, Union
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+import logging
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models.order import Order, ShopOrder, OrderCode
+from app.models.product import Product
+from app.services.order_code_registry import ORDER_MODELS, tracking_miss_cache
+from app.services.qr_service import qr_service
+
+logger = logging.getLogger(__name__)
+
+# Форматы файлов QR-кодов
+QR_FORMATS = ("svg", "png")
+
+# Виды QR-кодов: заказ (по коду) и товар (по ID)
+QR_KINDS = ("order", "product")
+
+# qr_image_path заказа, QR-код которого фоновая задача не смогла отрисовать:
+# такие заказы она больше не выбирает, файлы создаются при открытии страницы
+QR_RENDER_FAILED = ""
+
+
+def qr_digest(payload: str) -> str:
+    """Имя файлов QR-кода (хэш данных, токен по адресу не угадать)"""
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def qr_file_path(digest: str, fmt: str) -> str:
+    """Путь к файлу QR-кода"""
+    return os.path.join(settings.upload_dir, "qr", digest[:2], f"{digest}.{fmt}")
+
+
+def qr_urls(qr_image_path: Optional[str]) -> Optional[Dict[str, str]]:
+    """URL файлов QR-кода во всех форматах по сохраненному пути"""
+    if not qr_image_path:
+        return None
+    digest = os.path.splitext(os.path.basename(qr_image_path))[0]
+    return {fmt: f"/media/qr/{digest}.{fmt}" for fmt in QR_FORMATS}
+
+
+def payload_needs_resign(payload: Optional[str], order_type: str, order_code: str) -> bool:
+    """
+    Сохраненные данные QR-кода нужно подписать заново
+
+    Заново подписываются отсутствующие данные, данные другого заказа и
+    токены прежнего формата или выведенного из оборота ключа. Истекшие
+    токены остаются как есть, иначе QR_TOKEN_MAX_AGE_DAYS не действовал бы.
+    """
+    parsed = qr_service.parse_qr_code_data(payload) if payload else None
+    if not parsed or parsed["type"] != order_type or parsed["identifier"] != order_code:
+        return True
+    return qr_service.token_needs_resign(parsed["token"])
+
+
+def render_qr_files(payload: str) -> str:
+    """
+    Отрисовка SVG и PNG файлов QR-кода
+
+    Returns:
+        Путь к SVG файлу
+    """
+    digest = qr_digest(payload)
+    rendered = {
+        "svg": qr_service.draw(payload, settings.qr_svg_backend),
+        "png": qr_service.render_png(payload, settings.qr_png_box_size)
+    }
+
+    for fmt, content in rendered.items():
+        path = qr_file_path(digest, fmt)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Уникальное временное имя: фоновая задача и страница заказа могут писать один файл
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+    return qr_file_path(digest, "svg")
+
+
+class OrderQRService:
+    """Сервис сохраненных QR-кодов заказов"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def render_order(self, order: Union[Order, ShopOrder], order_type: str) -> Optional[str]:
+        """
+        Отрисовка файлов QR-кода заказа (без коммита)
+
+        Заказам, созданным до появления сохраненных QR-кодов, данные
+        создаются здесь же, а токены старого формата или выведенного из
+        оборота ключа подписываются заново.
+        """
+        if payload_needs_resign(order.qr_payload, order_type, order.order_code):
+            order.qr_payload = qr_service.make_order_payload(order_type, order.order_code)
+        order.qr_image_path = render_qr_files(order.qr_payload)
+        return order.qr_image_path
+
+    def get_payloads(self, kind: str, codes: Iterable[str]) -> Dict[str, str]:
+        """
+        Данные QR-кодов по кодам заказов или ID товаров
+
+        Неизвестные коды пропускаются. Заказам без данных QR-кода или с
+        токеном старого формата они создаются и сохраняются, чтобы код не
+        менялся между запросами.
+
+        Returns:
+            Словарь код -> данные QR-кода
+        """
+        codes = list(dict.fromkeys(codes))
+        if kind == "product":
+            ids = [int(code) for code in codes if code.isdigit()]
+            existing = {row.id for row in self.db.query(Product.id).filter(Product.id.in_(ids))} if ids else set()
+            return {
+                code: qr_service.make_product_payload(int(code))
+                for code in codes
+                if code.isdigit() and int(code) in existing
+            }
+
+        # Коды заказов ищутся так же, как при отслеживании: известные промахи не доходят до БД
+        codes = [code for code in codes if tracking_miss_cache.get(code) is None]
+        entries = self.db.query(OrderCode).filter(OrderCode.code.in_(codes)).all() if codes else []
+        for code in set(codes) - {entry.code for entry in entries}:
+            tracking_miss_cache.set(code, code.encode("utf-8"))
+        ids_by_type: Dict[str, list] = {}
+        for entry in entries:
+            ids_by_type.setdefault(entry.order_type, []).append(entry.order_id)
+
+        payloads = {}
+        created = False
+        for order_type, ids in ids_by_type.items():
+            model = ORDER_MODELS[order_type]
+            for order in self.db.query(model).filter(model.id.in_(ids)):
+                if payload_needs_resign(order.qr_payload, order_type, order.order_code):
+                    order.qr_payload = qr_service.make_order_payload(order_type, order.order_code)
+                    order.qr_image_path = None
+                    created = True
+                payloads[order.order_code] = order.qr_payload
+
+        if created:
+            try:
+                self.db.commit()
+            except Exception as e:
+                self.db.rollback()
+                logger.error(f"Error saving QR payloads: {e}")
+                return {}
+
+        return {code: payloads[code] for code in codes if code in payloads}
+
+    def ensure_rendered(self, order: Union[Order, ShopOrder], order_type: str) -> Optional[str]:
+        """Путь к SVG файлу QR-кода; если фоновая задача еще не успела, файлы создаются сразу"""
+        if order.qr_image_path and os.path.isfile(order.qr_image_path):
+            return order.qr_image_path
+
+        try:
+            self.render_order(order, order_type)
+            self.db.commit()
+            return order.qr_image_path
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error rendering QR code for {order_type} {order.order_code}: {e}")
+            return None
+
+    def resign_legacy(self) -> int:
+        """
+        Повторная подпись сохраненных токенов старого формата
+
+        Заказы, созданные до подписанных токенов, хранят uuid4 токены, а
+        после удаления ключа из QR_TOKEN_PREVIOUS_KEYS не проверяются и
+        его подписи. Такие данные подписываются заново, а файлы QR-кодов
+        перерисовывает фоновая задача. Из БД читаются только данные, токен
+        которых не начинается с идентификатора действующего ключа.
+
+        Returns:
+            Количество переподписанных заказов
+        """
+        try:
+            resigned = 0
+            key_patterns = [f"%:{key_id}.%" for key_id in qr_service.token_key_ids()]
+            for order_type, model in ORDER_MODELS.items():
+                orders = self.db.query(model).filter(
+                    model.qr_payload.isnot(None),
+                    model.order_code.isnot(None),
+                    ~or_(*[model.qr_payload.like(pattern) for pattern in key_patterns])
+                )
+                for order in orders.yield_per(500):
+                    if payload_needs_resign(order.qr_payload, order_type, order.order_code):
+                        order.qr_payload = qr_service.make_order_payload(order_type, order.order_code)
+                        order.qr_image_path = None
+                        resigned += 1
+
+            self.db.commit()
+            if resigned:
+                logger.info(f"Re-signed {resigned} order QR payloads")
+            return resigned
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error re-signing order QR payloads: {e}")
+            return 0
+
+    def render_pending(self, batch_size: int) -> int:
+        """
+        Отрисовка QR-кодов заказов, у которых еще нет файлов
+
+        Заказы, отрисовка которых не удалась, помечаются QR_RENDER_FAILED
+        и из следующих батчей исключаются.
+
+        Returns:
+            Количество отрисованных QR-кодов
+        """
+        rendered = 0
+        for order_type, model in ORDER_MODELS.items():
+            orders = self.db.query(model).filter(
+                model.qr_image_path.is_(None),
+                model.order_code.isnot(None)
+            ).order_by(model.id).limit(batch_size).all()
+
+            for order in orders:
+                try:
+                    self.render_order(order, order_type)
+                    rendered += 1
+                except Exception as e:
+                    # Без отметки заказ выбирался бы снова и занимал место в каждом батче
+                    order.qr_image_path = QR_RENDER_FAILED
+                    logger.error(f"Error rendering QR code for {order_type} {order.order_code}: {e}")
+
+            try:
+                self.db.commit()
+            except Exception as e:
+                self.db.rollback()
+                logger.error(f"Error saving rendered QR codes: {e}")
+                return 0
+
+        if rendered:
+            logger.info(f"Rendered {rendered} order QR codes")
+        return rendered
+
+
+def resign_order_payloads() -> int:
+    """Повторная подпись данных QR-кодов в отдельной сессии БД (для фоновой задачи при запуске)"""
+    db = SessionLocal()
+    try:
+        return OrderQRService(db).resign_legacy()
+    finally:
+        db.close()
+
+
+def run_qr_renderer() -> int:
+    """Отрисовка ожидающих QR-кодов (для фоновой задачи)"""
+    db = SessionLocal()
+    try:
+        return OrderQRService(db).render_pending(settings.qr_render_batch_size)
+    finally:
+        db.close()
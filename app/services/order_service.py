@@ -10,6 +10,9 @@ import logging
 from app.models.order import Order, ShopOrder, ShopCart
 from app.schemas.order import OrderCreate, OrderUpdate, ShopOrderCreate, ShopOrderUpdate
 from app.services.base_service import BaseService
+from app.services.order_code_registry import OrderCodeRegistry
+from app.services.qr_service import qr_service
+from app.services.order_events import order_events, order_event
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +23,25 @@ class OrderService(BaseService[Order, OrderCreate, OrderUpdate]):
     def __init__(self, db: Session):
         super().__init__(Order, db)
     
+    def create(self, obj_in) -> Order:
+        """Создание заказа с записью кода в реестр"""
+        try:
+            obj_data = obj_in.dict() if hasattr(obj_in, 'dict') else obj_in
+            order = Order(**obj_data)
+            if order.order_code and not order.qr_payload:
+                order.qr_payload = qr_service.make_order_payload("order", order.order_code)
+            self.db.add(order)
+            self.db.flush()
+            OrderCodeRegistry(self.db).register(order, "order")
+            self.db.commit()
+            self.db.refresh(order)
+            logger.info(f"Created order {order.id}")
+            return order
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error creating order: {e}")
+            raise
+    
     def get_by_code(self, order_code: str) -> Optional[Order]:
         """Получение заказа по коду"""
         try:
@@ -65,6 +87,7 @@ class OrderService(BaseService[Order, OrderCreate, OrderUpdate]):
             
             self.db.commit()
             self.db.refresh(order)
+            order_events.publish(order.order_code, order_event(order, "order"))
             logger.info(f"Updated order {order_id} status to {status}")
             return order
         except Exception as e:
@@ -113,6 +136,25 @@ class ShopOrderService(BaseService[ShopOrder, ShopOrderCreate, ShopOrderUpdate])
     def __init__(self, db: Session):
         super().__init__(ShopOrder, db)
     
+    def create(self, obj_in) -> ShopOrder:
+        """Создание заказа с записью кода в реестр"""
+        try:
+            obj_data = obj_in.dict() if hasattr(obj_in, 'dict') else obj_in
+            order = ShopOrder(**obj_data)
+            if order.order_code and not order.qr_payload:
+                order.qr_payload = qr_service.make_order_payload("shop_order", order.order_code)
+            self.db.add(order)
+            self.db.flush()
+            OrderCodeRegistry(self.db).register(order, "shop_order")
+            self.db.commit()
+            self.db.refresh(order)
+            logger.info(f"Created shop order {order.id}")
+            return order
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error creating shop order: {e}")
+            raise
+    
     def get_by_code(self, order_code: str) -> Optional[ShopOrder]:
         """Получение заказа по коду"""
         try:
@@ -160,6 +202,7 @@ class ShopOrderService(BaseService[ShopOrder, ShopOrderCreate, ShopOrderUpdate])
             order.status = status
             self.db.commit()
             self.db.refresh(order)
+            order_events.publish(order.order_code, order_event(order, "shop_order"))
             logger.info(f"Updated shop order {order_id} status to {status}")
             return order
         except Exception as e:
@@ -180,6 +223,7 @@ class ShopOrderService(BaseService[ShopOrder, ShopOrderCreate, ShopOrderUpdate])
             
             self.db.commit()
             self.db.refresh(order)
+            order_events.publish(order.order_code, order_event(order, "shop_order"))
             logger.info(f"Updated shop order {order_id} arrival status to {arrival_status}")
             return order
         except Exception as e:
@@ -344,6 +388,113 @@ class ShopCartService:
             logger.error(f"Error clearing cart: {e}")
             return False
     
+    def apply_operations(self, session_id: str, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Применение списка операций к корзине в одной транзакции
+        
+        Операции: add (увеличить количество), set (установить количество,
+        0 удаляет позицию), remove (удалить позицию). Наличие на складе
+        проверяется для всех товаров одним запросом.
+        
+        Args:
+            session_id: ID сессии
+            operations: Список операций {"op", "product_id", "quantity"}
+            
+        Returns:
+            Сводка корзины после изменений
+            
+        Raises:
+            ValueError: Если товар не найден, количество некорректно или недостаточно товара
+        """
+        from app.models.product import Product
+        
+        try:
+            cart_rows = {
+                row.product_id: row
+                for row in self.db.query(ShopCart).filter(ShopCart.session_id == session_id).all()
+            }
+            
+            product_ids = set(cart_rows) | {operation["product_id"] for operation in operations}
+            products = {
+                product.id: product
+                for product in self.db.query(Product).filter(Product.id.in_(product_ids)).all()
+            }
+            
+            quantities = {product_id: row.quantity for product_id, row in cart_rows.items()}
+            
+            for operation in operations:
+                op = operation["op"]
+                product_id = operation["product_id"]
+                quantity = operation.get("quantity", 0)
+                
+                if op == "remove":
+                    quantities.pop(product_id, None)
+                    continue
+                
+                if product_id not in products:
+                    raise ValueError(f"Товар {product_id} не найден")
+                
+                if op == "add":
+                    if quantity <= 0:
+                        raise ValueError(f"Некорректное количество для товара {product_id}")
+                    quantities[product_id] = quantities.get(product_id, 0) + quantity
+                elif op == "set":
+                    if quantity <= 0:
+                        quantities.pop(product_id, None)
+                    else:
+                        quantities[product_id] = quantity
+                else:
+                    raise ValueError(f"Неизвестная операция {op}")
+            
+            # Проверка остатков по итоговым количествам
+            for product_id, quantity in quantities.items():
+                row = cart_rows.get(product_id)
+                if row is not None and row.quantity == quantity:
+                    continue
+                
+                product = products.get(product_id)
+                if product and product.quantity < quantity:
+                    raise ValueError(f"Недостаточно товара на складе: {product.name}")
+            
+            # Запись изменений
+            for product_id, row in cart_rows.items():
+                if product_id not in quantities:
+                    self.db.delete(row)
+                elif row.quantity != quantities[product_id]:
+                    row.quantity = quantities[product_id]
+            
+            for product_id, quantity in quantities.items():
+                if product_id not in cart_rows:
+                    self.db.add(ShopCart(session_id=session_id, product_id=product_id, quantity=quantity))
+            
+            self.db.commit()
+            logger.info(f"Applied {len(operations)} cart operations for session {session_id}")
+        except Exception:
+            self.db.rollback()
+            raise
+        
+        items = []
+        total_amount = 0
+        
+        for product_id, quantity in quantities.items():
+            product = products.get(product_id)
+            if product:
+                item_total = float(product.sell_price_rub or 0) * quantity
+                items.append({
+                    "product_id": product.id,
+                    "product_name": product.name,
+                    "quantity": quantity,
+                    "unit_price_rub": float(product.sell_price_rub or 0),
+                    "total_price": item_total
+                })
+                total_amount += item_total
+        
+        return {
+            "items": items,
+            "total_items": len(items),
+            "total_amount": total_amount
+        }
+    
     def get_cart_count(self, session_id: str) -> int:
         """Получение количества товаров в корзине"""
         try:
@@ -3,15 +3,74 @@
 """
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, asc
+from sqlalchemy import and_, or_, desc, asc, func
+from decimal import Decimal
+import base64
+import json
 import logging
 
 from app.models.product import Product
 from app.schemas.product import ProductCreate, ProductUpdate
 from app.services.base_service import BaseService
+from app.cache import invalidate_pages
+from app.services.homepage_service import homepage_cache
+from app.services.image_service import ProductImageService, thumbnail_urls
+from app.services.suggest_index import suggest_index
 
 logger = logging.getLogger(__name__)
 
+# Поля карточки товара в каталоге
+CATALOG_CARD_COLUMNS = [
+    Product.id,
+    Product.name,
+    Product.description,
+    Product.sell_price_rub,
+    Product.availability_status,
+    Product.quantity
+]
+
+# Варианты сортировки каталога: (ключ сортировки, по убыванию)
+CATALOG_SORTS = {
+    "newest": (Product.id, True),
+    "price_asc": (func.coalesce(Product.sell_price_rub, 0), False),
+    "price_desc": (func.coalesce(Product.sell_price_rub, 0), True),
+    "name": (Product.name, False)
+}
+
+
+def encode_catalog_cursor(sort: str, card: Dict[str, Any]) -> str:
+    """Курсор следующей страницы каталога по последней карточке"""
+    if sort in ("price_asc", "price_desc"):
+        value = str(card["sell_price_rub"] or 0)
+    elif sort == "name":
+        value = card["name"]
+    else:
+        value = card["id"]
+    
+    raw = json.dumps([sort, value, card["id"]], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_catalog_cursor(cursor: str, sort: str) -> tuple:
+    """
+    Разбор курсора каталога
+    
+    Raises:
+        ValueError: Если курсор поврежден или выдан для другой сортировки
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("Некорректный курсор")
+    
+    if cursor_sort != sort:
+        raise ValueError("Курсор выдан для другой сортировки")
+    
+    if sort in ("price_asc", "price_desc"):
+        value = Decimal(value)
+    return value, int(last_id)
+
 
 class ProductService(BaseService[Product, ProductCreate, ProductUpdate]):
     """Сервис для управления товарами"""
@@ -19,6 +78,35 @@ class ProductService(BaseService[Product, ProductCreate, ProductUpdate]):
     def __init__(self, db: Session):
         super().__init__(Product, db)
     
+    def _on_products_changed(self):
+        """Сброс производных данных после изменения товаров"""
+        invalidate_pages()
+        homepage_cache.invalidate_products()
+    
+    def create(self, obj_in: ProductCreate) -> Product:
+        """Создание товара"""
+        product = super().create(obj_in)
+        if product:
+            suggest_index.upsert(product.id, product.name, product.supplier_name)
+        self._on_products_changed()
+        return product
+    
+    def update(self, id: int, obj_in: ProductUpdate) -> Optional[Product]:
+        """Обновление товара"""
+        product = super().update(id, obj_in)
+        if product:
+            suggest_index.upsert(product.id, product.name, product.supplier_name)
+            self._on_products_changed()
+        return product
+    
+    def delete(self, id: int) -> bool:
+        """Удаление товара"""
+        deleted = super().delete(id)
+        if deleted:
+            suggest_index.remove(id)
+            self._on_products_changed()
+        return deleted
+    
     def get_by_name(self, name: str) -> Optional[Product]:
         """Получение товара по названию"""
         try:
@@ -61,16 +149,88 @@ class ProductService(BaseService[Product, ProductCreate, ProductUpdate]):
             logger.error(f"Error getting available products: {e}")
             return []
     
+    def get_catalog_page(
+        self,
+        sort: str = "newest",
+        cursor: Optional[str] = None,
+        limit: int = 24,
+        status: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Страница каталога с keyset-пагинацией
+        
+        Выбираются только поля карточки; следующая страница определяется
+        курсором (значение ключа сортировки и ID последней карточки),
+        поэтому стоимость запроса не зависит от номера страницы.
+        
+        Args:
+            sort: Вариант сортировки из CATALOG_SORTS
+            cursor: Курсор предыдущей страницы
+            limit: Размер страницы
+            status: Фильтр по статусу наличия
+            
+        Returns:
+            {"items": [...], "next_cursor": ...}
+            
+        Raises:
+            ValueError: Если сортировка или курсор некорректны
+        """
+        if sort not in CATALOG_SORTS:
+            raise ValueError(f"Неизвестная сортировка {sort}")
+        
+        sort_key, descending = CATALOG_SORTS[sort]
+        
+        query = self.db.query(*CATALOG_CARD_COLUMNS).filter(Product.quantity > 0)
+        if status:
+            query = query.filter(Product.availability_status == status)
+        
+        if cursor:
+            value, last_id = decode_catalog_cursor(cursor, sort)
+            if descending:
+                query = query.filter(or_(
+                    sort_key < value,
+                    and_(sort_key == value, Product.id < last_id)
+                ))
+            else:
+                query = query.filter(or_(
+                    sort_key > value,
+                    and_(sort_key == value, Product.id > last_id)
+                ))
+        
+        if descending:
+            query = query.order_by(desc(sort_key), desc(Product.id))
+        else:
+            query = query.order_by(asc(sort_key), asc(Product.id))
+        
+        # Лишняя строка показывает, есть ли следующая страница
+        rows = query.limit(limit + 1).all()
+        items = [dict(row._mapping) for row in rows[:limit]]
+        
+        # Карточки ссылаются на миниатюры, а не на исходные файлы
+        primary_images = ProductImageService(self.db).get_primary_hashes([item["id"] for item in items])
+        for item in items:
+            content_hash = primary_images.get(item["id"])
+            item["thumbnail"] = thumbnail_urls(content_hash) if content_hash else None
+        
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_catalog_cursor(sort, items[-1])
+        
+        return {"items": items, "next_cursor": next_cursor}
+    
+    @staticmethod
+    def search_condition(search_term: str):
+        """Условие поиска товаров по названию, описанию и поставщику"""
+        return or_(
+            Product.name.ilike(f"%{search_term}%"),
+            Product.description.ilike(f"%{search_term}%"),
+            Product.supplier_name.ilike(f"%{search_term}%")
+        )
+    
     def search_products(self, search_term: str) -> List[Product]:
         """Поиск товаров по названию и описанию"""
         try:
-            return self.db.query(Product).filter(
-                or_(
-                    Product.name.ilike(f"%{search_term}%"),
-                    Product.description.ilike(f"%{search_term}%"),
-                    Product.supplier_name.ilike(f"%{search_term}%")
-                )
-            ).all()
+            return self.db.query(Product).filter(self.search_condition(search_term)).all()
         except Exception as e:
             logger.error(f"Error searching products: {e}")
             return []
@@ -95,6 +255,7 @@ class ProductService(BaseService[Product, ProductCreate, ProductUpdate]):
             self.db.commit()
             self.db.refresh(product)
             logger.info(f"Updated product {product_id} quantity to {new_quantity}")
+            self._on_products_changed()
             return product
         except Exception as e:
             self.db.rollback()
@@ -112,6 +273,7 @@ class ProductService(BaseService[Product, ProductCreate, ProductUpdate]):
             self.db.commit()
             self.db.refresh(product)
             logger.info(f"Updated product {product_id} status to {status}")
+            self._on_products_changed()
             return product
         except Exception as e:
             self.db.rollback()
@@ -201,6 +363,7 @@ class ProductService(BaseService[Product, ProductCreate, ProductUpdate]):
             
             self.db.commit()
             logger.info(f"Bulk updated {updated_count} products status to {status}")
+            self._on_products_changed()
             return updated_count
         except Exception as e:
             self.db.rollback()
@@ -3,15 +3,78 @@
 """
 import qrcode
 import qrcode.image.svg
+from qrcode.exceptions import DataOverflowError
 from io import BytesIO
 import base64
+import hashlib
+import hmac
+import json
+import time
 import uuid
-from typing import Optional, Dict, Any
+from functools import lru_cache
+from itertools import groupby
+from typing import Optional, Dict, Any, List, Tuple
 import logging
 from datetime import datetime
 
+from app.cache import LRUCache
+from app.config import settings
+
 logger = logging.getLogger(__name__)
 
+# Типы заказов, для которых выпускаются подписанные токены
+ORDER_TOKEN_TYPES = ("shop_order", "order")
+
+# Длина подписи токена в байтах (128 бит)
+TOKEN_SIGNATURE_BYTES = 16
+
+# Бэкенды отрисовки QR-кодов и MIME типы результата
+QR_BACKENDS = {
+    "svg": "image/svg+xml",           # SVG контуром через qrcode (SvgPathImage)
+    "svg-compact": "image/svg+xml",   # SVG одним path из отрезков строк
+    "png": "image/png",               # PNG через Pillow
+    "matrix": "application/json"      # матрица модулей для отрисовки на клиенте
+}
+
+# Уровни коррекции ошибок
+ERROR_CORRECTION_LEVELS = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H
+}
+
+# Ширина белой рамки в модулях
+QR_BORDER = 4
+
+
+@lru_cache(maxsize=8)
+def _token_keys(secret_key: str, previous_keys: str) -> Tuple[str, Dict[str, bytes]]:
+    """
+    Ключи подписи QR-токенов
+
+    Ключ выводится из секрета, чтобы не совпадать с ключом сессий.
+    Идентификатор ключа входит в токен, поэтому при проверке ключ
+    выбирается сразу, без перебора.
+
+    Returns:
+        (идентификатор текущего ключа, ключи по идентификаторам)
+    """
+    keys = {}
+    secrets = [secret_key] + [key.strip() for key in previous_keys.split(",") if key.strip()]
+    for secret in secrets:
+        key = hashlib.sha256(f"qr-token:{secret}".encode("utf-8")).digest()
+        key_id = hashlib.sha256(key).hexdigest()[:6]
+        keys.setdefault(key_id, key)
+    return next(iter(keys)), keys
+
+
+def _token_signature(key: bytes, order_type: str, order_code: str, issued_at: str) -> str:
+    """Подпись HMAC-SHA256 над типом, кодом заказа и временем выпуска"""
+    message = f"{order_type}:{order_code}:{issued_at}".encode("utf-8")
+    digest = hmac.new(key, message, hashlib.sha256).digest()[:TOKEN_SIGNATURE_BYTES]
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
 
 class QRCodeService:
     """Сервис для работы с QR-кодами"""
@@ -19,6 +82,191 @@ class QRCodeService:
     def __init__(self):
         self.qr_factory = qrcode.image.svg.SvgPathImage
     
+    def _make_qr(self, data: str, version: Optional[int] = None, error_correction: Optional[str] = None) -> qrcode.QRCode:
+        """
+        Построение матрицы QR-кода
+        
+        Версия подбирается по длине данных, только если она не задана ни
+        аргументом, ни настройкой QR_VERSION. Не поместившиеся в заданную
+        аргументом версию данные дают ValueError; в версию из настроек -
+        подбор версии.
+        """
+        level = error_correction or settings.qr_error_correction
+        if level not in ERROR_CORRECTION_LEVELS:
+            raise ValueError(f"Неизвестный уровень коррекции ошибок: {level}")
+        
+        fixed_version = version or settings.qr_version or None
+        qr = qrcode.QRCode(
+            version=fixed_version,
+            error_correction=ERROR_CORRECTION_LEVELS[level],
+            box_size=10,
+            border=QR_BORDER,
+        )
+        qr.add_data(data)
+        try:
+            qr.make(fit=fixed_version is None)
+        except DataOverflowError:
+            if version:
+                raise ValueError(f"Данные не помещаются в QR-код версии {version}")
+            qr.version = None
+            qr.make(fit=True)
+        return qr
+    
+    def render_svg(self, data: str, version: Optional[int] = None, error_correction: Optional[str] = None) -> bytes:
+        """
+        Отрисовка QR-кода в SVG
+        
+        Args:
+            data: Данные для кодирования
+            version: Версия QR-кода (1-40)
+            error_correction: Уровень коррекции ошибок (L, M, Q, H)
+            
+        Returns:
+            SVG документ
+        """
+        img = self._make_qr(data, version, error_correction).make_image(image_factory=self.qr_factory)
+        buffer = BytesIO()
+        img.save(buffer)
+        return buffer.getvalue()
+    
+    def render_svg_compact(
+        self,
+        data: str,
+        box_size: int = 10,
+        version: Optional[int] = None,
+        error_correction: Optional[str] = None
+    ) -> bytes:
+        """
+        Отрисовка QR-кода в компактный SVG
+        
+        Соседние темные модули строки объединяются в один прямоугольник
+        общего контура, координаты - в модулях (viewBox), без XML пролога.
+        
+        Returns:
+            SVG документ
+        """
+        qr = self._make_qr(data, version, error_correction)
+        size = qr.modules_count + 2 * QR_BORDER
+        path = []
+        for y, row in enumerate(qr.modules, start=QR_BORDER):
+            x = QR_BORDER
+            for dark, run in groupby(row):
+                width = len(list(run))
+                if dark:
+                    path.append(f"M{x} {y}h{width}v1h-{width}z")
+                x += width
+        
+        svg = (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{size * box_size}" height="{size * box_size}" '
+            f'viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+            f'<rect width="{size}" height="{size}" fill="#fff"/><path d="{"".join(path)}"/></svg>'
+        )
+        return svg.encode("ascii")
+    
+    def render_png(
+        self,
+        data: str,
+        box_size: int = 10,
+        version: Optional[int] = None,
+        error_correction: Optional[str] = None
+    ) -> bytes:
+        """
+        Отрисовка QR-кода в PNG
+        
+        Args:
+            data: Данные для кодирования
+            box_size: Размер модуля в пикселях
+            version: Версия QR-кода (1-40)
+            error_correction: Уровень коррекции ошибок (L, M, Q, H)
+            
+        Returns:
+            PNG изображение
+        """
+        qr = self._make_qr(data, version, error_correction)
+        qr.box_size = box_size
+        img = qr.make_image(fill_color="black", back_color="white")
+        buffer = BytesIO()
+        img.save(buffer, format="PNG")
+        return buffer.getvalue()
+    
+    def render_matrix(self, data: str, version: Optional[int] = None, error_correction: Optional[str] = None) -> bytes:
+        """
+        Матрица модулей QR-кода в JSON для отрисовки на клиенте
+        
+        Строки матрицы - из "0" и "1", без рамки: ширина рамки (в модулях)
+        передается отдельно.
+        
+        Returns:
+            JSON документ
+        """
+        qr = self._make_qr(data, version, error_correction)
+        return json.dumps({
+            "version": qr.version,
+            "error_correction": error_correction or settings.qr_error_correction,
+            "size": qr.modules_count,
+            "border": QR_BORDER,
+            "rows": ["".join("1" if module else "0" for module in row) for row in qr.modules]
+        }, separators=(",", ":")).encode("ascii")
+    
+    def draw(
+        self,
+        data: str,
+        backend: str,
+        box_size: int = 10,
+        version: Optional[int] = None,
+        error_correction: Optional[str] = None
+    ) -> bytes:
+        """
+        Отрисовка QR-кода выбранным бэкендом (без кэша)
+        
+        Args:
+            data: Данные для кодирования
+            backend: Бэкенд из QR_BACKENDS
+            box_size: Размер модуля в пикселях (png, svg-compact)
+            version: Версия QR-кода (1-40), по умолчанию из настроек или по длине данных
+            error_correction: Уровень коррекции ошибок (L, M, Q, H)
+            
+        Returns:
+            Содержимое изображения
+        """
+        if backend == "svg":
+            return self.render_svg(data, version, error_correction)
+        if backend == "svg-compact":
+            return self.render_svg_compact(data, box_size, version, error_correction)
+        if backend == "png":
+            return self.render_png(data, box_size, version, error_correction)
+        if backend == "matrix":
+            return self.render_matrix(data, version, error_correction)
+        raise ValueError(f"Неизвестный бэкенд QR-кодов: {backend}")
+    
+    def render(
+        self,
+        data: str,
+        backend: str,
+        box_size: int = 10,
+        version: Optional[int] = None,
+        error_correction: Optional[str] = None
+    ) -> bytes:
+        """
+        Отрисовка QR-кода через кэш отрисованных изображений
+        
+        Args:
+            data: Данные для кодирования
+            backend: Бэкенд из QR_BACKENDS
+            box_size: Размер модуля в пикселях
+            version: Версия QR-кода (1-40)
+            error_correction: Уровень коррекции ошибок (L, M, Q, H)
+            
+        Returns:
+            Содержимое изображения
+        """
+        key = (data, backend, box_size, version, error_correction)
+        content = qr_image_cache.get(key)
+        if content is None:
+            content = self.draw(data, backend, box_size, version, error_correction)
+            qr_image_cache.set(key, content)
+        return content
+    
     def generate_qr_code(self, data: str, size: int = 200) -> str:
         """
         Генерация QR-кода в формате base64
@@ -31,32 +279,106 @@ class QRCodeService:
             Base64 строка с SVG изображением
         """
         try:
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(data)
-            qr.make(fit=True)
-            
-            # Создаем SVG изображение
-            img = qr.make_image(image_factory=self.qr_factory)
-            
-            # Конвертируем в base64
-            buffer = BytesIO()
-            img.save(buffer)
-            buffer.seek(0)
-            
-            svg_data = buffer.getvalue().decode('utf-8')
-            base64_data = base64.b64encode(svg_data.encode('utf-8')).decode('utf-8')
-            
+            base64_data = base64.b64encode(self.render_svg(data)).decode('utf-8')
             return f"data:image/svg+xml;base64,{base64_data}"
             
         except Exception as e:
             logger.error(f"Error generating QR code: {e}")
             return None
     
+    def make_order_payload(self, order_type: str, order_code: str) -> str:
+        """
+        Данные QR-кода заказа (создаются один раз при оформлении)
+        
+        Args:
+            order_type: Тип заказа (order или shop_order)
+            order_code: Код заказа
+            
+        Returns:
+            Строка вида "shop_order:A-1B2C3D:<токен>"
+        """
+        return f"{order_type}:{order_code}:{self.sign_order_token(order_type, order_code)}"
+    
+    def sign_order_token(self, order_type: str, order_code: str, issued_at: Optional[int] = None) -> str:
+        """
+        Подписанный токен заказа вида "<ключ>.<время выпуска>.<подпись>"
+        
+        Args:
+            order_type: Тип заказа (order или shop_order)
+            order_code: Код заказа
+            issued_at: Время выпуска (unix), по умолчанию текущее
+            
+        Returns:
+            Токен для QR-кода и ссылки отслеживания
+        """
+        key_id, keys = _token_keys(settings.secret_key, settings.qr_token_previous_keys)
+        issued = format(int(time.time() if issued_at is None else issued_at), "x")
+        return f"{key_id}.{issued}.{_token_signature(keys[key_id], order_type, order_code, issued)}"
+    
+    def verify_order_token(self, order_type: str, order_code: str, token: str) -> bool:
+        """
+        Проверка подписи токена заказа без обращения к БД
+        
+        Принимаются токены, подписанные текущим или прежними ключами
+        (QR_TOKEN_PREVIOUS_KEYS). Подписи сравниваются за постоянное время.
+        
+        Args:
+            order_type: Тип заказа (order или shop_order)
+            order_code: Код заказа
+            token: Токен из QR-кода или ссылки
+            
+        Returns:
+            True если токен выпущен для этого заказа и не истек
+        """
+        try:
+            key_id, issued, signature = token.split(".")
+            key = _token_keys(settings.secret_key, settings.qr_token_previous_keys)[1].get(key_id)
+            if key is None:
+                return False
+            
+            expected = _token_signature(key, order_type, order_code, issued)
+            if not hmac.compare_digest(expected.encode("ascii"), signature.encode("ascii", "replace")):
+                return False
+            
+            if settings.qr_token_max_age_days:
+                age = time.time() - int(issued, 16)
+                if age > settings.qr_token_max_age_days * 86400:
+                    return False
+            
+            return True
+        except ValueError:
+            return False
+    
+    def token_key_ids(self) -> List[str]:
+        """Идентификаторы ключей, подписи которых принимаются (текущий и прежние)"""
+        return list(_token_keys(settings.secret_key, settings.qr_token_previous_keys)[1])
+    
+    def token_needs_resign(self, token: str) -> bool:
+        """
+        Токен нужно выпустить заново: прежний формат (uuid4) или ключ,
+        выведенный из оборота
+        
+        Подпись и срок действия не проверяются: истекший токен остается
+        истекшим, а не продлевается повторной подписью.
+        """
+        parts = token.split(".")
+        return len(parts) != 3 or parts[0] not in self.token_key_ids()
+    
+    def identify_order_token(self, order_code: str, token: str) -> Optional[str]:
+        """
+        Тип заказа, для которого выпущен токен (или None, если токен недействителен)
+        
+        Нужен, чтобы проверить токен до поиска заказа в БД.
+        """
+        for order_type in ORDER_TOKEN_TYPES:
+            if self.verify_order_token(order_type, order_code, token):
+                return order_type
+        return None
+    
+    def make_product_payload(self, product_id: int) -> str:
+        """Данные QR-кода товара для складских этикеток (постоянные)"""
+        return f"product:{product_id}"
+    
     def generate_order_qr_code(self, order_code: str, order_id: int) -> Dict[str, Any]:
         """
         Генерация QR-кода для заказа
@@ -69,8 +391,8 @@ class QRCodeService:
             Словарь с данными QR-кода
         """
         try:
-            # Создаем уникальный токен для заказа
-            qr_token = str(uuid.uuid4())
+            # Подписанный токен заказа
+            qr_token = self.sign_order_token("order", order_code)
             
             # Данные для QR-кода
             qr_data = {
@@ -109,8 +431,8 @@ class QRCodeService:
             Словарь с данными QR-кода
         """
         try:
-            # Создаем уникальный токен для заказа
-            qr_token = str(uuid.uuid4())
+            # Подписанный токен заказа
+            qr_token = self.sign_order_token("shop_order", order_code)
             
             # Данные для QR-кода
             qr_data = {
@@ -226,10 +548,10 @@ class QRCodeService:
             if expected_type and parsed_data.get("type") != expected_type:
                 return False
             
-            # Здесь можно добавить дополнительную валидацию токена
-            # Например, проверку в базе данных или проверку времени создания
+            if parsed_data["type"] not in ORDER_TOKEN_TYPES:
+                return False
             
-            return True
+            return self.verify_order_token(parsed_data["type"], parsed_data["identifier"], parsed_data["token"])
             
         except Exception as e:
             logger.error(f"Error validating QR token: {e}")
@@ -257,5 +579,8 @@ class QRCodeService:
             return None
 
 
+# Глобальный кэш отрисованных QR-кодов: (данные, бэкенд, размер, версия, коррекция) -> bytes
+qr_image_cache = LRUCache(max_bytes=settings.qr_image_cache_max_bytes)
+
 # Глобальный экземпляр сервиса
 qr_service = QRCodeService()
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""
+Индекс подсказок для поиска товаров по мере ввода
+
+Отсортированный массив ключей в памяти воркера; поиск по префиксу
+выполняется бинарным поиском без обращения к БД.
+"""
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import re
+import threading
+import time
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD_RE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize(text: Optional[str]) -> str:
+    """Нормализация текста для поиска: регистр, ё, пунктуация и пробелы"""
+    if not text:
+        return ""
+    text = text.lower().replace("ё", "е")
+    return " ".join(_NON_WORD_RE.sub(" ", text).split())
+
+
+def _word_suffixes(text: str) -> List[str]:
+    """Ключи с начала каждого слова: "iphone 15 pro" -> ["iphone 15 pro", "15 pro", "pro"]"""
+    words = text.split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    """Префиксный индекс по названиям товаров и поставщикам"""
+
+    def __init__(self):
+        self._keys: List[Tuple[str, int]] = []
+        self._products: Dict[int, Dict[str, Any]] = {}
+        self._product_keys: Dict[int, List[Tuple[str, int]]] = {}
+        self._lock = threading.Lock()
+        # Полные перестроения выполняются по одному
+        self._build_lock = threading.Lock()
+        # Изменения товаров за время перестроения: id -> (name, supplier_name) или None (удален)
+        self._pending: Optional[Dict[int, Optional[Tuple[str, Optional[str]]]]] = None
+        self.built_at: Optional[float] = None
+
+    @property
+    def is_built(self) -> bool:
+        return self.built_at is not None
+
+    def _keys_for(self, product_id: int, name: str, supplier_name: Optional[str]) -> List[Tuple[str, int]]:
+        keys = set(_word_suffixes(normalize(name))) | set(_word_suffixes(normalize(supplier_name)))
+        return [(key, product_id) for key in keys]
+
+    def build(self, rows: Iterable[Tuple[int, str, Optional[str]]]):
+        """
+        Полное построение индекса по строкам (id, name, supplier_name)
+
+        Новый индекс подменяет текущий под блокировкой; изменения товаров,
+        пришедшие во время перестроения, применяются к нему поверх строк.
+        """
+        keys = []
+        products = {}
+        product_keys = {}
+        for product_id, name, supplier_name in rows:
+            products[product_id] = {"id": product_id, "name": name, "supplier_name": supplier_name}
+            product_keys[product_id] = self._keys_for(product_id, name, supplier_name)
+            keys.extend(product_keys[product_id])
+        keys.sort()
+
+        with self._lock:
+            self._keys = keys
+            self._products = products
+            self._product_keys = product_keys
+            for product_id, change in (self._pending or {}).items():
+                if change is None:
+                    self._remove(product_id)
+                else:
+                    self._upsert(product_id, *change)
+            self.built_at = time.time()
+
+    def rebuild(self, db: Session) -> int:
+        """Построение индекса из БД"""
+        with self._build_lock:
+            return self._rebuild(db)
+
+    def ensure_built(self, db: Session):
+        """Построение индекса, если его еще нет (дожидается идущего перестроения)"""
+        with self._build_lock:
+            if not self.is_built:
+                self._rebuild(db)
+
+    def _rebuild(self, db: Session) -> int:
+        """Построение индекса из БД (под блокировкой перестроения)"""
+        start = time.perf_counter()
+        # Запись изменений начинается до чтения строк: изменение, попавшее и
+        # в строки, и в запись, применяется повторно с тем же результатом
+        with self._lock:
+            self._pending = {}
+        try:
+            rows = db.query(Product.id, Product.name, Product.supplier_name).all()
+            self.build(rows)
+        finally:
+            with self._lock:
+                self._pending = None
+        logger.info(f"Suggest index built: {len(rows)} products in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return len(rows)
+
+    def upsert(self, product_id: int, name: str, supplier_name: Optional[str]):
+        """Добавление или обновление товара"""
+        with self._lock:
+            self._upsert(product_id, name, supplier_name)
+            if self._pending is not None:
+                self._pending[product_id] = (name, supplier_name)
+
+    def remove(self, product_id: int):
+        """Удаление товара"""
+        with self._lock:
+            self._remove(product_id)
+            if self._pending is not None:
+                self._pending[product_id] = None
+
+    def _upsert(self, product_id: int, name: str, supplier_name: Optional[str]):
+        """Добавление или обновление товара (под блокировкой)"""
+        self._remove_keys(product_id)
+        new_keys = self._keys_for(product_id, name, supplier_name)
+        for key in new_keys:
+            insort(self._keys, key)
+        self._product_keys[product_id] = new_keys
+        self._products[product_id] = {"id": product_id, "name": name, "supplier_name": supplier_name}
+
+    def _remove(self, product_id: int):
+        """Удаление товара (под блокировкой)"""
+        self._remove_keys(product_id)
+        self._products.pop(product_id, None)
+
+    def _remove_keys(self, product_id: int):
+        """Удаление ключей товара (под блокировкой)"""
+        for key in self._product_keys.pop(product_id, []):
+            position = bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Товары, у которых название или поставщик содержит слово с таким префиксом"""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+
+        results = []
+        seen = set()
+        with self._lock:
+            position = bisect_left(self._keys, (prefix, -1))
+            while position < len(self._keys) and len(results) < limit:
+                key, product_id = self._keys[position]
+                if not key.startswith(prefix):
+                    break
+                if product_id not in seen:
+                    seen.add(product_id)
+                    results.append(self._products[product_id])
+                position += 1
+        return results
+
+    def clear(self):
+        """Сброс индекса (будет построен заново при следующем обращении)"""
+        with self._lock:
+            self._keys = []
+            self._products = {}
+            self._product_keys = {}
+            self.built_at = None
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+
+def rebuild_suggest_index() -> int:
+    """Перестроение индекса в отдельной сессии БД (для фоновой задачи)"""
+    db = SessionLocal()
+    try:
+        return suggest_index.rebuild(db)
+    finally:
+        db.close()
+
+
+# Глобальный экземпляр индекса подсказок (свой в каждом воркере)
+suggest_index = PrefixIndex()
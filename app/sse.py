@@ -0,0 +1,50 @@
+"""
+Server-Sent Events
+
+Форматирование событий и обход сжатия для потоков событий: сжатие
+буферизует мелкие события, и клиент получает их с задержкой.
+"""
+import json
+from typing import Any, Optional, Type
+
+from starlette.datastructures import Headers
+
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+
+# Заголовки потока событий (X-Accel-Buffering отключает буферизацию nginx)
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"
+}
+
+
+def format_event(data: Any, event: Optional[str] = None) -> str:
+    """Событие в формате text/event-stream"""
+    lines = []
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def format_comment(text: str = "ping") -> str:
+    """Комментарий для поддержания соединения"""
+    return f": {text}\n\n"
+
+
+def bypass_event_streams(middleware_class: Type) -> Type:
+    """
+    Middleware сжатия, пропускающий запросы потоков событий
+
+    EventSource всегда отправляет Accept: text/event-stream, поэтому
+    поток распознается до начала ответа.
+    """
+    class EventStreamBypass(middleware_class):
+        async def __call__(self, scope, receive, send):
+            if scope["type"] == "http" and EVENT_STREAM_MEDIA_TYPE in Headers(scope=scope).get("accept", ""):
+                await self.app(scope, receive, send)
+                return
+            await super().__call__(scope, receive, send)
+
+    EventStreamBypass.__name__ = middleware_class.__name__
+    return EventStreamBypass
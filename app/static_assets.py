@@ -0,0 +1,215 @@
+"""
+Статические файлы: хэши в именах и предварительно сжатые варианты
+
+Сборка сжатых вариантов:
+    python -m app.static_assets
+"""
+import argparse
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+import threading
+from typing import Dict, Optional, Tuple
+import logging
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Имя файла с хэшем содержимого: app.3f9a2b1c4d.css
+FINGERPRINT_RE = re.compile(r"^(?P<base>.+)\.(?P<hash>[0-9a-f]{10})(?P<ext>\.[A-Za-z0-9]+)$")
+
+# Кэширование файлов с хэшем в имени
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Типы файлов, которые имеет смысл сжимать заранее
+PRECOMPRESS_EXTENSIONS = {".css", ".js", ".mjs", ".svg", ".html", ".json", ".txt", ".map", ".xml"}
+
+# Предварительно сжатые варианты в порядке предпочтения
+PRECOMPRESSED_VARIANTS = [("br", ".br"), ("gzip", ".gz")]
+
+
+class StaticAssets:
+    """Хэши содержимого статических файлов для URL с отпечатком"""
+
+    def __init__(self, directory: str, url_prefix: str = "/static"):
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self._hashes: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def fingerprint(self, path: str) -> Optional[str]:
+        """Хэш содержимого файла (пересчитывается при изменении файла)"""
+        full_path = os.path.join(self.directory, path)
+        try:
+            mtime = os.stat(full_path).st_mtime
+        except OSError:
+            return None
+
+        with self._lock:
+            cached = self._hashes.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        digest = hashlib.sha256()
+        with open(full_path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+        file_hash = digest.hexdigest()[:10]
+
+        with self._lock:
+            self._hashes[path] = (mtime, file_hash)
+        return file_hash
+
+    def url(self, path: str) -> str:
+        """URL файла с хэшем содержимого в имени"""
+        path = path.lstrip("/")
+        file_hash = self.fingerprint(path)
+        if not file_hash:
+            return f"{self.url_prefix}/{path}"
+
+        base, ext = os.path.splitext(path)
+        return f"{self.url_prefix}/{base}.{file_hash}{ext}"
+
+
+class FingerprintedStaticFiles(StaticFiles):
+    """
+    Раздача статики с поддержкой имен с хэшем
+
+    Файлы, запрошенные по актуальному хэшу, отдаются с годовым immutable
+    кэшированием. Если рядом с файлом лежит .br/.gz вариант и клиент его
+    принимает, отдается сжатый вариант.
+    """
+
+    def __init__(self, *args, assets: StaticAssets, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.assets = assets
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        immutable = False
+        match = FINGERPRINT_RE.match(path)
+        if match:
+            original_path = match.group("base") + match.group("ext")
+            current_hash = self.assets.fingerprint(original_path)
+            if current_hash is not None:
+                # Устаревший хэш отдает текущий файл, но без immutable
+                immutable = current_hash == match.group("hash")
+                path = original_path
+
+        response = await self._precompressed_response(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+
+        if immutable and response.status_code == 200:
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+    async def _precompressed_response(self, path: str, scope: Scope) -> Optional[Response]:
+        """Ответ предварительно сжатым вариантом файла"""
+        if scope["method"] not in ("GET", "HEAD"):
+            return None
+
+        request_headers = Headers(scope=scope)
+        accept_encoding = request_headers.get("accept-encoding", "")
+        for encoding, suffix in PRECOMPRESSED_VARIANTS:
+            if encoding not in accept_encoding:
+                continue
+
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if not stat_result or not stat.S_ISREG(stat_result.st_mode):
+                continue
+
+            media_type, _ = mimetypes.guess_type(path)
+            response = FileResponse(
+                full_path,
+                stat_result=stat_result,
+                method=scope["method"],
+                media_type=media_type or "application/octet-stream",
+                headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"}
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+
+        return None
+
+
+def _is_stale(source: str, target: str) -> bool:
+    """Сжатый вариант отсутствует или старее исходного файла"""
+    return not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(source)
+
+
+def precompress_directory(directory: str, minimum_size: int = None) -> int:
+    """
+    Создание .gz (и .br, если установлен brotli) вариантов статических файлов
+
+    Returns:
+        Количество созданных файлов
+    """
+    minimum_size = minimum_size if minimum_size is not None else settings.compression_minimum_size
+    created = 0
+
+    for root, _, files in os.walk(directory):
+        for name in files:
+            source = os.path.join(root, name)
+            if os.path.splitext(name)[1].lower() not in PRECOMPRESS_EXTENSIONS:
+                continue
+            if os.path.getsize(source) < minimum_size:
+                continue
+
+            with open(source, "rb") as f:
+                content = f.read()
+
+            if _is_stale(source, source + ".gz"):
+                with open(source + ".gz", "wb") as f:
+                    f.write(gzip.compress(content, compresslevel=9, mtime=0))
+                created += 1
+
+            if brotli is not None and _is_stale(source, source + ".br"):
+                with open(source + ".br", "wb") as f:
+                    f.write(brotli.compress(content, quality=11))
+                created += 1
+
+    logger.info(f"Precompressed static files in {directory}: {created} created")
+    return created
+
+
+# Глобальный экземпляр хэшей статики
+static_assets = StaticAssets(settings.static_dir)
+
+
+def static_url(path: str) -> str:
+    """URL статического файла с хэшем содержимого (для шаблонов)"""
+    return static_assets.url(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Предварительное сжатие статических файлов")
+    parser.add_argument("--directory", default=settings.static_dir, help="Папка статики")
+    parser.add_argument("--min-size", type=int, default=None, help="Минимальный размер файла в байтах")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"Static directory {args.directory} not found")
+        return
+
+    created = precompress_directory(args.directory, args.min_size)
+    print(f"Created {created} compressed files{'' if brotli else ' (brotli not installed, gzip only)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Общее окружение шаблонов Jinja2
+"""
+import os
+import time
+import logging
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+
+from app.config import settings
+from app.static_assets import static_url
+
+logger = logging.getLogger(__name__)
+
+
+def _create_templates() -> Jinja2Templates:
+    """
+    Создание общего окружения шаблонов
+
+    Байткод скомпилированных шаблонов сохраняется на диск и
+    переиспользуется всеми воркерами и после перезапуска.
+    """
+    auto_reload = settings.template_auto_reload
+    if auto_reload is None:
+        auto_reload = settings.environment != "production"
+
+    env_options = {"auto_reload": auto_reload}
+    if settings.template_bytecode_cache_dir:
+        os.makedirs(settings.template_bytecode_cache_dir, exist_ok=True)
+        env_options["bytecode_cache"] = FileSystemBytecodeCache(settings.template_bytecode_cache_dir)
+
+    templates = Jinja2Templates(directory=settings.templates_dir, **env_options)
+    templates.env.globals["static_url"] = static_url
+    return templates
+
+
+def precompile_templates() -> int:
+    """
+    Предварительная компиляция всех шаблонов
+
+    Returns:
+        Количество скомпилированных шаблонов
+    """
+    start = time.perf_counter()
+    compiled = 0
+    for name in templates.env.list_templates(extensions=["html"]):
+        try:
+            templates.env.get_template(name)
+            compiled += 1
+        except Exception as e:
+            logger.error(f"Error compiling template {name}: {e}")
+
+    logger.info(f"Precompiled {compiled} templates in {time.perf_counter() - start:.3f}s")
+    return compiled
+
+
+# Глобальный экземпляр шаблонов
+templates = _create_templates()
@@ -0,0 +1,121 @@
+"""
+Сравнение путей сериализации списочных API
+
+Стандартный путь FastAPI: ORM объекты -> валидация response_model ->
+JSON через json.dumps. Быстрый путь: кортежи Core запроса -> словари ->
+orjson (app/fast_json.py).
+
+Запуск:
+    python -m benchmarks.json_serialization --rows 1000 --repeat 20
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.fast_json import FastJSONResponse, fetch_rows, schema_columns
+from app.models import product as product_models, order, user, message_log  # noqa: F401
+from app.schemas.product import Product as ProductSchema
+
+
+def standard_path(db) -> bytes:
+    """Путь FastAPI с response_model"""
+    products = db.query(product_models.Product).all()
+    adapter = TypeAdapter(List[ProductSchema])
+    content = adapter.dump_python(adapter.validate_python(products, from_attributes=True), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(db) -> bytes:
+    """Быстрый путь: кортежи и orjson"""
+    query = db.query(*schema_columns(product_models.Product, ProductSchema))
+    return FastJSONResponse(fetch_rows(query)).body
+
+
+def measure(func: Callable, session_factory, repeat: int) -> Dict[str, Any]:
+    """Замер пути сериализации (новая сессия на каждый прогон, как в запросе)"""
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        db = session_factory()
+        try:
+            start = time.perf_counter()
+            size = len(func(db))
+            timings.append(time.perf_counter() - start)
+        finally:
+            db.close()
+
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 2),
+        "min_ms": round(min(timings) * 1000, 2),
+        "bytes": size
+    }
+
+
+def run_benchmark(rows: int = 1000, repeat: int = 20) -> Dict[str, Any]:
+    """Прогон обоих путей на временной SQLite базе"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        engine = create_engine(f"sqlite:///{os.path.join(temp_dir, 'json_bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        db = session_factory()
+        try:
+            db.add_all([
+                product_models.Product(
+                    name=f"Товар {i}",
+                    description=f"Описание товара {i}",
+                    quantity=i,
+                    sell_price_rub=Decimal("100.00") + i,
+                    buy_price_eur=Decimal("1.50"),
+                    supplier_name="Поставщик"
+                )
+                for i in range(rows)
+            ])
+            db.commit()
+        finally:
+            db.close()
+
+        try:
+            standard = measure(standard_path, session_factory, repeat)
+            fast = measure(fast_path, session_factory, repeat)
+        finally:
+            engine.dispose()
+
+    return {
+        "rows": rows,
+        "repeat": repeat,
+        "standard": standard,
+        "fast": fast,
+        "speedup": round(standard["median_ms"] / fast["median_ms"], 2) if fast["median_ms"] else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение путей сериализации JSON")
+    parser.add_argument("--rows", type=int, default=1000, help="Строк в ответе")
+    parser.add_argument("--repeat", type=int, default=20, help="Количество прогонов")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.rows, args.repeat)
+    print(f"Rows: {results['rows']}, repeat: {results['repeat']}")
+    for path in ["standard", "fast"]:
+        stats = results[path]
+        print(f"{path:<10}median {stats['median_ms']:>8} ms   min {stats['min_ms']:>8} ms   {stats['bytes']} bytes")
+    print(f"Speedup: x{results['speedup']}")
+
+
+if __name__ == "__main__":
+    main()
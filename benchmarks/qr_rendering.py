@@ -0,0 +1,96 @@
+"""
+Сравнение бэкендов отрисовки QR-кодов
+
+Каждый бэкенд (app/services/qr_service.py, QR_BACKENDS) отрисовывает
+одну и ту же партию данных заказов без кэша. Замеряются QR-кодов в
+секунду и размер результата. С --version бэкенды дополнительно
+прогоняются с фиксированной версией, без подбора версии по длине данных.
+
+Запуск:
+    python -m benchmarks.qr_rendering --count 500 --version 4 --ec M
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.qr_service import qr_service, QR_BACKENDS
+
+
+def make_payloads(count: int) -> List[str]:
+    """Данные QR-кодов заказов, как при оформлении"""
+    return [
+        qr_service.make_order_payload("shop_order", uuid.uuid4().hex[:8].upper())
+        for _ in range(count)
+    ]
+
+
+def measure(
+    backend: str,
+    payloads: List[str],
+    box_size: int,
+    version: Optional[int],
+    error_correction: str
+) -> Dict[str, Any]:
+    """Замер бэкенда на партии данных"""
+    sizes = []
+    start = time.perf_counter()
+    for payload in payloads:
+        sizes.append(len(qr_service.draw(payload, backend, box_size, version, error_correction)))
+    duration = time.perf_counter() - start
+
+    return {
+        "backend": backend,
+        "version": version or "auto",
+        "codes_per_second": round(len(payloads) / duration, 1) if duration else None,
+        "median_bytes": int(statistics.median(sizes)),
+        "total_bytes": sum(sizes)
+    }
+
+
+def run_benchmark(
+    count: int = 500,
+    box_size: int = 10,
+    version: Optional[int] = None,
+    error_correction: str = "L"
+) -> Dict[str, Any]:
+    """Прогон всех бэкендов (с подбором версии и, если задана, с фиксированной)"""
+    payloads = make_payloads(count)
+    versions = [None, version] if version else [None]
+
+    return {
+        "count": count,
+        "box_size": box_size,
+        "error_correction": error_correction,
+        "results": [
+            measure(backend, payloads, box_size, fixed_version, error_correction)
+            for fixed_version in versions
+            for backend in QR_BACKENDS
+        ]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение бэкендов отрисовки QR-кодов")
+    parser.add_argument("--count", type=int, default=500, help="QR-кодов на бэкенд")
+    parser.add_argument("--box-size", type=int, default=10, help="Размер модуля в пикселях")
+    parser.add_argument("--version", type=int, default=None, help="Фиксированная версия QR-кода (1-40)")
+    parser.add_argument("--ec", default="L", choices=["L", "M", "Q", "H"], help="Уровень коррекции ошибок")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.count, args.box_size, args.version, args.ec)
+    print(f"Codes: {results['count']}, box size: {results['box_size']}, error correction: {results['error_correction']}")
+    for stats in results["results"]:
+        print(
+            f"{stats['backend']:<12} version {str(stats['version']):<5}"
+            f"{stats['codes_per_second']:>10} codes/s   median {stats['median_bytes']:>7} bytes"
+        )
+
+
+if __name__ == "__main__":
+    main()
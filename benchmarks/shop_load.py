@@ -0,0 +1,339 @@
+"""
+Нагрузочный тест магазина Sirius Group V2
+
+Прогоняет множество покупателей через полный путь заказа:
+каталог -> добавление в корзину -> оформление -> создание заказа -> отслеживание.
+Приложение запускается в процессе через ASGI транспорт httpx на отдельной
+SQLite базе, поэтому рабочая база не затрагивается.
+
+Запуск:
+    python -m benchmarks.shop_load --shoppers 200 --concurrency 20 --output results.json
+    python -m benchmarks.shop_load --compare results.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Any, Optional
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base, get_db
+from app.models import product as product_models, order as order_models, user, message_log  # noqa: F401
+
+# Шаги пути покупателя в порядке выполнения
+STEPS = ["catalog", "add_to_cart", "checkout_page", "process_checkout", "order_ready", "track"]
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Перцентиль методом ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+def summarize(latencies: Dict[str, List[float]], errors: Dict[str, int], duration: float) -> Dict[str, Any]:
+    """Сводка по шагам: перцентили задержки в мс и пропускная способность"""
+    summary = {}
+    for step in STEPS:
+        values = latencies.get(step, [])
+        if not values and not errors.get(step):
+            continue
+        summary[step] = {
+            "count": len(values),
+            "errors": errors.get(step, 0),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "max_ms": round(max(values) * 1000, 2) if values else 0.0,
+            "throughput_rps": round(len(values) / duration, 2) if duration else 0.0
+        }
+    return summary
+
+
+def seed_catalog(session_factory, products: int):
+    """Заполнение каталога тестовыми товарами"""
+    db = session_factory()
+    try:
+        for i in range(products):
+            db.add(product_models.Product(
+                name=f"Load test product {i}",
+                description=f"Описание товара {i}",
+                quantity=1_000_000,
+                sell_price_rub=Decimal("100.00") + i,
+                supplier_name="Load test supplier"
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+class LoadTest:
+    """Прогон покупателей через магазин"""
+
+    def __init__(self, app, session_factory, product_ids: List[int], async_checkout: bool = False):
+        self.app = app
+        self.session_factory = session_factory
+        self.product_ids = product_ids
+        self.async_checkout = async_checkout
+        self.latencies: Dict[str, List[float]] = {step: [] for step in STEPS}
+        self.errors: Dict[str, int] = {step: 0 for step in STEPS}
+
+    async def _timed(self, step: str, request_coro, expected_status=(200,)) -> Optional[httpx.Response]:
+        """Выполнение запроса с замером времени"""
+        start = time.perf_counter()
+        try:
+            response = await request_coro
+        except Exception:
+            self.errors[step] += 1
+            return None
+
+        elapsed = time.perf_counter() - start
+        if response.status_code not in expected_status:
+            self.errors[step] += 1
+            return None
+
+        self.latencies[step].append(elapsed)
+        return response
+
+    async def _wait_for_orders(self, client: httpx.AsyncClient, token: str) -> List[str]:
+        """Ожидание обработки заявки асинхронного оформления"""
+        start = time.perf_counter()
+        for _ in range(600):
+            response = await client.get(f"/api/shop/checkout/{token}")
+            if response.status_code == 200:
+                data = response.json()
+                if data["status"] == "completed":
+                    self.latencies["order_ready"].append(time.perf_counter() - start)
+                    return data["order_codes"]
+                if data["status"] == "failed":
+                    break
+            await asyncio.sleep(0.05)
+
+        self.errors["order_ready"] += 1
+        return []
+
+    async def run_shopper(self, shopper_id: int):
+        """Один покупатель проходит весь путь заказа"""
+        transport = httpx.ASGITransport(app=self.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            if not await self._timed("catalog", client.get("/shop/")):
+                return
+
+            product_id = random.choice(self.product_ids)
+            if not await self._timed("add_to_cart", client.post(
+                "/api/shop/cart/add", params={"product_id": product_id, "quantity": 1}
+            )):
+                return
+
+            if not await self._timed("checkout_page", client.get("/shop/checkout")):
+                return
+
+            response = await self._timed("process_checkout", client.post("/shop/checkout", data={
+                "customer_name": f"Покупатель {shopper_id}",
+                "customer_phone": f"+7928{shopper_id:07d}",
+                "delivery_option": "SELF_PICKUP_GROZNY"
+            }), expected_status=(302, 303))
+            if not response:
+                return
+
+            query = parse_qs(urlparse(response.headers["location"]).query)
+            if "token" in query:
+                order_codes = await self._wait_for_orders(client, query["token"][0])
+            else:
+                order_codes = query.get("orders", [""])[0].split(",")
+
+            for order_code in filter(None, order_codes):
+                await self._timed("track", client.get(f"/track/{order_code}"))
+
+    async def _checkout_worker(self, stop: asyncio.Event):
+        """Обработчик очереди заказов внутри нагрузочного теста"""
+        from app.services.checkout_service import CheckoutQueueService
+
+        loop = asyncio.get_running_loop()
+
+        def process():
+            db = self.session_factory()
+            try:
+                return CheckoutQueueService(db).process_batch()
+            finally:
+                db.close()
+
+        while not stop.is_set():
+            processed = await loop.run_in_executor(None, process)
+            if not processed:
+                await asyncio.sleep(0.05)
+
+    async def run(self, shoppers: int, concurrency: int) -> float:
+        """Запуск всех покупателей с ограничением параллельности"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(shopper_id: int):
+            async with semaphore:
+                await self.run_shopper(shopper_id)
+
+        stop = asyncio.Event()
+        worker = asyncio.create_task(self._checkout_worker(stop)) if self.async_checkout else None
+
+        start = time.perf_counter()
+        await asyncio.gather(*(limited(i) for i in range(shoppers)))
+        duration = time.perf_counter() - start
+
+        if worker:
+            stop.set()
+            await worker
+        return duration
+
+
+def _git_revision() -> Optional[str]:
+    """Текущая ревизия git для сравнения прогонов"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+async def run_load_test(
+    shoppers: int = 50,
+    concurrency: int = 10,
+    products: int = 100,
+    async_checkout: bool = False,
+    database_path: str = None
+) -> Dict[str, Any]:
+    """
+    Нагрузочный прогон магазина
+
+    Returns:
+        Результаты в виде словаря, пригодного для сохранения в JSON
+    """
+    from app.main import app
+    from app.config import settings
+    from app.cache import page_cache
+    from app.services.order_code_registry import tracking_miss_cache
+
+    temp_dir = None
+    if not database_path:
+        temp_dir = tempfile.TemporaryDirectory()
+        database_path = os.path.join(temp_dir.name, "load_test.db")
+
+    engine = create_engine(
+        f"sqlite:///{database_path}",
+        connect_args={"check_same_thread": False, "timeout": 30}
+    )
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    seed_catalog(session_factory, products)
+
+    db = session_factory()
+    try:
+        product_ids = [row.id for row in db.query(product_models.Product.id).all()]
+    finally:
+        db.close()
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    page_cache.clear()
+    tracking_miss_cache.clear()
+    previous_async_mode = settings.checkout_async_enabled
+    settings.checkout_async_enabled = async_checkout
+    # Все виртуальные покупатели идут с одного адреса
+    previous_rate_limit = settings.tracking_rate_limit_enabled
+    settings.tracking_rate_limit_enabled = False
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        load_test = LoadTest(app, session_factory, product_ids, async_checkout=async_checkout)
+        duration = await load_test.run(shoppers, concurrency)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        settings.checkout_async_enabled = previous_async_mode
+        settings.tracking_rate_limit_enabled = previous_rate_limit
+        engine.dispose()
+        if temp_dir:
+            temp_dir.cleanup()
+
+    return {
+        "started_at": datetime.now().isoformat(),
+        "git_revision": _git_revision(),
+        "config": {
+            "shoppers": shoppers,
+            "concurrency": concurrency,
+            "products": products,
+            "async_checkout": async_checkout
+        },
+        "duration_s": round(duration, 3),
+        "shoppers_per_s": round(shoppers / duration, 2) if duration else 0.0,
+        "steps": summarize(load_test.latencies, load_test.errors, duration)
+    }
+
+
+def print_results(results: Dict[str, Any], baseline: Dict[str, Any] = None):
+    """Вывод таблицы результатов (и разницы с базовым прогоном)"""
+    print(f"Shoppers: {results['config']['shoppers']}, concurrency: {results['config']['concurrency']}, "
+          f"duration: {results['duration_s']}s, {results['shoppers_per_s']} shoppers/s")
+    print(f"{'step':<18}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>9}")
+    for step, stats in results["steps"].items():
+        line = (f"{step:<18}{stats['count']:>7}{stats['errors']:>8}{stats['p50_ms']:>10}"
+                f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['throughput_rps']:>9}")
+        if baseline and step in baseline.get("steps", {}):
+            base_p95 = baseline["steps"][step]["p95_ms"]
+            if base_p95:
+                line += f"   p95 {((stats['p95_ms'] - base_p95) / base_p95) * 100:+.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест магазина Sirius Group V2")
+    parser.add_argument("--shoppers", type=int, default=50, help="Количество покупателей")
+    parser.add_argument("--concurrency", type=int, default=10, help="Одновременных покупателей")
+    parser.add_argument("--products", type=int, default=100, help="Товаров в каталоге")
+    parser.add_argument("--async-checkout", action="store_true", help="Оформление через очередь заказов")
+    parser.add_argument("--database", help="Путь к SQLite базе для прогона (по умолчанию временная)")
+    parser.add_argument("--output", help="Файл для сохранения результатов в JSON")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для сравнения")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_load_test(
+        shoppers=args.shoppers,
+        concurrency=args.concurrency,
+        products=args.products,
+        async_checkout=args.async_checkout,
+        database_path=args.database
+    ))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
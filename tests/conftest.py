@@ -0,0 +1,64 @@
+"""
+Общие фикстуры тестов
+"""
+import pytest
+import sys
+import os
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db import Base
+from app.models import product, order, user, message_log  # noqa: F401 - регистрация таблиц
+
+
+@pytest.fixture
+def db_session():
+    """Сессия изолированной SQLite базы в памяти"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def client(db_session):
+    """HTTP клиент приложения, работающий с изолированной базой"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.db import get_db
+    from app.cache import page_cache
+    from app.services.homepage_service import homepage_cache
+    from app.services.suggest_index import suggest_index
+    from app.services.qr_service import qr_image_cache
+    from app.services.order_code_registry import tracking_miss_cache
+    from app.rate_limit import tracking_limiter
+    
+    # Данные, закэшированные на другой базе, не должны попасть в тест
+    page_cache.clear()
+    homepage_cache.clear()
+    suggest_index.clear()
+    qr_image_cache.clear()
+    tracking_miss_cache.clear()
+    tracking_limiter.clear()
+    
+    def override_get_db():
+        yield db_session
+    
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
@@ -0,0 +1,45 @@
+"""
+Тесты очистки брошенных корзин
+"""
+from datetime import datetime, timedelta, timezone
+
+from app.models.order import ShopCart
+from app.monitoring import monitor
+from app.services.cart_cleanup_service import CartCleanupService
+
+
+def _add_cart_row(db, session_id: str, product_id: int, age_hours: int):
+    """Добавление строки корзины с заданным возрастом"""
+    created_at = datetime.now(timezone.utc) - timedelta(hours=age_hours)
+    db.add(ShopCart(session_id=session_id, product_id=product_id, quantity=1, created_at=created_at))
+
+
+class TestCartCleanup:
+    """Тесты CartCleanupService"""
+    
+    def test_deletes_only_stale_sessions(self, db_session):
+        """Удаляются только корзины без активности дольше порога"""
+        for i in range(5):
+            _add_cart_row(db_session, f"old-{i}", 1, age_hours=100)
+            _add_cart_row(db_session, f"old-{i}", 2, age_hours=100)
+        _add_cart_row(db_session, "fresh", 1, age_hours=1)
+        # Сессия с одной свежей строкой считается активной целиком
+        _add_cart_row(db_session, "mixed", 1, age_hours=100)
+        _add_cart_row(db_session, "mixed", 2, age_hours=1)
+        db_session.commit()
+        
+        deleted = CartCleanupService(db_session).cleanup_abandoned_carts(max_age_hours=72, batch_size=2)
+        
+        assert deleted == 10
+        remaining = {row.session_id for row in db_session.query(ShopCart).all()}
+        assert remaining == {"fresh", "mixed"}
+    
+    def test_reports_deleted_rows_to_monitor(self, db_session):
+        """Количество удаленных строк попадает в счетчики мониторинга"""
+        _add_cart_row(db_session, "old", 1, age_hours=100)
+        db_session.commit()
+        before = monitor.get_counters().get("cart_gc_rows_deleted", 0)
+        
+        CartCleanupService(db_session).cleanup_abandoned_carts(max_age_hours=72)
+        
+        assert monitor.get_counters()["cart_gc_rows_deleted"] == before + 1
@@ -0,0 +1,71 @@
+"""
+Тесты каталога магазина
+"""
+from decimal import Decimal
+
+import pytest
+
+from app.models.product import Product
+from app.services.product_service import ProductService
+
+
+@pytest.fixture
+def catalog(db_session):
+    """Каталог с повторяющимися ценами и товаром без остатка"""
+    prices = ["300.00", "100.00", "200.00", "100.00", None, "200.00", "50.00"]
+    for i, price in enumerate(prices):
+        db_session.add(Product(
+            name=f"Товар {chr(ord('a') + (i * 3) % 7)}",
+            quantity=5,
+            sell_price_rub=Decimal(price) if price else None
+        ))
+    db_session.add(Product(name="Нет в наличии", quantity=0, sell_price_rub=Decimal("10.00")))
+    db_session.commit()
+    return db_session
+
+
+def _walk_pages(service: ProductService, sort: str, limit: int) -> list:
+    """Обход всех страниц каталога по курсору"""
+    items, cursor = [], None
+    while True:
+        page = service.get_catalog_page(sort=sort, cursor=cursor, limit=limit)
+        items.extend(page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            return items
+
+
+class TestCatalogPagination:
+    """Тесты keyset-пагинации каталога"""
+    
+    @pytest.mark.parametrize("sort", ["newest", "price_asc", "price_desc", "name"])
+    def test_pages_cover_catalog_in_order(self, catalog, sort):
+        """Страницы без пропусков и повторов совпадают с полной сортировкой"""
+        service = ProductService(catalog)
+        paged = _walk_pages(service, sort, limit=2)
+        full = service.get_catalog_page(sort=sort, limit=100)["items"]
+        
+        assert [item["id"] for item in paged] == [item["id"] for item in full]
+        assert len(paged) == 7
+        
+        if sort == "price_asc":
+            prices = [item["sell_price_rub"] or 0 for item in paged]
+            assert prices == sorted(prices)
+    
+    def test_cursor_of_other_sort_is_rejected(self, catalog):
+        """Курсор одной сортировки нельзя использовать с другой"""
+        service = ProductService(catalog)
+        cursor = service.get_catalog_page(sort="name", limit=2)["next_cursor"]
+        
+        with pytest.raises(ValueError):
+            service.get_catalog_page(sort="newest", cursor=cursor)
+    
+    def test_api_returns_card_fields_only(self, client, catalog):
+        """JSON для бесконечной прокрутки содержит только поля карточки"""
+        data = client.get("/api/shop/catalog", params={"limit": 3}).json()
+        
+        assert len(data["items"]) == 3
+        assert data["next_cursor"]
+        assert set(data["items"][0]) == {"id", "name", "description", "sell_price_rub", "availability_status", "quantity", "thumbnail"}
+        
+        assert client.get("/api/shop/catalog", params={"cursor": "garbage"}).status_code == 400
@@ -0,0 +1,159 @@
+"""
+Тесты очереди асинхронного оформления заказов
+"""
+from decimal import Decimal
+
+from app.models.product import Product
+from app.models.order import ShopCart, ShopOrder, CheckoutIntent
+from app.services.checkout_service import CheckoutQueueService
+
+CUSTOMER = {
+    "customer_name": "Иван",
+    "customer_phone": "+79280000000",
+    "delivery_option": "SELF_PICKUP_GROZNY",
+    "consent_whatsapp": True
+}
+
+
+class TestCheckoutQueue:
+    """Тесты CheckoutQueueService"""
+    
+    def test_enqueue_and_process(self, db_session):
+        """Заявка сохраняет снимок корзины, обработчик создает заказы"""
+        product = Product(name="Товар", quantity=10, sell_price_rub=Decimal("150.00"))
+        db_session.add(product)
+        db_session.commit()
+        for session_id in ("s1", "s2"):
+            db_session.add(ShopCart(session_id=session_id, product_id=product.id, quantity=2))
+        db_session.commit()
+        
+        service = CheckoutQueueService(db_session)
+        first = service.enqueue("s1", CUSTOMER)
+        second = service.enqueue("s2", CUSTOMER)
+        
+        assert db_session.query(ShopCart).count() == 0
+        assert db_session.query(ShopOrder).count() == 0
+        assert service.get_status(first.token)["status"] == "pending"
+        
+        assert service.process_batch(batch_size=10) == 2
+        
+        status = service.get_status(first.token)
+        assert status["status"] == "completed"
+        assert len(status["order_codes"]) == 1
+        order = db_session.query(ShopOrder).filter(ShopOrder.order_code == status["order_codes"][0]).one()
+        assert order.quantity == 2
+        assert float(order.total_amount) == 300.0
+        assert service.get_status(second.token)["status"] == "completed"
+    
+    def test_empty_cart_is_not_enqueued(self, db_session):
+        """Пустая корзина не попадает в очередь"""
+        assert CheckoutQueueService(db_session).enqueue("empty", CUSTOMER) is None
+        assert db_session.query(CheckoutIntent).count() == 0
+    
+    def test_invalid_intent_is_marked_failed(self, db_session):
+        """Заявка с неизвестным способом доставки помечается как ошибочная"""
+        product = Product(name="Товар", quantity=10, sell_price_rub=Decimal("150.00"))
+        db_session.add(product)
+        db_session.add(ShopCart(session_id="s1", product_id=1, quantity=1))
+        db_session.commit()
+        
+        service = CheckoutQueueService(db_session)
+        intent = service.enqueue("s1", dict(CUSTOMER, delivery_option="TELEPORT"))
+        service.process_batch()
+        
+        assert service.get_status(intent.token)["status"] == "failed"
+    
+    def test_stale_processing_intents_are_requeued(self, db_session):
+        """Заявки упавшего обработчика возвращаются в очередь или отклоняются"""
+        from datetime import datetime, timedelta
+        from app.config import settings
+        
+        product = Product(name="Товар", quantity=10, sell_price_rub=Decimal("150.00"))
+        db_session.add(product)
+        db_session.commit()
+        for session_id in ("s1", "s2", "s3"):
+            db_session.add(ShopCart(session_id=session_id, product_id=product.id, quantity=1))
+        db_session.commit()
+        
+        service = CheckoutQueueService(db_session)
+        stale, exhausted, fresh = [service.enqueue(session_id, CUSTOMER) for session_id in ("s1", "s2", "s3")]
+        
+        # Обработчик захватил заявки и упал
+        claimed_at = datetime.now() - timedelta(seconds=settings.checkout_claim_timeout_seconds + 1)
+        for intent in (stale, exhausted):
+            intent.status = "processing"
+            intent.claimed_by = "crashed"
+            intent.updated_at = claimed_at
+        exhausted.attempts = settings.batch_retry_attempts - 1
+        fresh.status = "processing"
+        fresh.claimed_by = "alive"
+        fresh.updated_at = datetime.now()
+        db_session.commit()
+        
+        assert service.process_batch(batch_size=10) == 1
+        
+        assert service.get_status(stale.token)["status"] == "completed"
+        assert service.get_status(exhausted.token)["status"] == "failed"
+        assert service.get_status(fresh.token)["status"] == "processing"
+        db_session.refresh(stale)
+        assert stale.attempts == 2
+    
+    def test_reclaimed_intent_does_not_create_orders(self, db_session, monkeypatch):
+        """Заявка, которую за время обработки захватил другой обработчик, не дает заказов"""
+        product = Product(name="Товар", quantity=10, sell_price_rub=Decimal("150.00"))
+        db_session.add(product)
+        db_session.add(ShopCart(session_id="s1", product_id=1, quantity=1))
+        db_session.commit()
+        
+        service = CheckoutQueueService(db_session)
+        intent = service.enqueue("s1", CUSTOMER)
+        claim_batch = service._claim_batch
+        
+        def reclaimed_after_claim(batch_size):
+            claim_id, intents = claim_batch(batch_size)
+            # Заявку вернул в очередь requeue_stale и захватил другой обработчик
+            db_session.query(CheckoutIntent).filter(CheckoutIntent.id == intent.id).update(
+                {"claimed_by": "other"}, synchronize_session=False
+            )
+            db_session.commit()
+            return claim_id, intents
+        
+        monkeypatch.setattr(service, "_claim_batch", reclaimed_after_claim)
+        service.process_batch()
+        
+        assert db_session.query(ShopOrder).count() == 0
+        db_session.refresh(intent)
+        assert intent.status == "processing"
+        assert intent.claimed_by == "other"
+        assert intent.attempts == 0
+    
+    def test_unexpected_error_requeues_only_its_intent(self, db_session, monkeypatch):
+        """Непредвиденная ошибка в одной заявке не мешает остальным заявкам батча"""
+        from app.services import checkout_service
+        
+        product = Product(name="Товар", quantity=10, sell_price_rub=Decimal("150.00"))
+        db_session.add(product)
+        db_session.commit()
+        for session_id in ("s1", "s2"):
+            db_session.add(ShopCart(session_id=session_id, product_id=product.id, quantity=1))
+        db_session.commit()
+        
+        service = CheckoutQueueService(db_session)
+        broken, ok = service.enqueue("s1", CUSTOMER), service.enqueue("s2", dict(CUSTOMER, customer_name="Петр"))
+        build_shop_orders = checkout_service.build_shop_orders
+        
+        def fail_for_ivan(db, items, customer, products):
+            orders = build_shop_orders(db, items, customer, products)
+            if customer["customer_name"] == "Иван":
+                raise RuntimeError("boom")
+            return orders
+        
+        monkeypatch.setattr(checkout_service, "build_shop_orders", fail_for_ivan)
+        assert service.process_batch(batch_size=10) == 2
+        
+        assert service.get_status(ok.token)["status"] == "completed"
+        assert service.get_status(broken.token)["status"] == "pending"
+        assert db_session.query(ShopOrder).count() == 1
+        db_session.refresh(broken)
+        assert broken.attempts == 1
+        assert broken.claimed_by is None
@@ -0,0 +1,41 @@
+"""
+Тесты быстрой сериализации списочных API
+"""
+import json
+from decimal import Decimal
+
+from benchmarks.json_serialization import standard_path, fast_path, run_benchmark
+from app.models.product import Product
+
+
+class TestFastJSON:
+    """Тесты быстрого пути сериализации"""
+    
+    def test_fast_path_matches_response_model(self, db_session):
+        """Быстрый путь дает тот же JSON, что и response_model"""
+        db_session.add(Product(name="Товар", quantity=2, sell_price_rub=Decimal("100.50")))
+        db_session.add(Product(name="Без цены", quantity=0))
+        db_session.commit()
+        
+        assert json.loads(fast_path(db_session)) == json.loads(standard_path(db_session))
+    
+    def test_admin_products_endpoint(self, client, db_session):
+        """Админский список товаров отдается быстрым путем"""
+        db_session.add(Product(name="Товар", quantity=2, sell_price_rub=Decimal("100.50")))
+        db_session.commit()
+        
+        response = client.get("/api/admin/products")
+        assert response.status_code == 200
+        assert response.json()[0]["sell_price_rub"] == "100.50"
+        assert "etag" in response.headers
+    
+    def test_list_schema_is_documented(self, client):
+        """Схема списка описана в OpenAPI без response_model"""
+        responses = client.get("/openapi.json").json()["paths"]["/api/admin/products"]["get"]["responses"]
+        assert responses["200"]["content"]["application/json"]["schema"]["type"] == "array"
+    
+    def test_benchmark_runs(self):
+        """Бенчмарк сравнивает оба пути"""
+        results = run_benchmark(rows=20, repeat=2)
+        assert results["standard"]["bytes"] == results["fast"]["bytes"]
+        assert results["fast"]["median_ms"] > 0
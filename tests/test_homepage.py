@@ -0,0 +1,54 @@
+"""
+Тесты главной страницы
+"""
+from decimal import Decimal
+
+from app.models.product import Product
+from app.schemas.product import ProductCreate
+from app.services.homepage_service import HomepageCache
+from app.services.product_service import ProductService
+
+
+class TestHomepageCache:
+    """Тесты кэша счетчиков и последних товаров"""
+    
+    def test_counters_are_cached(self, db_session):
+        """Счетчики не пересчитываются в пределах TTL"""
+        cache = HomepageCache(ttl=60)
+        assert cache.get_counters(db_session)["total_products"] == 0
+        
+        db_session.add(Product(name="Товар", quantity=1))
+        db_session.commit()
+        
+        assert cache.get_counters(db_session)["total_products"] == 0
+        cache.invalidate_products()
+        assert cache.get_counters(db_session)["total_products"] == 1
+    
+    def test_recent_products_expire(self, db_session, monkeypatch):
+        """Товар, добавленный другим воркером, появляется по истечении TTL"""
+        from app.services import homepage_service
+        
+        now = [1000.0]
+        monkeypatch.setattr(homepage_service.time, "monotonic", lambda: now[0])
+        cache = HomepageCache(ttl=60)
+        assert cache.get_recent_products(db_session) == []
+        
+        db_session.add(Product(name="Товар", quantity=1))
+        db_session.commit()
+        
+        now[0] += 30
+        assert cache.get_recent_products(db_session) == []
+        now[0] += 31
+        assert [product["name"] for product in cache.get_recent_products(db_session)] == ["Товар"]
+    
+    def test_product_creation_refreshes_recent_products(self, client, db_session):
+        """Создание товара через сервис обновляет главную страницу"""
+        assert client.get("/").status_code == 200
+        
+        ProductService(db_session).create(ProductCreate(
+            name="Новинка", quantity=2, sell_price_rub=Decimal("150.00")
+        ))
+        
+        response = client.get("/")
+        assert "Новинка" in response.text
+        assert "Последние товары" in response.text
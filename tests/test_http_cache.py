@@ -0,0 +1,116 @@
+"""
+Тесты условных ответов API
+"""
+from decimal import Decimal
+
+from app.models.product import Product
+from app.models.order import ShopOrder
+from app.services.order_code_registry import OrderCodeRegistry
+
+
+def _add_product(db_session, name: str = "Товар") -> Product:
+    product = Product(name=name, quantity=3, sell_price_rub=Decimal("100.00"))
+    db_session.add(product)
+    db_session.commit()
+    return product
+
+
+class TestProductConditionalRequests:
+    """Тесты ETag и Last-Modified для API товаров"""
+    
+    def test_product_returns_304_for_matching_etag(self, client, db_session):
+        """Повторный запрос с ETag получает 304 без тела"""
+        product = _add_product(db_session)
+        
+        first = client.get(f"/api/shop/products/{product.id}")
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        assert first.headers["cache-control"].startswith("public")
+        assert "last-modified" in first.headers
+        
+        second = client.get(f"/api/shop/products/{product.id}", headers={"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["etag"] == etag
+    
+    def test_if_modified_since(self, client, db_session):
+        """If-Modified-Since с временем последнего изменения дает 304"""
+        product = _add_product(db_session)
+        
+        first = client.get(f"/api/shop/products/{product.id}")
+        second = client.get(
+            f"/api/shop/products/{product.id}",
+            headers={"If-Modified-Since": first.headers["last-modified"]}
+        )
+        assert second.status_code == 304
+    
+    def test_collection_etag_changes_on_insert(self, client, db_session):
+        """Добавление товара меняет ETag списка"""
+        _add_product(db_session, "Первый")
+        etag = client.get("/api/shop/products").headers["etag"]
+        
+        assert client.get("/api/shop/products", headers={"If-None-Match": etag}).status_code == 304
+        
+        _add_product(db_session, "Второй")
+        response = client.get("/api/shop/products", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["total"] == 2
+    
+    def test_collection_etag_changes_on_same_second_edits(self, client, db_session):
+        """Два изменения одного товара подряд дают разные ETag списка"""
+        product = _add_product(db_session)
+        product.name = "Первое название"
+        db_session.commit()
+        etag = client.get("/api/shop/products").headers["etag"]
+        
+        product.name = "Второе название"
+        db_session.commit()
+        response = client.get("/api/shop/products", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["products"][0]["name"] == "Второе название"
+    
+    def test_admin_products_revalidate(self, client, db_session):
+        """Админский список кэшируется только приватно с ревалидацией"""
+        _add_product(db_session)
+        
+        first = client.get("/api/admin/products")
+        assert first.headers["cache-control"] == "private, no-cache"
+        
+        second = client.get("/api/admin/products", headers={"If-None-Match": f'W/{first.headers["etag"]}'})
+        assert second.status_code == 304
+
+
+class TestTrackingConditionalRequests:
+    """Тесты условных ответов API отслеживания"""
+    
+    def test_tracking_returns_304_until_order_changes(self, client, db_session):
+        """ETag заказа меняется вместе со строкой заказа"""
+        order = ShopOrder(
+            order_code="A-TEST01",
+            order_code_last4="ST01",
+            customer_name="Покупатель",
+            customer_phone="+79280000000",
+            product_id=1,
+            product_name="Товар",
+            quantity=1,
+            unit_price_rub=Decimal("100.00"),
+            total_amount=100,
+            delivery_option="SELF_PICKUP_GROZNY"
+        )
+        db_session.add(order)
+        db_session.flush()
+        OrderCodeRegistry(db_session).register(order, "shop_order")
+        db_session.commit()
+        
+        first = client.get("/api/track/A-TEST01")
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        assert client.get("/api/track/A-TEST01", headers={"If-None-Match": etag}).status_code == 304
+        
+        order.status = "paid"
+        db_session.commit()
+        
+        response = client.get("/api/track/A-TEST01", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["status"] == "paid_pending"
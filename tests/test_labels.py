@@ -0,0 +1,49 @@
+"""
+Тесты листов QR-этикеток
+"""
+from decimal import Decimal
+
+from app.models.product import Product
+from app.services.label_service import build_label_sheet, label_generator, LABEL_COLUMNS, LABEL_ROWS
+from app.services.qr_service import qr_service
+
+
+class TestLabelSheets:
+    """Тесты генерации листов этикеток"""
+
+    def test_sheet_is_paginated(self):
+        """Этикетки, не поместившиеся на страницу, переносятся на следующую"""
+        image = qr_service.render_png("product:1", 4)
+        per_page = LABEL_COLUMNS * LABEL_ROWS
+        pdf = build_label_sheet([("#1 Товар", image)] * (per_page + 1))
+
+        assert pdf.startswith(b"%PDF")
+        assert b"/Count 2" in pdf
+
+    def test_product_labels_endpoint(self, client, db_session):
+        """Лист этикеток товаров отдается PDF файлом, неизвестные ID пропускаются"""
+        db_session.add_all([
+            Product(name="Товар 1", quantity=1, sell_price_rub=Decimal("10.00")),
+            Product(name="Товар 2", quantity=1, sell_price_rub=Decimal("20.00"))
+        ])
+        db_session.commit()
+
+        try:
+            response = client.post("/api/admin/labels", json={"kind": "product", "codes": ["1", "2", "999"]})
+        finally:
+            label_generator.shutdown()
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/pdf"
+        assert response.headers["x-labels-count"] == "2"
+        assert response.content.startswith(b"%PDF")
+
+    def test_rejects_unknown_and_oversized_batches(self, client, db_session, monkeypatch):
+        """Пустой результат дает 404, слишком большая партия - 400"""
+        from app.config import settings
+
+        assert client.post("/api/admin/labels", json={"kind": "order", "codes": ["NOPE0000"]}).status_code == 404
+
+        monkeypatch.setattr(settings, "label_batch_max", 2)
+        response = client.post("/api/admin/labels", json={"kind": "product", "codes": ["1", "2", "3"]})
+        assert response.status_code == 400
@@ -0,0 +1,83 @@
+"""
+Тесты реестра кодов заказов
+"""
+from decimal import Decimal
+
+from app.models.product import Product
+from app.models.order import Order, ShopOrder, OrderCode
+from app.services.checkout_service import build_shop_orders
+from app.services.order_code_registry import OrderCodeRegistry
+from app.services.order_service import OrderService
+
+
+class TestOrderCodeRegistry:
+    """Тесты реестра кодов заказов"""
+
+    def test_shop_orders_are_registered(self, db_session):
+        """Оформление заказа магазина записывает код в реестр"""
+        db_session.add(Product(name="Товар", quantity=5, sell_price_rub=Decimal("100.00")))
+        db_session.commit()
+
+        orders = build_shop_orders(
+            db_session,
+            [{"product_id": 1, "quantity": 1}],
+            {"customer_name": "Покупатель", "customer_phone": "+79280000000", "delivery_option": "SELF_PICKUP_GROZNY"}
+        )
+        db_session.commit()
+
+        order, order_type = OrderCodeRegistry(db_session).resolve(orders[0].order_code)
+        assert order_type == "shop_order"
+        assert order.id == orders[0].id
+
+    def test_orders_are_registered(self, db_session):
+        """Создание обычного заказа записывает код в реестр"""
+        created = OrderService(db_session).create({
+            "phone": "+79280000000",
+            "qty": 1,
+            "unit_price_rub": Decimal("100.00"),
+            "order_code": "ORD00001"
+        })
+
+        order, order_type = OrderCodeRegistry(db_session).resolve("ORD00001")
+        assert order_type == "order"
+        assert order.id == created.id
+
+    def test_unknown_code(self, client, db_session):
+        """Неизвестный код не находится"""
+        assert OrderCodeRegistry(db_session).resolve("NOPE0000") == (None, None)
+        assert client.get("/api/track/NOPE0000").status_code == 404
+
+    def test_database_error_is_not_a_miss(self, client, db_session, monkeypatch):
+        """Ошибка БД дает 500, а не "заказ не найден", и не попадает в кэш промахов"""
+        from app.services.order_code_registry import tracking_miss_cache
+
+        def broken_query(self):
+            raise RuntimeError("database is unavailable")
+
+        monkeypatch.setattr(OrderCodeRegistry, "_orders_query", broken_query)
+        assert client.get("/api/track/ORD00001").status_code == 500
+        assert client.post("/api/track/bulk", json={"codes": ["ORD00001"]}).status_code == 500
+        assert tracking_miss_cache.get("ORD00001") is None
+
+    def test_backfill_registers_existing_orders(self, db_session):
+        """Заказы, созданные до появления реестра, добавляются при запуске"""
+        db_session.add(Order(phone="+79280000000", qty=1, unit_price_rub=Decimal("1.00"), order_code="OLD00001"))
+        db_session.add(ShopOrder(
+            order_code="A-OLD001",
+            order_code_last4="D001",
+            customer_name="Покупатель",
+            customer_phone="+79280000000",
+            product_name="Товар",
+            quantity=1,
+            unit_price_rub=Decimal("1.00"),
+            total_amount=1
+        ))
+        db_session.commit()
+
+        registry = OrderCodeRegistry(db_session)
+        # Заполнение идет в фоне: код могли искать до его окончания
+        assert registry.resolve("A-OLD001") == (None, None)
+        assert registry.backfill() == 2
+        assert registry.backfill() == 0
+        assert db_session.query(OrderCode).count() == 2
+        assert registry.resolve("A-OLD001")[1] == "shop_order"
@@ -0,0 +1,68 @@
+"""
+Тесты событий статуса заказов
+"""
+import asyncio
+from decimal import Decimal
+
+from app.models.product import Product
+from app.services.checkout_service import build_shop_orders
+from app.services.order_events import OrderEventBroker, order_events
+from app.services.order_service import ShopOrderService
+
+
+class TestOrderEvents:
+    """Тесты pub/sub событий заказов и потока SSE"""
+
+    def test_broker_delivers_to_subscribers_of_code(self):
+        """Событие получают только подписчики своего заказа, в том числе из другого потока"""
+        broker = OrderEventBroker()
+
+        async def scenario():
+            queue = broker.subscribe("A-000001")
+            other = broker.subscribe("A-000002")
+            await asyncio.get_running_loop().run_in_executor(
+                None, broker.publish, "A-000001", {"status": "paid"}
+            )
+            event = await asyncio.wait_for(queue.get(), timeout=1)
+            broker.unsubscribe("A-000001", queue)
+            broker.unsubscribe("A-000002", other)
+            return event, other.empty()
+
+        event, other_empty = asyncio.run(scenario())
+        assert event == {"status": "paid"}
+        assert other_empty
+        assert broker.subscriber_count() == 0
+
+    def test_service_updates_publish_events(self, db_session, monkeypatch):
+        """Смена статуса и статуса прибытия публикуется по коду заказа"""
+        db_session.add(Product(name="Товар", quantity=5, sell_price_rub=Decimal("100.00")))
+        db_session.commit()
+        order = build_shop_orders(
+            db_session,
+            [{"product_id": 1, "quantity": 1}],
+            {"customer_name": "Покупатель", "customer_phone": "+79280000000", "delivery_option": "SELF_PICKUP_GROZNY"}
+        )[0]
+        db_session.commit()
+
+        published = []
+        monkeypatch.setattr(order_events, "publish", lambda code, event: published.append((code, event)))
+
+        service = ShopOrderService(db_session)
+        service.update_status(order.id, "paid")
+        service.update_arrival_status(order.id, "ready")
+
+        assert [code for code, _ in published] == [order.order_code, order.order_code]
+        assert published[-1][1]["status"] == "paid"
+        assert published[-1][1]["arrival_status"] == "ready"
+
+    def test_event_stream_is_not_compressed(self, client):
+        """Запросы потока событий проходят мимо сжатия, неизвестный заказ дает 404"""
+        response = client.get(
+            "/api/track/NOPE0000/events",
+            headers={"Accept": "text/event-stream", "Accept-Encoding": "gzip"}
+        )
+        assert response.status_code == 404
+        assert order_events.subscriber_count("NOPE0000") == 0
+
+        page = client.get("/shop/", headers={"Accept": "text/event-stream", "Accept-Encoding": "gzip"})
+        assert "content-encoding" not in page.headers
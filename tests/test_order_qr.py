@@ -0,0 +1,102 @@
+"""
+Тесты сохраненных QR-кодов заказов
+"""
+import os
+from decimal import Decimal
+
+import pytest
+
+from app.config import settings
+from app.models.product import Product
+from app.services.checkout_service import build_shop_orders
+from app.services.order_qr_service import OrderQRService, qr_urls
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    """Отдельная папка загрузок"""
+    monkeypatch.setattr(settings, "upload_dir", str(tmp_path))
+    return tmp_path
+
+
+def _create_order(db_session):
+    db_session.add(Product(name="Товар", quantity=5, sell_price_rub=Decimal("100.00")))
+    db_session.commit()
+    orders = build_shop_orders(
+        db_session,
+        [{"product_id": 1, "quantity": 1}],
+        {"customer_name": "Покупатель", "customer_phone": "+79280000000", "delivery_option": "SELF_PICKUP_GROZNY"}
+    )
+    db_session.commit()
+    return orders[0]
+
+
+class TestOrderQR:
+    """Тесты QR-кодов заказов"""
+
+    def test_payload_created_with_order(self, db_session):
+        """Данные QR-кода создаются при оформлении, файлы - позже"""
+        order = _create_order(db_session)
+        assert order.qr_payload.startswith(f"shop_order:{order.order_code}:")
+        assert order.qr_image_path is None
+
+    def test_background_render_persists_files(self, db_session, upload_dir):
+        """Фоновая задача отрисовывает SVG и PNG и сохраняет путь"""
+        order = _create_order(db_session)
+        payload = order.qr_payload
+
+        assert OrderQRService(db_session).render_pending(batch_size=10) == 1
+        assert OrderQRService(db_session).render_pending(batch_size=10) == 0
+
+        db_session.refresh(order)
+        assert order.qr_payload == payload
+        assert os.path.isfile(order.qr_image_path)
+        assert os.path.isfile(order.qr_image_path[:-len(".svg")] + ".png")
+
+    def test_failed_render_does_not_block_batches(self, db_session, upload_dir, monkeypatch):
+        """Заказ, который не удалось отрисовать, не выбирается повторно"""
+        from app.services import order_qr_service
+
+        failing = _create_order(db_session)
+        real_render = order_qr_service.render_qr_files
+
+        def render(payload):
+            if payload == failing.qr_payload:
+                raise OSError("disk error")
+            return real_render(payload)
+
+        monkeypatch.setattr(order_qr_service, "render_qr_files", render)
+        service = OrderQRService(db_session)
+        assert service.render_pending(batch_size=1) == 0
+        assert failing.qr_image_path == order_qr_service.QR_RENDER_FAILED
+
+        newer = build_shop_orders(
+            db_session,
+            [{"product_id": 1, "quantity": 1}],
+            {"customer_name": "Покупатель", "customer_phone": "+79280000000", "delivery_option": "SELF_PICKUP_GROZNY"}
+        )[0]
+        db_session.commit()
+        assert service.render_pending(batch_size=1) == 1
+        assert os.path.isfile(newer.qr_image_path)
+
+        # Страница заказа пробует отрисовать его снова
+        monkeypatch.setattr(order_qr_service, "render_qr_files", real_render)
+        assert os.path.isfile(service.ensure_rendered(failing, "shop_order"))
+
+    def test_tracking_page_references_cached_file(self, client, db_session, upload_dir):
+        """Страница QR-кода ссылается на файл и не меняет данные между просмотрами"""
+        order = _create_order(db_session)
+
+        first = client.get(f"/track/{order.order_code}/qr")
+        assert first.status_code == 200
+        db_session.refresh(order)
+        urls = qr_urls(order.qr_image_path)
+        assert urls["svg"] in first.text
+
+        second = client.get(f"/track/{order.order_code}/qr")
+        assert urls["svg"] in second.text
+
+        image = client.get(urls["png"])
+        assert image.status_code == 200
+        assert image.headers["content-type"] == "image/png"
+        assert "immutable" in image.headers["cache-control"]
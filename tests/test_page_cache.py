@@ -0,0 +1,78 @@
+"""
+Тесты кэша отрендеренных страниц
+"""
+from decimal import Decimal
+
+from app.cache import LRUCache, page_cache
+from app.models.product import Product
+from app.schemas.product import ProductUpdate
+from app.services.product_service import ProductService
+
+
+class TestLRUCache:
+    """Тесты LRU кэша с лимитом памяти"""
+    
+    def test_evicts_least_recently_used(self):
+        """При превышении лимита вытесняется давно не использованная запись"""
+        cache = LRUCache(max_bytes=10)
+        cache.set("a", b"aaaa")
+        cache.set("b", b"bbbb")
+        assert cache.get("a") == b"aaaa"
+        
+        cache.set("c", b"cccc")
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == b"aaaa"
+        assert cache.get("c") == b"cccc"
+        assert cache.current_bytes == 8
+    
+    def test_skips_values_larger_than_limit(self):
+        """Значение больше лимита не кэшируется"""
+        cache = LRUCache(max_bytes=4)
+        cache.set("a", b"too large")
+        assert cache.get("a") is None
+        assert cache.current_bytes == 0
+    
+    def test_expired_entries_are_dropped(self):
+        """Истекшая запись не возвращается"""
+        cache = LRUCache(max_bytes=100, ttl=-1)
+        cache.set("a", b"value")
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+class TestPageCache:
+    """Тесты кэширования страниц каталога"""
+    
+    def _add_product(self, db_session, name: str) -> Product:
+        product = Product(name=name, quantity=3, sell_price_rub=Decimal("100.00"))
+        db_session.add(product)
+        db_session.commit()
+        return product
+    
+    def test_catalog_is_served_from_cache(self, client, db_session):
+        """Повторный запрос каталога не рендерит страницу заново"""
+        self._add_product(db_session, "Первый товар")
+        
+        first = client.get("/shop/")
+        assert first.status_code == 200
+        assert "Первый товар" in first.text
+        
+        # Прямая запись в БД минует сервис и не сбрасывает кэш
+        self._add_product(db_session, "Второй товар")
+        second = client.get("/shop/")
+        assert second.text == first.text
+        
+        # Другие параметры запроса - другая запись кэша
+        sorted_page = client.get("/shop/", params={"sort": "name"})
+        assert "Второй товар" in sorted_page.text
+    
+    def test_product_service_write_invalidates_cache(self, client, db_session):
+        """Изменение товара через сервис сбрасывает кэш страниц"""
+        product = self._add_product(db_session, "Старое название")
+        assert "Старое название" in client.get("/shop/").text
+        
+        ProductService(db_session).update(product.id, ProductUpdate(name="Новое название"))
+        
+        assert len(page_cache) == 0
+        assert "Новое название" in client.get("/shop/").text
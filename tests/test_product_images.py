@@ -0,0 +1,128 @@
+"""
+Тесты изображений товаров
+"""
+import asyncio
+import io
+import os
+from decimal import Decimal
+
+import pytest
+from PIL import Image
+
+from app.config import settings
+from app.models.product import Product, ProductImage
+from app.services.image_service import image_processor, variant_path
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    """Отдельная папка загрузок"""
+    monkeypatch.setattr(settings, "upload_dir", str(tmp_path))
+    return tmp_path
+
+
+def _png_bytes(size=(1200, 900)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGBA", size, (200, 30, 30, 128)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class TestProductImages:
+    """Тесты загрузки и обработки изображений"""
+    
+    def test_upload_process_and_serve(self, client, db_session, upload_dir, monkeypatch):
+        """Загрузка сохраняется по хэшу, копии создаются и попадают в каталог"""
+        scheduled = []
+        
+        async def fake_process(image_id, db=None):
+            scheduled.append(image_id)
+        
+        monkeypatch.setattr(image_processor, "process", fake_process)
+        
+        product = Product(name="Товар с фото", quantity=3, sell_price_rub=Decimal("100.00"))
+        db_session.add(product)
+        db_session.commit()
+        
+        response = client.post(
+            f"/api/admin/products/{product.id}/images",
+            files={"file": ("photo.png", _png_bytes(), "image/png")}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        content_hash = data["content_hash"]
+        assert os.path.exists(os.path.join(str(upload_dir), "images", content_hash[:2], content_hash, "original.png"))
+        
+        # Обработка запланирована в фоне; выполняем ее в сессии теста
+        assert scheduled == [data["id"]]
+        monkeypatch.undo()
+        monkeypatch.setattr(settings, "upload_dir", str(upload_dir))
+        assert asyncio.run(image_processor.process(data["id"], db=db_session))
+        
+        image = db_session.get(ProductImage, data["id"])
+        assert image.status == "ready"
+        assert (image.width, image.height) == (1200, 900)
+        with Image.open(variant_path(content_hash, "thumb", "webp")) as thumb:
+            assert max(thumb.size) == 320
+        
+        media = client.get(data["thumbnail"]["jpg"])
+        assert media.status_code == 200
+        assert media.headers["content-type"] == "image/jpeg"
+        assert "immutable" in media.headers["cache-control"]
+        
+        catalog = client.get("/api/shop/catalog").json()
+        assert catalog["items"][0]["thumbnail"] == data["thumbnail"]
+    
+    def test_pending_images_are_processed_after_restart(self, db_session, upload_dir):
+        """Изображения, оставшиеся pending после перезапуска, обрабатываются при запуске"""
+        import hashlib
+        
+        content = _png_bytes((400, 300))
+        content_hash = hashlib.sha256(content).hexdigest()
+        target_dir = os.path.join(str(upload_dir), "images", content_hash[:2], content_hash)
+        os.makedirs(target_dir)
+        with open(os.path.join(target_dir, "original.png"), "wb") as f:
+            f.write(content)
+        
+        product = Product(name="Товар", quantity=1)
+        db_session.add(product)
+        db_session.commit()
+        # Одно и то же изображение дважды: обе записи используют одни файлы
+        for position in range(2):
+            db_session.add(ProductImage(
+                product_id=product.id,
+                content_hash=content_hash,
+                original_ext="png",
+                position=position,
+                status="pending"
+            ))
+        db_session.commit()
+        
+        assert asyncio.run(image_processor.process_pending(db=db_session)) == 2
+        assert {image.status for image in db_session.query(ProductImage)} == {"ready"}
+        assert not [name for name in os.listdir(target_dir) if name.endswith(".tmp")]
+        assert asyncio.run(image_processor.process_pending(db=db_session)) == 0
+    
+    def test_rejects_unsupported_and_oversized_files(self, client, db_session, upload_dir, monkeypatch):
+        """Недопустимые файлы отклоняются без записи на диск"""
+        product = Product(name="Товар", quantity=1)
+        db_session.add(product)
+        db_session.commit()
+        
+        response = client.post(
+            f"/api/admin/products/{product.id}/images",
+            files={"file": ("script.exe", b"MZ", "application/octet-stream")}
+        )
+        assert response.status_code == 400
+        
+        monkeypatch.setattr(settings, "max_file_size", 10)
+        response = client.post(
+            f"/api/admin/products/{product.id}/images",
+            files={"file": ("photo.png", _png_bytes((50, 50)), "image/png")}
+        )
+        assert response.status_code == 400
+        assert os.listdir(os.path.join(str(upload_dir), "tmp")) == []
+    
+    def test_unknown_variant_is_404(self, client):
+        """Неизвестная копия не раздается"""
+        assert client.get(f"/media/images/{'a' * 64}/huge.webp").status_code == 404
+        assert client.get("/media/images/../../etc/passwd.jpg").status_code == 404
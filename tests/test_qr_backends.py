@@ -0,0 +1,80 @@
+"""
+Тесты бэкендов отрисовки QR-кодов
+"""
+import json
+import re
+
+import pytest
+
+from benchmarks.qr_rendering import run_benchmark
+from app.config import settings
+from app.models.product import Product
+from app.services.qr_service import qr_service, QR_BACKENDS
+
+PAYLOAD = "shop_order:ABCD1234:abc123.65f0a1b2.0123456789abcdefghijkl"
+
+
+class TestQRBackends:
+    """Тесты QRCodeService.draw"""
+
+    def test_backends_encode_same_matrix(self):
+        """Компактный SVG и матрица описывают одни и те же модули"""
+        matrix = json.loads(qr_service.draw(PAYLOAD, "matrix"))
+        assert matrix["size"] == len(matrix["rows"]) == len(matrix["rows"][0])
+        assert matrix["error_correction"] == settings.qr_error_correction
+
+        svg = qr_service.draw(PAYLOAD, "svg-compact").decode("ascii")
+        dark_modules = sum(row.count("1") for row in matrix["rows"])
+        widths = [int(width) for width in re.findall(r"h(\d+)v1", svg)]
+        assert sum(widths) == dark_modules
+        assert f'viewBox="0 0 {matrix["size"] + 2 * matrix["border"]}' in svg
+
+        assert qr_service.draw(PAYLOAD, "png").startswith(b"\x89PNG")
+        assert qr_service.draw(PAYLOAD, "svg").startswith(b"<?xml")
+
+    def test_fixed_version_and_error_correction(self):
+        """Версия и уровень коррекции задаются явно"""
+        matrix = json.loads(qr_service.draw(PAYLOAD, "matrix", version=10, error_correction="H"))
+        assert matrix["version"] == 10
+        assert matrix["size"] == 57
+        assert matrix["error_correction"] == "H"
+
+        with pytest.raises(ValueError):
+            qr_service.draw(PAYLOAD, "matrix", version=1)
+        with pytest.raises(ValueError):
+            qr_service.draw(PAYLOAD, "bmp")
+
+    def test_configured_version_falls_back_to_fit(self, monkeypatch):
+        """Не поместившиеся в версию из настроек данные получают подходящую версию"""
+        monkeypatch.setattr(settings, "qr_version", 1)
+        assert json.loads(qr_service.draw(PAYLOAD, "matrix"))["version"] > 1
+        assert json.loads(qr_service.draw("product:1", "matrix"))["version"] == 1
+
+    def test_matrix_endpoint(self, client, db_session):
+        """Матрица отдается по расширению .json, неподходящая версия дает 400"""
+        db_session.add(Product(name="Товар", quantity=5))
+        db_session.commit()
+
+        response = client.get("/qr/product/1.json?version=3&ec=Q")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == QR_BACKENDS["matrix"]
+        assert response.json()["version"] == 3
+
+        assert client.get("/qr/product/1.json?ec=X").status_code == 422
+        assert client.get("/qr/product/1.json?version=1&ec=H").status_code == 400
+
+    def test_svg_backend_setting(self, client, db_session, monkeypatch):
+        """Бэкенд SVG выбирается настройкой"""
+        db_session.add(Product(name="Товар", quantity=5))
+        db_session.commit()
+        monkeypatch.setattr(settings, "qr_svg_backend", "svg-compact")
+
+        response = client.get("/qr/product/1.svg")
+        assert response.headers["content-type"] == "image/svg+xml"
+        assert response.content.startswith(b"<svg")
+
+    def test_benchmark_runs(self):
+        """Бенчмарк прогоняет все бэкенды"""
+        results = run_benchmark(count=2, version=5)
+        assert len(results["results"]) == 2 * len(QR_BACKENDS)
+        assert all(stats["median_bytes"] > 0 for stats in results["results"])
@@ -0,0 +1,82 @@
+"""
+Тесты изображений QR-кодов с HTTP кэшированием
+"""
+from decimal import Decimal
+
+from app.models.product import Product
+from app.services.checkout_service import build_shop_orders
+from app.services.qr_service import qr_image_cache
+
+
+class TestQRImages:
+    """Тесты эндпоинта /qr/{kind}/{code}.{fmt}"""
+
+    def test_order_qr_is_cached(self, client, db_session):
+        """QR-код заказа отдается байтами, повторный запрос берется из кэша"""
+        db_session.add(Product(name="Товар", quantity=5, sell_price_rub=Decimal("100.00")))
+        db_session.commit()
+        order = build_shop_orders(
+            db_session,
+            [{"product_id": 1, "quantity": 1}],
+            {"customer_name": "Покупатель", "customer_phone": "+79280000000", "delivery_option": "SELF_PICKUP_GROZNY"}
+        )[0]
+        db_session.commit()
+
+        first = client.get(f"/qr/order/{order.order_code}.svg")
+        assert first.status_code == 200
+        assert first.headers["content-type"] == "image/svg+xml"
+        assert first.content.startswith(b"<?xml")
+        assert first.headers["cache-control"] == "private, no-cache"
+
+        hits = qr_image_cache.hits
+        second = client.get(f"/qr/order/{order.order_code}.svg")
+        assert second.content == first.content
+        assert qr_image_cache.hits == hits + 1
+
+        not_modified = client.get(
+            f"/qr/order/{order.order_code}.svg",
+            headers={"If-None-Match": first.headers["etag"]}
+        )
+        assert not_modified.status_code == 304
+
+    def test_resigned_order_qr_changes_etag(self, client, db_session, monkeypatch):
+        """После смены ключа QR-код заказа подписывается заново и старый ETag не подходит"""
+        from app.config import settings
+
+        db_session.add(Product(name="Товар", quantity=5, sell_price_rub=Decimal("100.00")))
+        db_session.commit()
+        order = build_shop_orders(
+            db_session,
+            [{"product_id": 1, "quantity": 1}],
+            {"customer_name": "Покупатель", "customer_phone": "+79280000000", "delivery_option": "SELF_PICKUP_GROZNY"}
+        )[0]
+        db_session.commit()
+        first = client.get(f"/qr/order/{order.order_code}.svg")
+
+        monkeypatch.setattr(settings, "secret_key", "rotated-secret")
+        response = client.get(
+            f"/qr/order/{order.order_code}.svg",
+            headers={"If-None-Match": first.headers["etag"]}
+        )
+        assert response.status_code == 200
+        assert response.headers["etag"] != first.headers["etag"]
+        assert response.content != first.content
+
+    def test_product_png_sizes(self, client, db_session):
+        """PNG товара зависит от размера модуля"""
+        db_session.add(Product(name="Товар", quantity=5))
+        db_session.commit()
+
+        small = client.get("/qr/product/1.png?size=4")
+        large = client.get("/qr/product/1.png?size=12")
+        assert small.status_code == 200
+        assert small.headers["content-type"] == "image/png"
+        assert small.headers["etag"] != large.headers["etag"]
+        assert len(small.content) < len(large.content)
+
+    def test_unknown_codes(self, client):
+        """Неизвестный код, вид или формат дает 404"""
+        assert client.get("/qr/order/NOPE0000.svg").status_code == 404
+        assert client.get("/qr/product/999.png").status_code == 404
+        assert client.get("/qr/user/1.png").status_code == 404
+        assert client.get("/qr/product/1.gif").status_code == 404
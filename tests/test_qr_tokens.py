@@ -0,0 +1,102 @@
+"""
+Тесты подписанных QR-токенов заказов
+"""
+import time
+from decimal import Decimal
+
+from app.config import settings
+from app.models.product import Product
+from app.services.checkout_service import build_shop_orders
+from app.services.qr_service import qr_service
+
+
+class TestQRTokens:
+    """Тесты подписи и проверки токенов"""
+
+    def test_token_is_bound_to_order(self):
+        """Токен действителен только для своего типа и кода заказа"""
+        token = qr_service.sign_order_token("shop_order", "A-123456")
+
+        assert qr_service.verify_order_token("shop_order", "A-123456", token)
+        assert not qr_service.verify_order_token("order", "A-123456", token)
+        assert not qr_service.verify_order_token("shop_order", "A-654321", token)
+        assert not qr_service.verify_order_token("shop_order", "A-123456", token[:-2] + "AA")
+        assert not qr_service.verify_order_token("shop_order", "A-123456", "not-a-token")
+        assert qr_service.identify_order_token("A-123456", token) == "shop_order"
+
+    def test_key_rotation(self, monkeypatch):
+        """Токены прежнего ключа принимаются, пока ключ указан в QR_TOKEN_PREVIOUS_KEYS"""
+        monkeypatch.setattr(settings, "secret_key", "old-secret")
+        token = qr_service.sign_order_token("order", "ORD00001")
+
+        monkeypatch.setattr(settings, "secret_key", "new-secret")
+        monkeypatch.setattr(settings, "qr_token_previous_keys", "old-secret")
+        assert qr_service.verify_order_token("order", "ORD00001", token)
+        assert qr_service.sign_order_token("order", "ORD00001") != token
+
+        monkeypatch.setattr(settings, "qr_token_previous_keys", "")
+        assert not qr_service.verify_order_token("order", "ORD00001", token)
+
+    def test_token_expiry(self, monkeypatch):
+        """Истекший токен отклоняется"""
+        monkeypatch.setattr(settings, "qr_token_max_age_days", 30)
+        fresh = qr_service.sign_order_token("order", "ORD00001")
+        stale = qr_service.sign_order_token("order", "ORD00001", issued_at=int(time.time()) - 31 * 86400)
+
+        assert qr_service.verify_order_token("order", "ORD00001", fresh)
+        assert not qr_service.verify_order_token("order", "ORD00001", stale)
+
+    def test_tracking_api_authenticates_scans(self, client, db_session):
+        """Токен из QR-кода заказа принимается, поддельный отклоняется до поиска заказа"""
+        db_session.add(Product(name="Товар", quantity=5, sell_price_rub=Decimal("100.00")))
+        db_session.commit()
+        order = build_shop_orders(
+            db_session,
+            [{"product_id": 1, "quantity": 1}],
+            {"customer_name": "Покупатель", "customer_phone": "+79280000000", "delivery_option": "SELF_PICKUP_GROZNY"}
+        )[0]
+        db_session.commit()
+
+        order_type, code, token = order.qr_payload.split(":")
+        assert qr_service.validate_qr_token(order.qr_payload, "shop_order")
+        assert client.get(f"/api/track/{code}?token={token}").status_code == 200
+        assert client.get(f"/api/track/{code}?token=forged").status_code == 403
+
+        # Для несуществующего заказа поддельный токен отклоняется без поиска в БД
+        assert client.get("/api/track/NOPE0000?token=forged").status_code == 403
+
+    def test_legacy_payloads_are_resigned(self, db_session, monkeypatch):
+        """Сохраненные uuid4 токены и токены выведенного ключа подписываются заново, истекшие - нет"""
+        from app.services.order_qr_service import OrderQRService
+
+        db_session.add(Product(name="Товар", quantity=5, sell_price_rub=Decimal("100.00")))
+        db_session.commit()
+        legacy, lazy, retired, expired, valid = build_shop_orders(
+            db_session,
+            [{"product_id": 1, "quantity": 1}] * 5,
+            {"customer_name": "Покупатель", "customer_phone": "+79280000000", "delivery_option": "SELF_PICKUP_GROZNY"}
+        )
+        for order in (legacy, lazy):
+            order.qr_payload = f"shop_order:{order.order_code}:6f1c2e4a-0d7b-4f3e-9a55-2b8c1d9e7f00"
+            order.qr_image_path = "uploads/qr/ab/old.svg"
+        monkeypatch.setattr(settings, "secret_key", "retired-secret")
+        retired.qr_payload = qr_service.make_order_payload("shop_order", retired.order_code)
+        monkeypatch.undo()
+        expired_token = qr_service.sign_order_token("shop_order", expired.order_code, issued_at=int(time.time()) - 31 * 86400)
+        expired.qr_payload = f"shop_order:{expired.order_code}:{expired_token}"
+        db_session.commit()
+        monkeypatch.setattr(settings, "qr_token_max_age_days", 30)
+        unchanged = {order.id: order.qr_payload for order in (expired, valid)}
+
+        service = OrderQRService(db_session)
+        payload = service.get_payloads("order", [lazy.order_code, expired.order_code])[lazy.order_code]
+        assert qr_service.validate_qr_token(payload, "shop_order")
+        assert lazy.qr_image_path is None
+
+        assert service.resign_legacy() == 2
+        assert qr_service.validate_qr_token(legacy.qr_payload, "shop_order")
+        assert qr_service.validate_qr_token(retired.qr_payload, "shop_order")
+        assert legacy.qr_image_path is None
+        assert {order.id: order.qr_payload for order in (expired, valid)} == unchanged
+        assert not qr_service.validate_qr_token(expired.qr_payload, "shop_order")
+        assert service.resign_legacy() == 0
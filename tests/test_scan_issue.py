@@ -0,0 +1,127 @@
+"""
+Тесты выдачи заказов по сканированию QR-кодов
+"""
+from decimal import Decimal
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.models.order import Order, ShopOrder
+from app.models.product import Product
+from app.services.checkout_service import build_shop_orders
+from app.services.order_issue_service import OrderIssueService
+from app.services.order_service import OrderService
+
+
+def create_orders(db_session):
+    """Два заказа магазина (готовый к выдаче и неоплаченный) и обычный заказ"""
+    db_session.add(Product(name="Товар", quantity=5, sell_price_rub=Decimal("100.00")))
+    db_session.commit()
+    paid, unpaid = build_shop_orders(
+        db_session,
+        [{"product_id": 1, "quantity": 1}] * 2,
+        {"customer_name": "Покупатель", "customer_phone": "+79280000000", "delivery_option": "SELF_PICKUP_GROZNY"}
+    )
+    paid.status = "ready_for_pickup"
+    paid.arrival_status = "ready"
+    db_session.commit()
+    order = OrderService(db_session).create({
+        "phone": "+79280000000",
+        "qty": 1,
+        "unit_price_rub": Decimal("100.00"),
+        "order_code": "ORD00001"
+    })
+    return paid, unpaid, order
+
+
+class TestScanIssue:
+    """Тесты POST /api/admin/scan/issue"""
+
+    def test_issues_batch_with_per_scan_results(self, client, db_session):
+        """Пачка сканов выдается одной транзакцией с результатом на каждый скан"""
+        paid, unpaid, order = create_orders(db_session)
+        payloads = [
+            paid.qr_payload,
+            order.qr_payload,
+            unpaid.qr_payload,
+            paid.qr_payload,
+            f"order:{order.order_code}:0.0.forged",
+            "product:1"
+        ]
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db_session.bind, "before_cursor_execute", listener)
+        try:
+            response = client.post("/api/admin/scan/issue", json={"payloads": payloads})
+        finally:
+            event.remove(db_session.bind, "before_cursor_execute", listener)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["issued"] == 2
+        assert [result["result"] for result in data["results"]] == [
+            "issued", "issued", "not_ready", "duplicate", "invalid", "invalid"
+        ]
+        assert data["results"][0]["status"] == "completed"
+        assert data["results"][1]["status"] == "paid_issued"
+        assert len([sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]) == 1
+        assert len([sql for sql in statements if sql.lstrip().upper().startswith("UPDATE")]) == 2
+
+        db_session.expire_all()
+        assert db_session.get(ShopOrder, paid.id).status == "completed"
+        assert db_session.get(ShopOrder, unpaid.id).status == "ordered_not_paid"
+        issued_order = db_session.get(Order, order.id)
+        assert issued_order.status == "paid_issued"
+        assert issued_order.issued_at is not None
+
+    def test_repeat_scan_reports_already_issued(self, client, db_session):
+        """Повторная выдача того же заказа не меняет его"""
+        _, _, order = create_orders(db_session)
+        client.post("/api/admin/scan/issue", json={"payloads": [order.qr_payload]})
+
+        response = client.post("/api/admin/scan/issue", json={"payloads": [order.qr_payload]})
+        assert response.json()["results"][0]["result"] == "already_issued"
+        assert response.json()["issued"] == 0
+
+    def test_paid_order_without_goods_is_not_ready(self, client, db_session):
+        """Оплаченный заказ магазина, товар которого еще не прибыл, не выдается"""
+        paid, _, _ = create_orders(db_session)
+        paid.status = "paid"
+        paid.arrival_status = "pending"
+        db_session.commit()
+
+        result = client.post("/api/admin/scan/issue", json={"payloads": [paid.qr_payload]}).json()["results"][0]
+        assert result["result"] == "not_ready"
+        assert result["status"] == "paid"
+
+        paid.status = "ready_for_pickup"
+        db_session.commit()
+        result = client.post("/api/admin/scan/issue", json={"payloads": [paid.qr_payload]}).json()["results"][0]
+        assert result["result"] == "not_ready"
+
+    def test_concurrent_issue_wins_once(self, db_session):
+        """Заказ, выданный другим терминалом после чтения, получает already_issued"""
+        _, _, order = create_orders(db_session)
+        service = OrderIssueService(db_session)
+
+        # Другой терминал выдал заказ между чтением и выдачей
+        db_session.query(Order).filter(Order.id == order.id).update(
+            {"status": "paid_issued"}, synchronize_session=False
+        )
+        assert service._issue(order, "order", order.created_at) is False
+        assert order.status == "paid_issued"
+
+    def test_unknown_order_with_valid_signature(self, client):
+        """Подписанный код без заказа в базе дает not_found"""
+        from app.services.qr_service import qr_service
+
+        payload = qr_service.make_order_payload("order", "GONE0000")
+        response = client.post("/api/admin/scan/issue", json={"payloads": [payload]})
+        assert response.json()["results"][0]["result"] == "not_found"
+
+    def test_limits_batch_size(self, client, monkeypatch):
+        """Слишком большая пачка дает 400, пустая - 422"""
+        monkeypatch.setattr(settings, "scan_issue_batch_max", 1)
+        assert client.post("/api/admin/scan/issue", json={"payloads": ["a", "b"]}).status_code == 400
+        assert client.post("/api/admin/scan/issue", json={"payloads": []}).status_code == 422
@@ -0,0 +1,99 @@
+"""
+Тесты корзины магазина
+"""
+from decimal import Decimal
+
+from app.config import settings
+from app.models.product import Product
+from app.models.order import ShopCart
+
+
+def _create_product(db, name: str, quantity: int = 10, price: str = "100.00") -> Product:
+    """Создание товара для тестов"""
+    product = Product(name=name, quantity=quantity, sell_price_rub=Decimal(price))
+    db.add(product)
+    db.commit()
+    return product
+
+
+class TestCartCount:
+    """Тесты счетчика корзины в сессии"""
+    
+    def test_count_follows_cart_mutations(self, client, db_session):
+        """Счетчик обновляется при каждом изменении корзины"""
+        first = _create_product(db_session, "Товар 1")
+        second = _create_product(db_session, "Товар 2")
+        
+        assert client.get("/api/shop/cart/count").json()["count"] == 0
+        
+        client.post("/api/shop/cart/add", params={"product_id": first.id, "quantity": 1})
+        client.post("/api/shop/cart/add", params={"product_id": first.id, "quantity": 1})
+        client.post("/api/shop/cart/add", params={"product_id": second.id, "quantity": 2})
+        assert client.get("/api/shop/cart/count").json()["count"] == 2
+        
+        client.delete(f"/api/shop/cart/remove/{first.id}")
+        assert client.get("/api/shop/cart/count").json()["count"] == 1
+        
+        client.delete("/api/shop/cart/clear")
+        assert client.get("/api/shop/cart/count").json()["count"] == 0
+    
+    def test_count_is_served_from_session(self, client, db_session):
+        """Повторное чтение счетчика не обращается к корзине в БД"""
+        product = _create_product(db_session, "Товар")
+        client.get("/api/shop/cart/count")
+        client.post("/api/shop/cart/add", params={"product_id": product.id, "quantity": 1})
+        
+        # Удаление в обход API не видно, пока счетчик берется из сессии
+        db_session.query(ShopCart).delete()
+        db_session.commit()
+        
+        assert client.get("/api/shop/cart/count").json()["count"] == 1
+
+
+class TestCartBatch:
+    """Тесты пакетного изменения корзины"""
+    
+    def test_batch_operations_return_repriced_cart(self, client, db_session):
+        """Операции применяются вместе, ответ содержит пересчитанную корзину"""
+        first = _create_product(db_session, "Товар 1", price="100.00")
+        second = _create_product(db_session, "Товар 2", price="50.00")
+        third = _create_product(db_session, "Товар 3")
+        
+        response = client.patch("/api/shop/cart", json={"operations": [
+            {"op": "add", "product_id": first.id, "quantity": 2},
+            {"op": "add", "product_id": second.id, "quantity": 1},
+            {"op": "add", "product_id": third.id, "quantity": 1},
+            {"op": "set", "product_id": second.id, "quantity": 3},
+            {"op": "remove", "product_id": third.id}
+        ]})
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_items"] == 2
+        assert float(data["total_amount"]) == 350.0
+        assert db_session.query(ShopCart).count() == 2
+        assert client.get("/api/shop/cart/count").json()["count"] == 2
+    
+    def test_insufficient_stock_rolls_back_whole_batch(self, client, db_session):
+        """Нехватка товара отменяет все операции пакета"""
+        first = _create_product(db_session, "Товар 1", quantity=5)
+        second = _create_product(db_session, "Товар 2", quantity=1)
+        
+        response = client.patch("/api/shop/cart", json={"operations": [
+            {"op": "add", "product_id": first.id, "quantity": 1},
+            {"op": "add", "product_id": second.id, "quantity": 2}
+        ]})
+        
+        assert response.status_code == 400
+        assert db_session.query(ShopCart).count() == 0
+    
+    def test_limits_batch_size(self, client, db_session, monkeypatch):
+        """Слишком большой пакет дает 400, пустой - 422"""
+        product = _create_product(db_session, "Товар")
+        operation = {"op": "add", "product_id": product.id, "quantity": 1}
+        monkeypatch.setattr(settings, "cart_batch_max_operations", 1)
+        
+        assert client.patch("/api/shop/cart", json={"operations": []}).status_code == 422
+        assert client.patch("/api/shop/cart", json={"operations": [operation] * 2}).status_code == 400
+        assert db_session.query(ShopCart).count() == 0
+        assert client.patch("/api/shop/cart", json={"operations": [operation]}).status_code == 200
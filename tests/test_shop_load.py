@@ -0,0 +1,27 @@
+"""
+Дымовой тест нагрузочного прогона магазина
+"""
+import asyncio
+
+from benchmarks.shop_load import run_load_test, percentile
+
+
+class TestShopLoadHarness:
+    """Тесты нагрузочного прогона"""
+    
+    def test_percentile(self):
+        """Перцентиль методом ближайшего ранга"""
+        values = [float(i) for i in range(1, 101)]
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 95) == 95.0
+        assert percentile(values, 99) == 99.0
+        assert percentile([], 95) == 0.0
+    
+    def test_full_shop_path(self):
+        """Все покупатели проходят путь заказа без ошибок"""
+        results = asyncio.run(run_load_test(shoppers=4, concurrency=2, products=3))
+        
+        for step in ["catalog", "add_to_cart", "checkout_page", "process_checkout", "track"]:
+            assert results["steps"][step]["count"] == 4
+            assert results["steps"][step]["errors"] == 0
+            assert results["steps"][step]["p95_ms"] > 0
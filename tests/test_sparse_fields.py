@@ -0,0 +1,71 @@
+"""
+Тесты выборочных полей (fields=) в API товаров и заказов
+"""
+from decimal import Decimal
+
+from app.models.product import Product
+from app.models.order import ShopOrder
+from app.services.order_code_registry import OrderCodeRegistry
+
+
+class TestSparseFields:
+    """Тесты параметра fields"""
+
+    def test_shop_products_returns_only_requested_fields(self, client, db_session):
+        """Список товаров магазина сужается до запрошенных полей"""
+        db_session.add(Product(name="Товар", quantity=2, sell_price_rub=Decimal("100.50")))
+        db_session.commit()
+
+        response = client.get("/api/shop/products?fields=id,name,sell_price_rub")
+        assert response.status_code == 200
+        assert response.json()["products"] == [{"id": 1, "name": "Товар", "sell_price_rub": 100.5}]
+
+    def test_unknown_field_is_rejected(self, client):
+        """Неизвестное поле дает 400"""
+        response = client.get("/api/shop/products?fields=id,password")
+        assert response.status_code == 400
+        assert "password" in response.json()["detail"]
+
+    def test_single_product_sparse_and_conditional(self, client, db_session):
+        """Один товар по выбранным полям с ETag"""
+        db_session.add(Product(name="Товар", quantity=2, sell_price_rub=Decimal("100.50")))
+        db_session.commit()
+
+        first = client.get("/api/admin/products/1?fields=name,quantity")
+        assert first.status_code == 200
+        assert first.json() == {"name": "Товар", "quantity": 2}
+
+        second = client.get(
+            "/api/admin/products/1?fields=name,quantity",
+            headers={"If-None-Match": first.headers["etag"]}
+        )
+        assert second.status_code == 304
+
+    def test_admin_orders_and_tracking(self, client, db_session):
+        """Заказы магазина и отслеживание по выбранным полям"""
+        order = ShopOrder(
+            order_code="A-TEST02",
+            order_code_last4="ST02",
+            customer_name="Покупатель",
+            customer_phone="+79280000000",
+            product_id=1,
+            product_name="Товар",
+            quantity=1,
+            unit_price_rub=Decimal("100.00"),
+            total_amount=100,
+            delivery_option="SELF_PICKUP_GROZNY"
+        )
+        db_session.add(order)
+        db_session.flush()
+        OrderCodeRegistry(db_session).register(order, "shop_order")
+        db_session.commit()
+
+        orders = client.get("/api/admin/shop-orders?fields=order_code,status")
+        assert orders.status_code == 200
+        assert set(orders.json()[0]) == {"order_code", "status"}
+
+        tracking = client.get("/api/track/A-TEST02?fields=status,status_text")
+        assert tracking.status_code == 200
+        assert set(tracking.json()) == {"status", "status_text"}
+
+        assert client.get("/api/track/A-TEST02?fields=secret").status_code == 400
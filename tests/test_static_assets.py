@@ -0,0 +1,79 @@
+"""
+Тесты сжатия ответов и статики с хэшем в имени
+"""
+import os
+
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from app.static_assets import (
+    StaticAssets, FingerprintedStaticFiles, precompress_directory, IMMUTABLE_CACHE_CONTROL
+)
+
+
+def _static_client(directory) -> tuple:
+    assets = StaticAssets(str(directory))
+    app = Starlette(routes=[
+        Mount("/static", FingerprintedStaticFiles(directory=str(directory), assets=assets))
+    ])
+    return assets, TestClient(app)
+
+
+class TestStaticAssets:
+    """Тесты статических файлов"""
+    
+    def test_fingerprinted_url_is_immutable(self, tmp_path):
+        """Файл по URL с актуальным хэшем кэшируется на год"""
+        (tmp_path / "css").mkdir()
+        (tmp_path / "css" / "app.css").write_text("body { color: red; }")
+        assets, client = _static_client(tmp_path)
+        
+        url = assets.url("css/app.css")
+        assert url.startswith("/static/css/app.") and url.endswith(".css")
+        assert url != "/static/css/app.css"
+        
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.text == "body { color: red; }"
+        assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        
+        # Без хэша файл отдается с обычной ревалидацией
+        plain = client.get("/static/css/app.css")
+        assert plain.status_code == 200
+        assert "cache-control" not in plain.headers
+    
+    def test_hash_changes_with_content(self, tmp_path):
+        """Хэш меняется вместе с содержимым файла"""
+        asset = tmp_path / "app.js"
+        asset.write_text("console.log(1);")
+        assets = StaticAssets(str(tmp_path))
+        first = assets.url("app.js")
+        
+        asset.write_text("console.log(2); // changed")
+        os.utime(asset, (os.path.getmtime(asset) + 10,) * 2)
+        
+        assert assets.url("app.js") != first
+    
+    def test_precompressed_variant_is_served(self, tmp_path):
+        """Заранее сжатый вариант отдается клиентам с поддержкой gzip"""
+        (tmp_path / "app.css").write_text("body { margin: 0; }\n" * 200)
+        assert precompress_directory(str(tmp_path), minimum_size=100) >= 1
+        assert (tmp_path / "app.css.gz").exists()
+        
+        assets, client = _static_client(tmp_path)
+        response = client.get(assets.url("app.css"), headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["content-type"].startswith("text/css")
+        assert response.text == "body { margin: 0; }\n" * 200
+
+
+class TestResponseCompression:
+    """Тесты сжатия ответов приложения"""
+    
+    def test_html_is_gzipped(self, client):
+        """Крупные HTML ответы сжимаются"""
+        response = client.get("/shop/", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers.get("content-encoding") == "gzip"
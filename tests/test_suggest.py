@@ -0,0 +1,93 @@
+"""
+Тесты подсказок поиска товаров
+"""
+from decimal import Decimal
+
+from app.models.product import Product
+from app.schemas.product import ProductCreate, ProductUpdate
+from app.services.product_service import ProductService
+from app.services.suggest_index import PrefixIndex, normalize, suggest_index
+
+
+class TestPrefixIndex:
+    """Тесты префиксного индекса"""
+    
+    def test_normalize(self):
+        """Регистр, ё и пунктуация не влияют на поиск"""
+        assert normalize("  Ёлочная ИГРУШКА, (красная)! ") == "елочная игрушка красная"
+    
+    def test_matches_any_word_prefix(self):
+        """Префикс ищется с начала любого слова названия и поставщика"""
+        index = PrefixIndex()
+        index.build([
+            (1, "iPhone 15 Pro", "Apple"),
+            (2, "iPad Air", "Apple"),
+            (3, "Чехол для iPhone", "Аксессуары")
+        ])
+        
+        assert {item["id"] for item in index.search("iph")} == {1, 3}
+        assert [item["id"] for item in index.search("pro")] == [1]
+        assert {item["id"] for item in index.search("apple")} == {1, 2}
+        assert [item["id"] for item in index.search("ЧЕХ")] == [3]
+        assert index.search("") == []
+        assert len(index.search("i", limit=2)) == 2
+    
+    def test_upsert_and_remove(self):
+        """Изменения товара отражаются в индексе"""
+        index = PrefixIndex()
+        index.build([(1, "Старое название", None)])
+        
+        index.upsert(1, "Новое название", None)
+        assert index.search("стар") == []
+        assert index.search("нов")[0]["name"] == "Новое название"
+        
+        index.remove(1)
+        assert index.search("нов") == []
+        assert len(index) == 0
+    
+    def test_rebuild_keeps_changes_made_during_build(self):
+        """Изменения товаров во время чтения строк не теряются при подмене индекса"""
+        index = PrefixIndex()
+        index.build([(1, "Чайник", None), (2, "Тостер", None)])
+        
+        class StaleQuery:
+            """Строки, прочитанные до изменений, сделанных другим потоком"""
+            def query(self, *columns):
+                return self
+            
+            def all(self):
+                index.upsert(3, "Кофемолка", None)
+                index.remove(2)
+                return [(1, "Чайник", None), (2, "Тостер", None)]
+        
+        index.rebuild(StaleQuery())
+        assert [item["id"] for item in index.search("коф")] == [3]
+        assert index.search("тост") == []
+        assert len(index) == 2
+        
+        index.upsert(4, "Кофеварка", None)
+        assert index._pending is None
+
+
+class TestSuggestEndpoint:
+    """Тесты /api/shop/suggest"""
+    
+    def test_suggest_follows_product_changes(self, client, db_session):
+        """Индекс строится из БД и обновляется через ProductService"""
+        db_session.add(Product(name="Кофемашина", quantity=1, supplier_name="Делонги"))
+        db_session.commit()
+        
+        data = client.get("/api/shop/suggest", params={"q": "коф"}).json()
+        assert [item["name"] for item in data["items"]] == ["Кофемашина"]
+        assert suggest_index.is_built
+        
+        service = ProductService(db_session)
+        created = service.create(ProductCreate(name="Кофемолка", quantity=1, sell_price_rub=Decimal("10.00")))
+        assert len(client.get("/api/shop/suggest", params={"q": "коф"}).json()["items"]) == 2
+        
+        service.update(created.id, ProductUpdate(name="Чайник"))
+        names = [item["name"] for item in client.get("/api/shop/suggest", params={"q": "коф"}).json()["items"]]
+        assert names == ["Кофемашина"]
+        
+        service.delete(created.id)
+        assert client.get("/api/shop/suggest", params={"q": "чай"}).json()["items"] == []
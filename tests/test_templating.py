@@ -0,0 +1,21 @@
+"""
+Тесты общего окружения шаблонов
+"""
+from app.templating import templates, precompile_templates
+from app.routers import web_public, web_shop, tracking
+
+
+class TestTemplating:
+    """Тесты окружения шаблонов"""
+    
+    def test_routers_share_one_environment(self):
+        """Все роутеры используют одно окружение Jinja2"""
+        assert web_public.templates is templates
+        assert web_shop.templates is templates
+        assert tracking.templates is templates
+    
+    def test_precompile_templates(self):
+        """Все шаблоны компилируются и попадают в кэш окружения"""
+        compiled = precompile_templates()
+        assert compiled == len(templates.env.list_templates(extensions=["html"]))
+        assert templates.env.bytecode_cache is not None
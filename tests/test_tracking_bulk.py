@@ -0,0 +1,57 @@
+"""
+Тесты пакетного отслеживания заказов
+"""
+from decimal import Decimal
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.models.product import Product
+from app.services.checkout_service import build_shop_orders
+from app.services.order_service import OrderService
+
+
+class TestTrackingBulk:
+    """Тесты POST /api/track/bulk"""
+
+    def test_resolves_both_order_types_in_one_query(self, client, db_session):
+        """Коды обеих таблиц находятся одним запросом"""
+        db_session.add(Product(name="Товар", quantity=5, sell_price_rub=Decimal("100.00")))
+        db_session.commit()
+        shop_orders = build_shop_orders(
+            db_session,
+            [{"product_id": 1, "quantity": 1}] * 3,
+            {"customer_name": "Покупатель", "customer_phone": "+79280000000", "delivery_option": "SELF_PICKUP_GROZNY"}
+        )
+        db_session.commit()
+        OrderService(db_session).create({
+            "phone": "+79280000000",
+            "qty": 1,
+            "unit_price_rub": Decimal("100.00"),
+            "order_code": "ORD00001",
+            "status": "paid_issued"
+        })
+
+        codes = [order.order_code for order in shop_orders] + ["ORD00001", "NOPE0000"]
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db_session.bind, "before_cursor_execute", listener)
+        try:
+            response = client.post("/api/track/bulk", json={"codes": codes})
+        finally:
+            event.remove(db_session.bind, "before_cursor_execute", listener)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert list(data["orders"]) == codes[:4]
+        assert data["orders"]["ORD00001"]["status"] == "paid_issued"
+        assert data["orders"][codes[0]]["order_type"] == "shop_order"
+        assert data["not_found"] == ["NOPE0000"]
+        assert len([sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]) == 1
+
+    def test_limits_batch_size(self, client, monkeypatch):
+        """Слишком много кодов дает 400, пустой список - 422"""
+        monkeypatch.setattr(settings, "tracking_bulk_max_codes", 2)
+        assert client.post("/api/track/bulk", json={"codes": ["A", "B", "C"]}).status_code == 400
+        assert client.post("/api/track/bulk", json={"codes": []}).status_code == 422
@@ -0,0 +1,170 @@
+"""
+Тесты кэша промахов и ограничения запросов отслеживания
+"""
+from decimal import Decimal
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.rate_limit import TokenBucketLimiter, client_ip, tracking_limiter
+from app.services.order_service import OrderService
+
+
+def count_selects(db_session, func):
+    """Количество SELECT запросов при выполнении func"""
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db_session.bind, "before_cursor_execute", listener)
+    try:
+        result = func()
+    finally:
+        event.remove(db_session.bind, "before_cursor_execute", listener)
+    return result, len([sql for sql in statements if sql.lstrip().upper().startswith("SELECT")])
+
+
+class TestTrackingMissCache:
+    """Тесты кэша несуществующих кодов"""
+
+    def test_repeated_miss_skips_database(self, client, db_session):
+        """Повторный запрос неизвестного кода не обращается к БД"""
+        response, selects = count_selects(db_session, lambda: client.get("/api/track/NOPE0000"))
+        assert response.status_code == 404
+        assert selects == 1
+
+        response, selects = count_selects(db_session, lambda: client.get("/api/track/NOPE0000"))
+        assert response.status_code == 404
+        assert selects == 0
+
+    def test_registering_code_clears_miss(self, client, db_session):
+        """Созданный заказ находится сразу, даже если его код уже искали"""
+        assert client.get("/api/track/ORD00001").status_code == 404
+
+        OrderService(db_session).create({
+            "phone": "+79280000000",
+            "qty": 1,
+            "unit_price_rub": Decimal("100.00"),
+            "order_code": "ORD00001"
+        })
+
+        assert client.get("/api/track/ORD00001").status_code == 200
+
+    def test_bulk_uses_miss_cache(self, client, db_session):
+        """Пакетный запрос из одних известных промахов не обращается к БД"""
+        client.post("/api/track/bulk", json={"codes": ["NOPE0001", "NOPE0002"]})
+
+        response, selects = count_selects(
+            db_session,
+            lambda: client.post("/api/track/bulk", json={"codes": ["NOPE0001", "NOPE0002"]})
+        )
+        assert response.json()["not_found"] == ["NOPE0001", "NOPE0002"]
+        assert selects == 0
+
+
+class TestTokenBucketLimiter:
+    """Тесты token bucket"""
+
+    def test_burst_then_wait(self):
+        """После исчерпания запаса запрос ждет пополнения"""
+        limiter = TokenBucketLimiter(rate_per_minute=60, burst=2)
+        assert limiter.acquire("1.1.1.1") == 0
+        assert limiter.acquire("1.1.1.1") == 0
+        assert 0 < limiter.acquire("1.1.1.1") <= 1
+        assert limiter.acquire("2.2.2.2") == 0
+
+    def test_charge_goes_into_debt(self):
+        """Безусловное списание задерживает следующие запросы"""
+        limiter = TokenBucketLimiter(rate_per_minute=60, burst=2)
+        limiter.charge("1.1.1.1", 5)
+        assert limiter.acquire("1.1.1.1") > 3
+
+    def test_evicts_oldest_keys(self):
+        """Число хранимых ключей ограничено"""
+        limiter = TokenBucketLimiter(rate_per_minute=60, burst=1, max_keys=2)
+        for key in ("a", "b", "c"):
+            limiter.acquire(key)
+        assert list(limiter._buckets) == ["b", "c"]
+
+
+class TestTrackingRateLimit:
+    """Тесты ограничения запросов к маршрутам отслеживания"""
+
+    def test_returns_429_with_retry_after(self, client, monkeypatch):
+        """Перебор кодов с одного IP получает 429"""
+        monkeypatch.setattr(tracking_limiter, "burst", 3)
+
+        statuses = [client.get(f"/api/track/NOPE000{i}").status_code for i in range(4)]
+        assert statuses == [404, 404, 404, 429]
+
+        response = client.get("/track/NOPE0000")
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+
+    def test_bulk_misses_drain_bucket(self, client, monkeypatch):
+        """Каждый ненайденный код пакета списывается из запаса"""
+        monkeypatch.setattr(tracking_limiter, "burst", 5)
+
+        assert client.post("/api/track/bulk", json={"codes": [f"NOPE000{i}" for i in range(5)]}).status_code == 200
+        assert client.post("/api/track/bulk", json={"codes": ["NOPE0009"]}).status_code == 429
+
+    def test_ignores_forwarded_headers_from_clients(self, client, monkeypatch):
+        """Заголовки от клиента напрямую (не от прокси) не меняют его IP"""
+        monkeypatch.setattr(tracking_limiter, "burst", 1)
+
+        assert client.get("/api/track/NOPE0000", headers={"X-Real-IP": "10.0.0.1"}).status_code == 404
+        assert client.get("/api/track/NOPE0000", headers={"X-Real-IP": "10.0.0.2"}).status_code == 429
+        assert client.get("/api/track/NOPE0000", headers={"X-Forwarded-For": "10.0.0.3"}).status_code == 429
+
+    def test_separates_clients_behind_trusted_proxy(self, client, monkeypatch):
+        """За nginx у каждого клиента свой запас запросов"""
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        async def via_proxy(scope, receive, send):
+            scope["client"] = ("172.28.0.10", 50000)
+            await app(scope, receive, send)
+
+        monkeypatch.setattr(tracking_limiter, "burst", 1)
+        monkeypatch.setattr(settings, "trusted_proxies", "127.0.0.1, 172.28.0.10")
+        proxied = TestClient(via_proxy)
+
+        assert proxied.get("/api/track/NOPE0000", headers={"X-Real-IP": "10.0.0.1"}).status_code == 404
+        assert proxied.get("/api/track/NOPE0000", headers={"X-Real-IP": "10.0.0.2"}).status_code == 404
+        assert proxied.get("/api/track/NOPE0000", headers={"X-Real-IP": "10.0.0.1"}).status_code == 429
+
+    def test_client_ip_from_forwarded_for(self, monkeypatch):
+        """Из X-Forwarded-For берется ближайший недоверенный адрес"""
+        from starlette.requests import Request
+
+        monkeypatch.setattr(settings, "trusted_proxies", "172.28.0.0/16")
+
+        def request(host, headers):
+            return Request({
+                "type": "http",
+                "client": (host, 50000),
+                "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+            })
+
+        forwarded = {"X-Forwarded-For": "1.1.1.1, 2.2.2.2, 172.28.0.5"}
+        assert client_ip(request("172.28.0.10", forwarded)) == "2.2.2.2"
+        assert client_ip(request("8.8.8.8", forwarded)) == "8.8.8.8"
+        assert client_ip(request("172.28.0.10", {})) == "172.28.0.10"
+
+    def test_limits_order_qr_lookups(self, client, db_session, monkeypatch):
+        """QR-коды заказов ограничены и используют кэш промахов, товары - нет"""
+        monkeypatch.setattr(tracking_limiter, "burst", 2)
+
+        _, selects = count_selects(db_session, lambda: client.get("/qr/order/NOPE0000.json"))
+        assert selects == 1
+        response, selects = count_selects(db_session, lambda: client.get("/qr/order/NOPE0000.json"))
+        assert response.status_code == 404
+        assert selects == 0
+        assert client.get("/qr/order/NOPE0001.json").status_code == 429
+        assert client.get("/qr/product/1.json").status_code == 404
+
+    def test_can_be_disabled(self, client, monkeypatch):
+        """Лимит отключается настройкой"""
+        monkeypatch.setattr(tracking_limiter, "burst", 1)
+        monkeypatch.setattr(settings, "tracking_rate_limit_enabled", False)
+
+        statuses = {client.get("/api/track/NOPE0000").status_code for _ in range(3)}
+        assert statuses == {404}